@@ -0,0 +1,175 @@
+"""
+Work out what was above many places and times at once.
+
+Usage: python batch.py input.csv output.csv [--catalog catalog.npz]
+           [--chunk-size 100000] [--processes 4]
+
+The input has columns lat, lng and timestamp, where the timestamp is either
+Unix seconds or an ISO 8601 UTC time. A Parquet file (needs pyarrow) can be
+used instead of CSV. Rows are read, solved and written a chunk at a time, so
+memory use doesn't grow with the size of the input, and chunks can be spread
+across several processes. Objects are looked up in the local catalog.
+"""
+import argparse
+import csv
+import re
+import time
+import multiprocessing
+import warnings
+
+import numpy as np
+
+from catalog import LocalCatalog
+from zenith import SEARCH_RADIUS
+from sidereal import lst_degrees
+
+OUTPUT_COLUMNS = ('lat', 'lng', 'timestamp', 'ra', 'dec', 'name', 'type',
+                  'separation')
+
+# Set in each worker process by init_worker
+catalog = None
+
+# The end of an ISO 8601 time with an offset from UTC, e.g. '12:00+01:00'
+UTC_OFFSET = re.compile(r'\d\d:\d\d(:\d\d(\.\d*)?)?[+-]\d\d(:?\d\d)?$')
+
+
+def read_csv_chunks(filename, chunk_size):
+    """Yield lists of rows (as dicts) from a CSV file."""
+    with open(filename, 'rb') as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def read_parquet_chunks(filename, chunk_size):
+    """Yield lists of rows (as dicts) from a Parquet file."""
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(filename)
+    chunk = []
+    for idx in xrange(parquet_file.num_row_groups):
+        columns = parquet_file.read_row_group(
+            idx, columns=['lat', 'lng', 'timestamp']).to_pydict()
+        for lat, lng, timestamp in zip(
+                columns['lat'], columns['lng'], columns['timestamp']):
+            chunk.append({'lat': lat, 'lng': lng, 'timestamp': timestamp})
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def parse_timestamps(values):
+    """
+    Convert Unix seconds or ISO 8601 strings into Unix seconds.
+
+    The two can be mixed. ISO times are taken to be UTC unless they give an
+    offset.
+    """
+    try:
+        return np.array(values, dtype=float)
+    except (ValueError, TypeError):
+        pass
+    unix_time = np.empty(len(values))
+    iso_indices = []
+    iso_times = []
+    for idx, value in enumerate(values):
+        try:
+            unix_time[idx] = float(value)
+        except (ValueError, TypeError):
+            iso_indices.append(idx)
+            iso_times.append(utc_iso(str(value)))
+    with warnings.catch_warnings():
+        # Newer numpy warns that explicit offsets are deprecated, but it
+        # still applies them, and older numpy takes times without one to be
+        # in the local timezone
+        warnings.simplefilter('ignore', DeprecationWarning)
+        times = np.array(iso_times, dtype='datetime64[ms]')
+    unix_time[iso_indices] = times.astype('int64') / 1000.0
+    return unix_time
+
+def utc_iso(value):
+    """Mark an ISO 8601 time as UTC, unless it already has an offset."""
+    value = value.strip()
+    # A date on its own is never converted from local time
+    if ':' not in value or value.endswith('Z') or UTC_OFFSET.search(value):
+        return value
+    return value + 'Z'
+
+def init_worker(catalog_filename):
+    """Load the catalog once per process."""
+    global catalog
+    catalog = LocalCatalog(catalog_filename)
+
+def solve_chunk(chunk):
+    """Return the output rows for one chunk of input rows."""
+    lat = np.array([row['lat'] for row in chunk], dtype=float)
+    lng = np.array([row['lng'] for row in chunk], dtype=float)
+    unix_time = parse_timestamps([row['timestamp'] for row in chunk])
+    ra = lst_degrees(lng, unix_time)
+    dec = lat
+    idx, separation = catalog.nearest_many(ra, dec, SEARCH_RADIUS)
+    found = idx >= 0
+    names = np.where(found, catalog.columns['MAIN_ID'][idx], '')
+    otypes = np.where(found, catalog.columns['OTYPE'][idx], '')
+    return [(row['lat'], row['lng'], row['timestamp'], r, d, n, o, s)
+            for row, r, d, n, o, s in zip(
+                chunk, ra, dec, names, otypes, separation)]
+
+def solve_chunks(chunks, catalog_filename, processes):
+    """Yield solved chunks in order, with at most a few in memory at once."""
+    if processes == 1:
+        init_worker(catalog_filename)
+        for chunk in chunks:
+            yield solve_chunk(chunk)
+        return
+    pool = multiprocessing.Pool(
+        processes, initializer=init_worker, initargs=(catalog_filename,))
+    try:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.apply_async(solve_chunk, (chunk,)))
+            if len(pending) >= 2 * processes:
+                yield pending.pop(0).get()
+        for result in pending:
+            yield result.get()
+    finally:
+        pool.close()
+        pool.join()
+
+def run(input_filename, output_filename, catalog_filename, chunk_size=100000,
+        processes=1):
+    """Solve every row of the input file and write the results."""
+    if input_filename.endswith('.parquet'):
+        chunks = read_parquet_chunks(input_filename, chunk_size)
+    else:
+        chunks = read_csv_chunks(input_filename, chunk_size)
+    n_rows = 0
+    start = time.time()
+    with open(output_filename, 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(OUTPUT_COLUMNS)
+        for rows in solve_chunks(chunks, catalog_filename, processes):
+            writer.writerows(rows)
+            n_rows += len(rows)
+            print '{} rows, {:.0f} rows/s'.format(
+                n_rows, n_rows / (time.time() - start))
+    elapsed = time.time() - start
+    print 'Finished {} rows in {:.1f} s ({:.0f} rows/s)'.format(
+        n_rows, elapsed, n_rows / elapsed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Work out what was above many places and times.")
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--catalog', default='catalog.npz')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--processes', type=int, default=1)
+    args = parser.parse_args()
+    run(args.input, args.output, args.catalog, chunk_size=args.chunk_size,
+        processes=args.processes)
@@ -0,0 +1,68 @@
+"""
+Benchmarks for the WhatsAboveMe bot.
+
+Run each one from the top level of the repository, e.g.
+
+    python -m benchmarks.catalog_engines
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+# Saved timings from a known good commit, one file per benchmark
+BASELINE_DIRECTORY = os.path.join(os.path.dirname(__file__), 'baselines')
+
+
+def time_calls(func, args_list):
+    """Call `func` once per set of args and return the latencies in seconds."""
+    latencies = []
+    for args in args_list:
+        start = time.time()
+        func(*args)
+        latencies.append(time.time() - start)
+    return np.array(latencies)
+
+def summarise(name, latencies):
+    """Print a one-line summary of some latencies in seconds."""
+    print '{}: n={}, median={:.3f} ms, p90={:.3f} ms, max={:.3f} ms'.format(
+        name, len(latencies), 1000 * np.median(latencies),
+        1000 * np.percentile(latencies, 90), 1000 * np.max(latencies))
+
+def random_coords(n, seed=0):
+    """Return `n` ra+dec dicts spread uniformly over the sky."""
+    random_state = np.random.RandomState(seed)
+    ra = 360.0 * random_state.rand(n)
+    dec = np.degrees(np.arcsin(2.0 * random_state.rand(n) - 1.0))
+    return [{'ra': r, 'dec': d} for r, d in zip(ra, dec)]
+
+def check_baseline(name, results, save=False, tolerance=1.5):
+    """
+    Compare some timings in seconds against the saved baseline.
+
+    `results` is a dict of timings. Any that are more than `tolerance` times
+    slower than the baseline are reported, and True is returned if there were
+    any. With save=True the results become the new baseline instead.
+    """
+    filename = os.path.join(BASELINE_DIRECTORY, name + '.json')
+    if save:
+        if not os.path.isdir(BASELINE_DIRECTORY):
+            os.makedirs(BASELINE_DIRECTORY)
+        with open(filename, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print 'Saved baseline to {}'.format(filename)
+        return False
+    try:
+        with open(filename) as f:
+            baseline = json.load(f)
+    except IOError:
+        print 'No baseline saved for {}'.format(name)
+        return False
+    slower = False
+    for key, value in sorted(results.items()):
+        if key in baseline and value > tolerance * baseline[key]:
+            print 'SLOWER: {} took {:.3f} ms, baseline {:.3f} ms'.format(
+                key, 1000 * value, 1000 * baseline[key])
+            slower = True
+    return slower
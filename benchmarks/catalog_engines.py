@@ -0,0 +1,37 @@
+"""
+Compare the local catalog against live Simbad queries.
+
+Usage: python -m benchmarks.catalog_engines catalog.npz [n_coords]
+
+Both engines are asked for the same coordinates; the latencies of each are
+summarised and any coordinates where they disagree are listed.
+"""
+import sys
+
+from bot import Bot, ObjectNotFoundError
+from benchmarks import time_calls, summarise, random_coords
+
+
+def find_name(get_object, coords_dict):
+    """Return the name of the object found, or None."""
+    try:
+        return get_object(coords_dict)['name']
+    except ObjectNotFoundError:
+        return None
+
+def main(catalog_filename, n_coords=20):
+    bot = Bot(catalog_filename=catalog_filename)
+    coords_list = random_coords(n_coords)
+    args_list = [(coords_dict,) for coords_dict in coords_list]
+    summarise('local', time_calls(bot.get_object_local, args_list))
+    summarise('simbad', time_calls(bot.get_object_simbad, args_list))
+    for coords_dict in coords_list:
+        local_name = find_name(bot.get_object_local, coords_dict)
+        simbad_name = find_name(bot.get_object_simbad, coords_dict)
+        if local_name != simbad_name:
+            print 'Mismatch at {ra}, {dec}:'.format(**coords_dict),
+            print local_name, simbad_name
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], *[int(arg) for arg in sys.argv[2:]])
@@ -0,0 +1,57 @@
+"""
+Simulate many followers asking about the same place at once.
+
+Usage: python -m benchmarks.coalescing [n_requests] [latency_seconds]
+
+Threads call Bot.get_sky for the same location at the same moment, against
+the stand-in services with a fixed network latency, first with coalescing
+switched off and then on. The total time, the lookup latencies and the
+number of coalesced lookups are printed for each.
+"""
+import datetime
+import sys
+import threading
+import time
+
+from bot import Bot
+from benchmarks import summarise
+from benchmarks import standins
+
+
+def run(wam_bot, n_requests, latency):
+    """Make the lookups on threads, and return their latencies."""
+    table = standins.synthetic_simbad_table()
+    location = {'lat': 51.5073509, 'lng': -0.1277583}
+    at_time = datetime.datetime(2015, 3, 20, 9, 30)
+    latencies = []
+    def look_up():
+        start = time.time()
+        wam_bot.get_sky(location, at_time)
+        latencies.append(time.time() - start)
+    with standins.stand_ins(wam_bot, simbad_table=table,
+                            image_bytes=standins.aladin_jpeg(),
+                            latency=latency):
+        threads = [threading.Thread(target=look_up)
+                   for _ in xrange(n_requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return latencies
+
+def main(n_requests=50, latency=0.2):
+    for coalesce_seconds in (0, 10.0):
+        wam_bot = Bot(coalesce_seconds=coalesce_seconds)
+        start = time.time()
+        latencies = run(wam_bot, n_requests, latency)
+        print 'Coalescing {}: {:.2f} s in total'.format(
+            'on' if coalesce_seconds else 'off', time.time() - start)
+        summarise('  lookups', latencies)
+        print '  coalesced: {} of {}'.format(
+            wam_bot.single_flight.n_coalesced, n_requests)
+
+
+if __name__ == '__main__':
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    main(n_requests, latency)
@@ -0,0 +1,78 @@
+"""
+Time the image stage of a reply, from Aladin's JPEG to the bytes uploaded.
+
+Usage: python -m benchmarks.image_pipeline [n_replies]
+
+The old stage converted the whole preview to RGB before cropping it, and
+then encoded the crop separately for Twitter and for WordPress. The new one
+crops first and encodes once, and both uploads share the bytes. For each,
+the wall and CPU time per reply are printed, along with the peak memory
+(the growth in maximum resident size of a fresh process running the stage).
+"""
+import os
+import resource
+import sys
+from io import BytesIO
+from multiprocessing import Pool
+
+from bot import Bot, jpeg_bytes
+from benchmarks import time_calls, summarise
+from benchmarks import standins
+
+
+def legacy_reply_images(wam_bot, data):
+    """The old image stage, returning the bytes for each upload."""
+    from PIL import Image
+    image = Image.open(BytesIO(data))
+    size = image.size
+    half = wam_bot.n_pix_image / 2
+    image_crop = image.convert(mode='RGB').crop((
+        size[0]/2-half, size[1]/2-half, size[0]/2+half, size[1]/2+half))
+    image_crop.paste(wam_bot.arrow, box=wam_bot.arrow_offset,
+                     mask=wam_bot.arrow)
+    twitter_bytes = image_crop.tobytes('jpeg', image_crop.mode)
+    wordpress_bytes = image_crop.tobytes('jpeg', image_crop.mode)
+    return twitter_bytes, wordpress_bytes
+
+def reply_images(wam_bot, data):
+    """The current image stage, returning the bytes for each upload."""
+    from PIL import Image
+    image = wam_bot.process_image(Image.open(BytesIO(data)))
+    return jpeg_bytes(image), jpeg_bytes(image)
+
+STAGES = [('Convert, crop, encode twice', legacy_reply_images),
+          ('Crop, convert if needed, encode once', reply_images)]
+
+
+def run(stage_idx, n_replies):
+    """Run one stage in this process, and return its timings and memory."""
+    wam_bot = Bot()
+    wam_bot.arrow
+    data = standins.aladin_jpeg()
+    func = STAGES[stage_idx][1]
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        cpu_before = sum(os.times()[:2])
+        latencies = time_calls(func, [(wam_bot, data)] * n_replies)
+        cpu = (sum(os.times()[:2]) - cpu_before) / n_replies
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    finally:
+        sys.stdout = stdout
+    return latencies, cpu, rss_after - rss_before
+
+def main(n_replies=200):
+    for stage_idx, (name, _) in enumerate(STAGES):
+        # A fresh process each, so one stage's peak doesn't hide the other's
+        pool = Pool(1)
+        latencies, cpu, peak_kb = pool.apply(run, (stage_idx, n_replies))
+        pool.close()
+        pool.join()
+        summarise(name, latencies)
+        print '  CPU: {:.3f} ms per reply, peak memory: +{} kB'.format(
+            1000 * cpu, peak_kb)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
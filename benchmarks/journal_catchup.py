@@ -0,0 +1,99 @@
+"""
+Measure the journal: appending, restarting, and catching up on a backlog.
+
+Usage: python -m benchmarks.journal_catchup [n_tweets] [latency_seconds]
+
+The recorded tweets are appended to a journal in a temporary directory,
+syncing after every record and then in batches. Half of them are processed
+before the journal is dropped without being closed, as if the bot had
+crashed, and a new journal on the same directory should carry on from the
+last committed offset. The backlog left over is then processed by worker
+pools of different sizes, each tweet sleeping for `latency` seconds to stand
+in for replying to it.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from journal import Journal
+from workers import WorkerPool
+from benchmarks import standins
+
+
+def sample_tweets(n_tweets, n_users=50):
+    """Return `n_tweets` recorded tweets, from `n_users` different users."""
+    recorded = standins.tweets()
+    tweets = []
+    for idx in xrange(n_tweets):
+        tweet = dict(recorded[idx % len(recorded)])
+        tweet['user'] = {'screen_name': 'user{}'.format(idx % n_users)}
+        tweets.append(tweet)
+    return tweets
+
+def append_rate(tweets, sync_every):
+    """Append the tweets to a new journal and return the tweets per second."""
+    directory = tempfile.mkdtemp()
+    try:
+        journal = Journal(directory, sync_every=sync_every)
+        start = time.time()
+        journal.append_all(tweets)
+        elapsed = time.time() - start
+        journal.close()
+    finally:
+        shutil.rmtree(directory)
+    return len(tweets) / elapsed
+
+def catch_up(directory, n_workers, latency):
+    """Process everything after the committed offset, returning the rate."""
+    journal = Journal(directory)
+    journal.finish()
+    def process(entry):
+        time.sleep(latency)
+        journal.done(entry[0])
+    start = time.time()
+    WorkerPool(process, n_workers=n_workers, report_interval=float('inf'),
+               tweet_of=lambda entry: entry[1]).run(journal.entries())
+    elapsed = time.time() - start
+    journal.close()
+    return journal.n_done, journal.n_done / elapsed
+
+def main(n_tweets=2000, latency=0.005):
+    tweets = sample_tweets(n_tweets)
+    for sync_every in (1, 100):
+        print 'Appending, syncing every {} records: {:.0f} tweets/s'.format(
+            sync_every, append_rate(tweets, sync_every))
+    directory = tempfile.mkdtemp()
+    try:
+        journal = Journal(directory)
+        journal.append_all(tweets)
+        for idx, (offset, _) in enumerate(journal.entries()):
+            journal.done(offset)
+            if idx == n_tweets // 2:
+                break
+        # Crash: nothing more is committed or synced
+        journal.closed.set()
+        stats = journal.stats()
+        restarted = Journal(directory)
+        resumed_at = next(restarted.entries())[0]
+        restarted.close()
+        print 'Processed {} of {}, committed offset {}, resumed at {}'.format(
+            n_tweets // 2 + 1, n_tweets, stats['committed'], resumed_at)
+        for n_workers in (1, 4, 16):
+            backlog = Journal(directory)
+            backlog_bytes = backlog.stats()['backlog_bytes']
+            backlog.close()
+            n_processed, rate = catch_up(directory, n_workers, latency)
+            # Put the committed offset back for the next pool size
+            with open(os.path.join(directory, 'committed'), 'w') as f:
+                f.write(str(stats['committed']))
+            print ('Catching up on {} tweets ({:.0f} kB) with {} workers: '
+                   '{:.0f} tweets/s').format(
+                       n_processed, backlog_bytes / 1e3, n_workers, rate)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,40 @@
+"""
+Time finding locations in tweets with the local gazetteer.
+
+Usage: python -m benchmarks.location_tagger gazetteer.txt [repeat]
+
+Loads the gazetteer, then finds the location in the text of each recorded
+tweet and in the text behind the recorded text-processing.com output. For
+comparison, the time to pick the location out of the recorded tagger output
+is shown too. That excludes the round trip to text-processing.com itself,
+which is usually hundreds of milliseconds.
+"""
+import json
+import sys
+import time
+
+from gazetteer import Gazetteer
+from bot import find_location_in_tags
+from benchmarks import time_calls, summarise
+from benchmarks import standins
+
+
+def main(filename, repeat=1000):
+    start = time.time()
+    gazetteer = Gazetteer.load(filename)
+    print 'Loaded {} place names in {:.2f} s'.format(
+        gazetteer.n_names, time.time() - start)
+    tagged = json.loads(standins.fixture('text_processing_iob.json'))['text']
+    tagged_text = ' '.join(line.split()[0] for line in tagged.split('\n'))
+    texts = [tweet['text'] for tweet in standins.tweets()] + [tagged_text]
+    for text in texts:
+        print u'{!r} -> {!r}'.format(text[:40], gazetteer.find_location(text))
+    summarise('Gazetteer', time_calls(
+        gazetteer.find_location, [(text,) for text in texts] * repeat))
+    print 'Tagger output gives {!r}'.format(find_location_in_tags(tagged))
+    summarise('Reading tagger output (no round trip)', time_calls(
+        find_location_in_tags, [(tagged,)] * repeat))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], *[int(arg) for arg in sys.argv[2:]])
@@ -0,0 +1,75 @@
+"""
+Measure the cost of the stage metrics themselves.
+
+Usage: python -m benchmarks.metrics_overhead [n_observations]
+
+Times an empty block with and without a metrics timer around it, with and
+without the JSON log, and how long rendering and scraping the Prometheus
+text takes once every stage and tweet type has some observations. A reply
+involves about ten timed stages, so the per-observation cost should be a
+few microseconds at most against replies that take seconds.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib
+
+import numpy as np
+
+from metrics import Metrics
+from benchmarks import time_calls, summarise
+
+STAGES = ('parse_tweet', 'process_tweet', 'location', 'ra_dec', 'obj',
+          'processed_image', 'wp_image', 'media_id', 'link', 'reply_text',
+          'sent')
+TWEET_TYPES = ('request', 'location', 'follow', 'unfollow', 'mention',
+               'other', 'not_tweet')
+
+
+def timed_blocks(metrics, n):
+    """Run `n` empty blocks, each inside a timer if metrics are given."""
+    start = time.time()
+    if metrics is None:
+        for _ in xrange(n):
+            pass
+    else:
+        for _ in xrange(n):
+            with metrics.timer('obj', 'request'):
+                pass
+    return time.time() - start
+
+def fill(metrics, seed=0):
+    """Give every stage and tweet type some observations."""
+    random_state = np.random.RandomState(seed)
+    for stage in STAGES:
+        for tweet_type in TWEET_TYPES:
+            for seconds in random_state.lognormal(-1, 1.5, 100):
+                metrics.observe(stage, tweet_type, seconds)
+
+def main(n=100000, port=9466):
+    directory = tempfile.mkdtemp()
+    try:
+        bare = timed_blocks(None, n)
+        in_memory = timed_blocks(Metrics(), n)
+        logged = timed_blocks(
+            Metrics(log_filename=os.path.join(directory, 'metrics.log')), n)
+    finally:
+        shutil.rmtree(directory)
+    print 'Per observation, {} observations:'.format(n)
+    print '  in memory: {:.2f} us'.format(1e6 * (in_memory - bare) / n)
+    print '  with JSON log: {:.2f} us'.format(1e6 * (logged - bare) / n)
+    metrics = Metrics()
+    fill(metrics)
+    summarise('Render {} series'.format(len(STAGES) * len(TWEET_TYPES)),
+              time_calls(metrics.render, [()] * 100))
+    metrics.serve(port)
+    url = 'http://127.0.0.1:{}/metrics'.format(port)
+    summarise('Scrape over HTTP',
+              time_calls(lambda: urllib.urlopen(url).read(), [()] * 100))
+    metrics.server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
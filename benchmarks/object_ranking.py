@@ -0,0 +1,61 @@
+"""
+Time ranking the objects in a cone, against just taking the closest.
+
+Usage: python -m benchmarks.object_ranking [repeat]
+
+Cones of random objects are made at several sizes, with types drawn in
+proportion to the census counts. For each size the time to pick the
+closest object and the time to rank every candidate are printed, along
+with how often each choice is one of the two commonest types.
+"""
+import sys
+
+import numpy as np
+
+from otype import OTYPES_LIST, OTYPE_COUNTS
+from ranking import Ranker
+from benchmarks import time_calls, summarise
+
+SIZES = (100, 1000, 10000, 100000)
+COMMONEST = ('Star', 'IR')
+
+
+def random_cones(n_cones, n_rows, radius, seed=0):
+    """Return (otypes, separations, mags) for some random cones."""
+    random_state = np.random.RandomState(seed)
+    names = np.array([otype.name for otype in OTYPES_LIST])
+    weights = np.array([OTYPE_COUNTS.get(name, 0) for name in names],
+                       dtype=float)
+    cones = []
+    for _ in xrange(n_cones):
+        otypes = random_state.choice(names, n_rows, p=weights / weights.sum())
+        separations = radius * np.sqrt(random_state.rand(n_rows))
+        mags = random_state.uniform(5.0, 20.0, n_rows)
+        mags[random_state.rand(n_rows) < 0.5] = np.nan
+        cones.append((otypes, separations, mags))
+    return cones
+
+def main(repeat=50):
+    radius = 0.25
+    ranker = Ranker()
+    for n_rows in SIZES:
+        cones = random_cones(repeat, n_rows, radius)
+        print '{} rows per cone'.format(n_rows)
+        closest = time_calls(lambda o, s, m: np.argmin(s), cones)
+        summarise('  closest', closest)
+        ranked = time_calls(
+            lambda o, s, m: ranker.best(o, s, m, radius), cones)
+        summarise('  ranked', ranked)
+        print '  ranking: {:.3f} us per row'.format(
+            1e6 * np.median(ranked) / n_rows)
+        for name, choose in [
+                ('closest', lambda o, s, m: np.argmin(s)),
+                ('ranked', lambda o, s, m: ranker.best(o, s, m, radius))]:
+            common = np.mean([cone[0][choose(*cone)] in COMMONEST
+                              for cone in cones])
+            print '  {} is a {} {:.0%} of the time'.format(
+                name, ' or '.join(COMMONEST), common)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,71 @@
+"""
+Time picking the closest object out of recorded Simbad results.
+
+Usage:
+    python -m benchmarks.object_selection record ra dec output.xml
+    python -m benchmarks.object_selection simbad_1.xml [simbad_2.xml ...]
+
+Recording saves the result of a live cone search as a VOTable. Timing runs
+the original row-by-row selection (regexes and a SkyCoord for every row)
+and the vectorised Bot.closest_object on each table, and checks that both
+choose the same object.
+"""
+import re
+import sys
+
+import numpy as np
+from astropy import coordinates
+import astropy.units as u
+from astropy.table import Table
+
+from bot import Bot, SEARCH_RADIUS
+from sky import parse_sexagesimal
+from benchmarks import time_calls, summarise
+
+
+def legacy_closest_name(table, coords_dict):
+    """The selection get_object used to do, returning the object's name."""
+    coords = coordinates.SkyCoord(
+        ra=coords_dict['ra'], dec=coords_dict['dec'], unit=(u.deg, u.deg))
+    keep = np.array([bool(re.match(r'.+ .+ .+\..+', line['RA'])) and
+                     bool(re.match(r'.+ .+ .+\..+', line['DEC']))
+                     for line in table])
+    trimmed_result = table[keep]
+    coords_result = coordinates.SkyCoord(
+        ra=trimmed_result['RA'], dec=trimmed_result['DEC'],
+        unit=(u.hour, u.deg))
+    idx = np.argmin(coords_result.separation(coords))
+    return trimmed_result[idx]['MAIN_ID']
+
+def cone_centre(table):
+    """Guess the centre of a recorded cone from the positions in it."""
+    return {'ra': np.median(parse_sexagesimal(table['RA'], scale=15.0)),
+            'dec': np.median(parse_sexagesimal(table['DEC']))}
+
+def record(ra, dec, filename):
+    """Save the Simbad result for a cone search as a VOTable."""
+    bot = Bot()
+    coords = coordinates.SkyCoord(ra=ra, dec=dec, unit=(u.deg, u.deg))
+    table = bot.simbad.query_region(coords, radius=SEARCH_RADIUS*u.deg)
+    table.write(filename, format='votable')
+    print 'Saved {} rows to {}'.format(len(table), filename)
+
+def main(filenames, repeat=20):
+    bot = Bot()
+    for filename in filenames:
+        table = Table.read(filename, format='votable')
+        coords_dict = cone_centre(table)
+        args_list = [(table, coords_dict)] * repeat
+        print '{} ({} rows)'.format(filename, len(table))
+        summarise('  row by row', time_calls(legacy_closest_name, args_list))
+        summarise('  vectorised', time_calls(bot.closest_object, args_list))
+        if (legacy_closest_name(table, coords_dict) !=
+                bot.closest_object(table, coords_dict)['name']):
+            print '  Selected objects differ!'
+
+
+if __name__ == '__main__':
+    if sys.argv[1] == 'record':
+        record(float(sys.argv[2]), float(sys.argv[3]), sys.argv[4])
+    else:
+        main(sys.argv[1:])
@@ -0,0 +1,177 @@
+"""
+Time otype.info, which writes the HTML about an object for its WordPress post.
+
+Usage: python -m benchmarks.otype_info [repeat]
+
+The old version walked a chain of if/elif on the object type and built the
+HTML a piece at a time on every call. It is kept here, and both versions
+are run for an object of every type in OTYPES_LIST, with and without a
+magnitude in each visibility bucket. The outputs are checked to be the
+same, and the time per call is printed for each, over all the types and
+over just the ones with a description.
+"""
+import sys
+import time
+
+from otype import OTYPES_LIST, CONTENT, info
+
+MAGS = [None, 2.0, 4.5, 8.0, 11.0, 16.0]
+
+
+def legacy_info(obj):
+    """The old otype.info, kept to check and time the new one against."""
+    if obj['type'] == 'Star':
+        text = '<p>There are around 300 billion stars in our galaxy, the Milky Way. In general, the most massive stars are the most luminous, but they also live for a shorter time. How bright a star appears from Earth also depends on how close to us it is.</p>'
+        links = {
+            "'Stars' on NASA": "http://science.nasa.gov/astrophysics/focus-areas/how-do-stars-form-and-evolve/",
+            "'Star' on Wikipedia": "http://en.wikipedia.org/wiki/Star",
+            "Visualisation of nearby stars": "http://stars.chromeexperiments.com/",
+        }
+    elif obj['type'] == 'IR':
+        text = "<p>We don't know much about this object except that it emits plenty of infrared light. It might be a small, cool star or a distant galaxy."
+        if not obj['mag']:
+            text += " Because it's fainter in visible light than in the infrared, you might not be able to see anything in the image."
+        text += '</p>'
+        links = {
+            "'IR astronomy: overview' on NASA/IPAC": "http://www.ipac.caltech.edu/outreach/Edu/importance.html",
+            "'Infrared astronomy' on Wikipedia": "http://en.wikipedia.org/wiki/Infrared_astronomy",
+            "'Why does infrared astronomy matter?' by Eric Diaz": "http://ericfdiaz.wordpress.com/why-does-infrared-astronomy-matters/",
+        }
+    elif obj['type'] == 'Galaxy':
+        text = "<p>Galaxies can contain hundreds of billions of stars, or sometimes even more. Because they are so far away, we normally can't see the individual stars. Instead we see the total light from all of them together."
+        # if obj['redshift']:
+        #     text += " This particular galaxy has been measured to be about {} light years away.".format(wordify_number(distance(obj['redshift'])))
+        text += '</p>'
+        links = {
+            "'Galaxy' on Wikipedia": "http://en.wikipedia.org/wiki/Galaxy",
+            "Help astronomers classify galaxies at Galaxy Zoo": "http://www.galaxyzoo.org/",
+        }
+    elif obj['type'] == 'Radio':
+        text = "<p>We don't know much about this object except that it emits radio waves. It's probably a distant galaxy, with strong magnetic fields that produce the radio waves we see. Alternatively, it could be a pulsar or other object inside our own galaxy, the Milky Way."
+        if not obj['mag']:
+            text += " Because it's fainter in visible light than in the radio, you might not be able to see anything in the image."
+        text += '</p>'
+        links = {
+            "'What is radio astronomy?' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/everyone/radio-astronomy/index.html",
+            "'Radio astronomy' on Wikipedia": "http://en.wikipedia.org/wiki/Radio_astronomy",
+            "'Radio astronomy' on theSkyNet": "https://www.theskynet.org/science_portals/radio?locale=en",
+        }
+    elif obj['type'] == '*inCl':
+        text = "<p>This star lives within a cluster, that could contain anything from a hundred stars to many hundreds of thousands. The largest star clusters are very stable and long-lived, but smaller ones are gradually pulled apart by gravitational forces as they move around inside the galaxy.</p>"
+        links = {
+            "'Star cluster' on Wikipedia": "http://en.wikipedia.org/wiki/Star_cluster",
+            "'Star clusters' clips on the BBC": "http://www.bbc.co.uk/science/space/universe/sights/star_clusters",
+            "'Star clusters' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/senior/astrophysics/stellarevolution_clusters.html",
+        }
+    elif obj['type'] == 'GinGroup':
+        text = "<p>This galaxy lives inside a group of galaxies, which may contain up to around 50 galaxies in a region of space a few million light years across. Our own galaxy, the Milky Way, lives in a small group like this, called the Local Group."
+        # if obj['redshift']:
+        #     text += " This galaxy has been measured to be about {} light years away.".format(wordify_number(distance(obj['redshift'])))
+        text += '</p>'
+        links = {
+            "'Galaxy group' on Wikipedia": "http://en.wikipedia.org/wiki/Galaxy_group",
+            "'Group environment' on Swinburne COSMOS": "http://astronomy.swin.edu.au/cosmos/G/group+environment",
+        }
+    elif obj['type'] == 'V*':
+        text = "<p>Many stars, including this one, vary in brightness over time. There are many things that can cause this, such as changes in the size of the star. Alternatively, if there are two stars orbiting each other they might periodically block some of each other's light.</p>"
+        links = {
+            "'Variable star' on Wikipedia": "http://en.wikipedia.org/wiki/Variable_star",
+            "'Variable stars' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/senior/astrophysics/variable_types.html",
+            "The American Association of Variable Star Observers": "http://www.aavso.org/public",
+            "'Types of variable stars' on space.com": "http://www.space.com/15396-variable-stars.html",
+        }
+    elif obj['type'] == 'X':
+        text = "<p>We don't know much about this object except that it emits X-ray radiation. This means that, whatever it is, it must be extremely hot: millions of degrees Celcius. The Earth's atmosphere absorbs X-rays, so we can only observe these objects using telescopes on satellites or high-altitude balloons."
+        if not obj['mag']:
+            text += " Because {} is fainter in visible light than in X-rays, you might not be able to see anything in the image.".format(obj['name'])
+        text += '</p>'
+        links = {
+            "'X-ray astronomy' on Wikipedia": "http://en.wikipedia.org/wiki/X-ray_astronomy",
+            "'History of X-ray astronomy' by NASA's Chandra X-ray Observatory": "http://chandra.harvard.edu/xray_astro/history.html",
+            "'X-rays reveal the violent side of the universe' by EarthSky": "http://earthsky.org/astronomy-essentials/x-rays-reveal-the-violent-side-of-the-universe",
+        }
+    elif obj['type'] == 'QSO':
+        text = "<p>A quasar, or quasi-stellar object (QSO), occurs when a large amount of material is falling onto the supermassive black hole in the centre of a galaxy. This material can get heated up until it shines brighter than the galaxy itself. Quasars are some of the most luminous objects ever seen in the universe."
+        # if obj['redshift']:
+        #     text += " This particular quasar has been measured to be about {} light years away.".format(wordify_number(distance(obj['redshift'])))
+        text += '</p>'
+        links = {
+            "'3C273', the first confirmed quasar to be discovered, on Wikipedia": "http://en.wikipedia.org/wiki/3C_273",
+            "'Quasar' on Wikipedia": "http://en.wikipedia.org/wiki/Quasar",
+            "'What is a quasar?' on Universe Today": "http://www.universetoday.com/73222/what-is-a-quasar/",
+        }
+    elif obj['type'] == 'PM*':
+        text = "<p>This star has a high 'proper motion', which means that it is moving relatively fast across the sky. However, because they are so far away, even the 'fastest' stars move very slowly: the highest proper motion of any star is just one degree every 350 years.</p>"
+        links = {
+            "'Proper motion' on Wikipedia": "http://en.wikipedia.org/wiki/Proper_motion",
+            "'Stellar motions' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/senior/astrophysics/proper_motion.html",
+            "'The motion of stars' by Courtney Seligman": "http://cseligman.com/text/stars/propermotion.htm",
+        }
+    elif obj['type'] == 'Candidate_RGB*':
+        text = "<p>This star may be a red giant branch star, although we don't know for sure. Stars on the red giant branch are running out of the hydrogen fuel that keeps them lit up for most of their lives. Their core has been entirely converted into helium, while the remaining hydrogen is in an outer shell.</p>"
+        links = {
+            "'Red giant' on Wikipedia": "http://en.wikipedia.org/wiki/Red_giant",
+            "'Post main sequence stars' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/senior/astrophysics/stellarevolution_postmain.html",
+            "'The transition to the red giant phase for sun-like stars' by Penn State University": "https://www.e-education.psu.edu/astro801/content/l6_p2.html",
+        }
+    elif obj['type'] == 'LensingEv':
+        text = "<p>A lensing event can occur when one object, such as a star, passes in front of another. If the alignment is just right, the gravity of the first object acts as a lens for the light of the second object, making it appear brighter for a short amount of time.</p>"
+        links = {
+            "'Gravitational microlensing' on Wikipedia": "http://en.wikipedia.org/wiki/Gravitational_microlensing",
+            "'Gravitational microlensing' by Las Cumbres Observatory": "http://lcogt.net/spacebook/gravitational-microlensing",
+        }
+    else:
+        text = ''
+        links = {}
+    if obj['mag']:
+        text += '<p>{} has a magnitude of {:.1f}, '.format(obj['name'], obj['mag'])
+        if obj['mag'] < 3.0:
+            text += 'which means it can be seen quite easily with the naked eye.'
+        elif obj['mag'] < 6.0:
+            text += 'which means it can be seen with the naked eye on a dark night.'
+        elif obj['mag'] < 9.5:
+            text += 'which means it can be seen with a good pair of binoculars.'
+        elif obj['mag'] < 13.0:
+            text += 'which means it can be seen with a good telescope.'
+        else:
+            text += 'which means it is too faint to be seen without a professional-quality telescope.'
+        text += '</p>'
+    if links:
+        text += '<p>You can learn more by following these links:<ul>'
+        for description, url in links.items():
+            text += '<li><a href="{}">{}</a></li>'.format(url, description)
+        text += '</ul></p>'
+    return text
+
+
+def objects():
+    """Return one object of each type for each magnitude."""
+    return [{'name': 'NGC {}'.format(idx), 'type': otype.name, 'mag': mag}
+            for idx, otype in enumerate(OTYPES_LIST) for mag in MAGS]
+
+def time_per_call(func, objs, repeat):
+    """Return the mean time of one call of `func`, in seconds."""
+    start = time.time()
+    for _ in xrange(repeat):
+        for obj in objs:
+            func(obj)
+    return (time.time() - start) / (repeat * len(objs))
+
+def main(repeat=20):
+    objs = objects()
+    different = [obj for obj in objs if info(obj) != legacy_info(obj)]
+    print '{} objects of {} types, {} with different HTML'.format(
+        len(objs), len(OTYPES_LIST), len(different))
+    for obj in different[:5]:
+        print '  {type}, mag {mag}'.format(**obj)
+    described = [obj for obj in objs if obj['type'] in CONTENT]
+    for name, func in [('if/elif chain', legacy_info),
+                       ('content registry', info)]:
+        print '{}: {:.2f} us per call, {:.2f} us for the {} described types'\
+            .format(name, 1e6 * time_per_call(func, objs, repeat),
+                    1e6 * time_per_call(func, described, repeat),
+                    len(CONTENT))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,74 @@
+"""
+Measure the place name prescreen's size, error rate and speed.
+
+Usage: python -m benchmarks.prescreen gazetteer.txt [false_positive_rate]
+
+Builds the prescreen from a gazetteer and prints its memory use and the
+false positive rate expected from its fill. The rate is then measured with
+random strings that can't be place names, and with tweets made of common
+English words. Every name in the gazetteer is checked to be let through.
+"""
+import codecs
+import sys
+import time
+
+import numpy as np
+
+from bloom import Prescreen
+from benchmarks import time_calls, summarise
+from benchmarks import standins
+
+COMMON_WORDS = (
+    'the be to of and a in that have I it for not on with he as you do at '
+    'this but his by from they we say her she or an will my one all would '
+    'there their what so up out if about who get which go me when make can '
+    'like time no just him know take people into year your good some could '
+    'them see other than then now look only come its over think also back '
+    'after use two how our work first well way even new want because any '
+    'these give day most us lol omg tonight coffee love happy great').split()
+
+
+def random_strings(n, seed=0):
+    """Return `n` random lowercase strings that aren't real words."""
+    random_state = np.random.RandomState(seed)
+    letters = np.array(list('bcdfghjklmnpqrstvwxz'))
+    return [u''.join(random_state.choice(letters, random_state.randint(5, 12)))
+            for _ in xrange(n)]
+
+def common_word_tweets(n, seed=0):
+    """Return `n` tweets of 8-20 common words, none of them place names."""
+    random_state = np.random.RandomState(seed)
+    return [u' '.join(random_state.choice(COMMON_WORDS,
+                                          random_state.randint(8, 21)))
+            for _ in xrange(n)]
+
+def main(filename, false_positive_rate=0.01, n=100000):
+    start = time.time()
+    prescreen = Prescreen.from_gazetteer(filename, false_positive_rate)
+    stats = prescreen.stats()
+    print 'Built from {} keys in {:.1f} s'.format(
+        stats['n_keys'], time.time() - start)
+    print 'Memory: {:.1f} kB ({:.1f} bits per key)'.format(
+        stats['n_bytes'] / 1e3, 8.0 * stats['n_bytes'] / stats['n_keys'])
+    print 'Expected false positive rate per key: {:.3%}'.format(
+        stats['false_positive_rate'])
+    strings = random_strings(n)
+    measured = np.mean([s in prescreen.bloom_filter for s in strings])
+    print 'Measured false positive rate per key: {:.3%}'.format(measured)
+    with codecs.open(filename, encoding='utf-8') as f:
+        names = [line.strip() for line in f if line.strip()]
+    missed = [name for name in names
+              if not prescreen.might_contain_location(name)]
+    print 'Place names rejected: {} of {}'.format(len(missed), len(names))
+    tweets = common_word_tweets(n // 10)
+    passed = np.mean([prescreen.might_contain_location(t) for t in tweets])
+    print 'Tweets without place names let through: {:.2%}'.format(passed)
+    print 'Recorded tweets let through: {}'.format(
+        [prescreen.might_contain_location(tweet['text'])
+         for tweet in standins.tweets()])
+    summarise('Check one tweet', time_calls(
+        prescreen.might_contain_location, [(t,) for t in tweets]))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], *[float(arg) for arg in sys.argv[2:]])
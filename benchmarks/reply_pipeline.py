@@ -0,0 +1,54 @@
+"""
+Compare running the reply stages in sequence and as a dependency graph.
+
+Usage: python -m benchmarks.reply_pipeline [n_replies]
+
+The stages sleep for typical latencies of the real services, so this shows
+how much of the end-to-end time the graph can overlap.
+"""
+import sys
+import time
+
+from pipeline import Stage, run_stages
+from benchmarks import summarise
+
+# Typical latency in seconds of each stage, and the stages it needs
+STAGE_LATENCIES = [
+    ('location', 0.3, ['location_name']),
+    ('ra_dec', 0.0, ['location']),
+    ('obj', 1.0, ['ra_dec']),
+    ('image', 0.8, ['obj']),
+    ('processed_image', 0.05, ['image', 'obj']),
+    ('wp_image', 1.0, ['processed_image']),
+    ('media_id', 0.8, ['processed_image']),
+    ('link', 1.2, ['obj', 'location', 'wp_image']),
+    ('reply_text', 0.0, ['obj', 'link']),
+    ('sent', 0.4, ['reply_text', 'media_id']),
+]
+
+
+def sleeper(latency):
+    """Return a stage function that just waits."""
+    def stage(*args):
+        time.sleep(latency)
+    return stage
+
+def main(n_replies=5):
+    sequential = []
+    concurrent = []
+    stages = [Stage(name, sleeper(latency), requires)
+              for name, latency, requires in STAGE_LATENCIES]
+    for _ in xrange(n_replies):
+        start = time.time()
+        for name, latency, requires in STAGE_LATENCIES:
+            sleeper(latency)()
+        sequential.append(time.time() - start)
+        start = time.time()
+        run_stages(stages, location_name='London')
+        concurrent.append(time.time() - start)
+    summarise('sequential', sequential)
+    summarise('graph', concurrent)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,91 @@
+"""
+Measure the result store once it holds a busy week of tweets and answers.
+
+Usage: python -m benchmarks.result_store [n_handled] [n_answers] [n_calls]
+
+A store in a temporary file is filled with `n_handled` handled tweets and
+`n_answers` answers, then each operation the bot makes is timed against it:
+claiming new and already handled tweets, looking up answers that are and
+aren't there, storing an answer, and pruning.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from results import ResultStore, answer_key
+from benchmarks import time_calls, summarise
+
+OBJ = {'name': 'V* V1057 Cyg', 'type': 'Or*', 'mag': 11.6,
+       'coords': (313.8, 44.26)}
+LINK = 'http://whatsaboveme.wordpress.com/2014/11/08/v-v1057-cyg/'
+
+BATCH = 100000
+
+
+def random_keys(n, random_state):
+    """Return `n` (lat, lng, bucket) keys."""
+    lat = 180.0 * random_state.rand(n) - 90.0
+    lng = 360.0 * random_state.rand(n) - 180.0
+    bucket = random_state.randint(0, 10 ** 6, n)
+    return [(round(a, 4), round(o, 4), int(b))
+            for a, o, b in zip(lat, lng, bucket)]
+
+def fill(store, n_handled, n_answers, random_state):
+    """Insert the handled tweets and answers in batches."""
+    now = time.time()
+    for start in xrange(0, n_handled, BATCH):
+        stop = min(start + BATCH, n_handled)
+        store.connection.executemany(
+            'INSERT INTO handled VALUES (?, ?, 1)',
+            ((idx, now) for idx in xrange(start, stop)))
+    answer = ('{"obj": {"name": "V* V1057 Cyg", "type": "Or*"}, '
+              '"link": "' + LINK + '", "media_id": 1}')
+    keys = random_keys(n_answers, random_state)
+    for start in xrange(0, n_answers, BATCH):
+        store.connection.executemany(
+            'INSERT OR REPLACE INTO answers VALUES (?, ?, ?)',
+            ((answer_key(key), answer, now)
+             for key in keys[start:start+BATCH]))
+    store.connection.commit()
+    return keys
+
+def main(n_handled=2000000, n_answers=1000000, n_calls=2000):
+    random_state = np.random.RandomState(0)
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'results.db')
+        store = ResultStore(filename, prune_every=10 ** 9)
+        start = time.time()
+        keys = fill(store, n_handled, n_answers, random_state)
+        print 'Filled {} handled and {} answers in {:.1f} s, {:.0f} MB'.format(
+            n_handled, n_answers, time.time() - start,
+            os.path.getsize(filename) / 1e6)
+        new_ids = [(n_handled + idx,) for idx in xrange(n_calls)]
+        old_ids = [(int(idx),) for idx in
+                   random_state.randint(0, n_handled, n_calls)]
+        summarise('claim, new tweet', time_calls(store.claim, new_ids))
+        summarise('claim, already handled', time_calls(store.claim, old_ids))
+        hits = [(keys[idx],) for idx in
+                random_state.randint(0, n_answers, n_calls)]
+        misses = [(key,) for key in random_keys(n_calls, random_state)]
+        summarise('get_answer, hit', time_calls(store.get_answer, hits))
+        summarise('get_answer, miss', time_calls(store.get_answer, misses))
+        summarise('put_answer', time_calls(
+            store.put_answer,
+            [(args[0], OBJ, LINK, 1) for args in misses]))
+        # Nothing has expired, so this is the cost of checking each table
+        summarise('prune, nothing expired', time_calls(store.prune, [()]))
+        store.answer_ttl = 0
+        summarise('prune, every answer expired',
+                  time_calls(store.prune, [()]))
+        print store.stats()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,43 @@
+"""
+Simulate a burst of sampled tweets arriving alongside direct requests.
+
+Usage: python -m benchmarks.scheduler_burst [n_location] [n_request]
+
+Worker threads push a burst of low priority 'location' tweets and a steady
+trickle of 'request' tweets through a Scheduler with small, fast-refilling
+buckets, so the run takes seconds rather than hours. The wait times and
+drops for each tweet type are printed: requests should wait little, while
+sampled tweets absorb the delay or are dropped.
+"""
+import sys
+import threading
+import time
+
+from scheduler import Scheduler, COSTS
+
+
+def main(n_location=200, n_request=20, n_workers=8):
+    rate_limits = dict((api, (20.0, 20)) for api in
+                       ('google', 'simbad', 'aladin', 'wordpress', 'twitter',
+                        'friendships'))
+    scheduler = Scheduler(rate_limits=rate_limits, max_low_priority_wait=2.0)
+    def burst(tweet_type, n, interval):
+        for _ in xrange(n):
+            scheduler.acquire(tweet_type, COSTS[tweet_type])
+            time.sleep(interval)
+    threads = [threading.Thread(target=burst, args=(
+                   'location', n_location // (n_workers - 1), 0.0))
+               for _ in xrange(n_workers - 1)]
+    threads.append(threading.Thread(target=burst,
+                                    args=('request', n_request, 0.1)))
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print 'Finished in {:.1f} s'.format(time.time() - start)
+    scheduler.report()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
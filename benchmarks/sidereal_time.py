@@ -0,0 +1,79 @@
+"""
+Check the sidereal time kernel against astropy, and time them both.
+
+Usage: python -m benchmarks.sidereal_time
+
+The accuracy check compares the ra overhead from the kernel with astropy's,
+given the same times as datetimes, at many times spread over a century
+(1972-2071, i.e. the era of leap seconds) and at times throughout each day
+ending in a leap second. Older versions of astropy, such as the 0.4.1 in
+requirements.txt, don't know about the most recent leap seconds, so the check
+stops at the first one the installed astropy is missing. The script exits
+with status 1 if the kernel and astropy disagree.
+"""
+import datetime
+import time
+
+import numpy as np
+import pytz
+
+from sidereal import (lst_degrees, unix_seconds, LEAP_SECONDS,
+                      LEAP_SECOND_TIMES)
+from benchmarks import time_calls, summarise
+
+
+def astropy_leap_seconds():
+    """Return how many entries of LEAP_SECONDS the installed astropy has."""
+    from astropy.time import Time
+    for idx, (date, offset) in enumerate(LEAP_SECONDS):
+        at_time = Time(datetime.datetime(*date), scale='utc')
+        if round((at_time.tai.mjd - at_time.mjd) * 86400.0) != offset:
+            return idx
+    return len(LEAP_SECONDS)
+
+def check_accuracy(n_times=100000, tolerance=1e-3):
+    """Print the worst disagreement with astropy, in arcsec."""
+    import astropy
+    start = unix_seconds(np.datetime64('1972-01-01'))
+    end = unix_seconds(np.datetime64('2072-01-01'))
+    n_known = astropy_leap_seconds()
+    if n_known < len(LEAP_SECONDS):
+        end = LEAP_SECOND_TIMES[n_known] - 1.0
+        print ('astropy {} has no leap second on {:04d}-{:02d}-{:02d}; '
+               'checking until then').format(
+                   astropy.__version__, *LEAP_SECONDS[n_known][0])
+    times = np.concatenate((
+        np.linspace(start, end, n_times),
+        # Either side of, and through, each leap second day
+        # (the first entry is the start of the table, not a leap second)
+        (LEAP_SECOND_TIMES[1:n_known, np.newaxis] +
+         np.linspace(-90000, 3600, 50)).ravel()))
+    times = times[times <= end]
+    datetimes = [datetime.datetime.utcfromtimestamp(unix) for unix in times]
+    diff = (lst_degrees(0.0, datetimes) -
+            lst_degrees(0.0, datetimes, use_astropy=True))
+    worst = np.max(np.abs((diff + 180.0) % 360.0 - 180.0)) * 3600.0
+    print 'Worst difference from astropy {}: {:.2e} arcsec'.format(
+        astropy.__version__, worst)
+    if worst > tolerance:
+        print 'Sidereal time kernel disagrees with astropy!'
+        raise SystemExit(1)
+
+def main():
+    check_accuracy()
+    now = datetime.datetime.now(pytz.utc)
+    args_list = [(-0.1, now)] * 1000
+    summarise('kernel per call', time_calls(lst_degrees, args_list))
+    summarise('astropy per call',
+              time_calls(lambda lng, at_time: lst_degrees(
+                  lng, at_time, use_astropy=True), args_list[:100]))
+    times = time.time() + 86400 * 365 * np.random.rand(1000000)
+    for use_astropy in (False, True):
+        start = time.time()
+        lst_degrees(-0.1, times, use_astropy=use_astropy)
+        print '{} per million: {:.3f} s'.format(
+            'astropy' if use_astropy else 'kernel', time.time() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Time each stage of replying to a tweet, in isolation and without the network.
+
+Usage: python -m benchmarks.stages [--save-baseline] [repeat]
+
+Every service is replaced by the stand-ins in benchmarks/standins.py, which
+replay the recorded Google, text-processing and tweet responses in
+benchmarks/fixtures, including very long tweets. No Simbad cones or Aladin
+previews are recorded there yet, so unless some are added (see
+benchmarks/standins.py) get_object runs on a synthetic dense cone in the
+galactic plane and the image stages on a noise image.
+
+For each stage the latency distribution is printed, along with the peak
+memory of one call: the growth in maximum resident size of a forked copy of
+this process making the call. The median latencies are compared against the
+saved baseline, and any stage that has got slower is flagged.
+"""
+import datetime
+import os
+import resource
+import sys
+
+import otype
+from bot import Bot, LocationNotFoundError
+from benchmarks import time_calls, summarise, check_baseline
+from benchmarks import standins
+
+# An object with a long name and description, for the tightest replies
+LONG_OBJECT = {'name': 'SDSS J123456.78+123456.7 [ABC2014] 1234',
+               'type': 'PartofCloud'}
+
+
+def peak_memory(func, args):
+    """
+    Return how much one call grows the peak resident size, in kB, or None.
+
+    The call is made in a forked child, so the parent's own peak so far
+    doesn't hide it, while everything already imported and set up is shared.
+    """
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_end)
+            sys.stdout = open(os.devnull, 'w')
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            func(*args)
+            after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            os.write(write_end, str(after - before))
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as f:
+        result = f.read()
+    os.waitpid(pid, 0)
+    return int(result) if result else None
+
+def measure(name, func, args_list, medians):
+    """Time a stage, print its latencies and peak memory, keep the median."""
+    latencies = time_calls(func, args_list)
+    summarise(name, latencies)
+    peak = peak_memory(func, args_list[0])
+    if peak is None:
+        print '  peak memory: n/a (the call failed)'
+    else:
+        print '  peak memory: +{} kB'.format(peak)
+    medians[name] = sorted(latencies)[len(latencies) // 2]
+
+def location_not_found(bot, name):
+    """Look up a place that Google doesn't know."""
+    try:
+        bot.get_location_google(name)
+    except LocationNotFoundError:
+        pass
+
+def main(repeat=20, save=False):
+    bot = Bot(comment_fraction=1.0)
+    tweets = standins.tweets()
+    image_bytes = standins.aladin_jpeg()
+    medians = {}
+    for table_name, table in standins.simbad_tables():
+        print '{} ({} rows)'.format(table_name, len(table))
+        with standins.stand_ins(bot, simbad_table=table,
+                                image_bytes=image_bytes):
+            for tweet in tweets:
+                measure('parse_tweet ({}, {} chars)'.format(
+                            bot.parse_tweet(tweet)['type'], len(tweet['text'])),
+                        bot.parse_tweet, [(tweet,)] * repeat, medians)
+            measure('get_location', bot.get_location_google,
+                    [('London',)] * repeat, medians)
+            location = bot.get_location_google('London')
+            at_time = datetime.datetime(2015, 3, 20, 9, 30)
+            measure('get_ra_dec', bot.get_ra_dec,
+                    [(location, at_time)] * repeat, medians)
+            coords_dict = standins.DENSE_CONE_CENTRE
+            measure('get_object ({})'.format(table_name),
+                    bot.get_object_simbad, [(coords_dict,)] * repeat, medians)
+            obj = bot.get_object_simbad(coords_dict)
+            measure('get_sky_image', bot.get_sky_image,
+                    [(obj['coords'],)] * repeat, medians)
+            image = bot.get_sky_image(obj['coords'])
+            measure('process_image', bot.process_image,
+                    [(image,)] * repeat, medians)
+            measure('construct_reply', bot.construct_reply,
+                    [(LONG_OBJECT, 'http://t.co/abcdefghij',
+                      'a_long_screen_name', True,
+                      'Llanfairpwllgwyngyllgogerychwyrndrobwllllantysiliogogogoch')
+                    ] * repeat, medians)
+    with standins.stand_ins(bot, autocomplete='google_zero_results.json'):
+        measure('get_location (not found)', location_not_found,
+                [(bot, 'Nowhereville')] * repeat, medians)
+    objects = [{'name': 'Example', 'type': o.name, 'mag': 12.0,
+                'redshift': 0.01} for o in otype.OTYPES_LIST]
+    measure('otype.info', otype.info, [(obj,) for obj in objects], medians)
+    check_baseline('stages', medians, save=save)
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--save-baseline']
+    main(repeat=int(args[0]) if args else 20,
+         save='--save-baseline' in sys.argv)
@@ -0,0 +1,181 @@
+"""
+Local stand-ins for the services the bot talks to.
+
+Responses are replayed from the recorded fixtures in benchmarks/fixtures, so
+stages can be timed without any network access. Simbad cones (*.xml) and an
+Aladin preview (aladin.jpeg) are read from recorded files there if present,
+otherwise synthetic ones are generated to the same format. None are
+committed yet. To record them, e.g. a dense cone in the galactic plane, a
+sparse one at high latitude, and the preview for the first:
+
+    python -m benchmarks.object_selection record 266.4 -28.9 \
+        benchmarks/fixtures/simbad_dense_plane.xml
+    python -m benchmarks.object_selection record 180.0 60.0 \
+        benchmarks/fixtures/simbad_sparse_high_latitude.xml
+    python -m benchmarks.standins record-aladin 266.4 -28.9
+"""
+import glob
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+import bot
+import transport
+
+FIXTURE_DIRECTORY = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Centre of the synthetic cone, in a dense part of the galactic plane
+DENSE_CONE_CENTRE = {'ra': 266.4, 'dec': -28.9}
+
+
+class StandInResponse(object):
+    """Enough of a requests response for the bot."""
+
+    def __init__(self, content):
+        self.content = content
+        self.text = content
+        self.status_code = 200
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        pass
+
+
+class StandInSimbad(object):
+    """A Simbad client that always returns the same table."""
+
+    def __init__(self, table, latency=0.0):
+        self.table = table
+        self.latency = latency
+
+    def query_region(self, coords, radius=None):
+        time.sleep(self.latency)
+        return self.table
+
+
+def fixture(name):
+    """Return the contents of a fixture file."""
+    with open(os.path.join(FIXTURE_DIRECTORY, name), 'rb') as f:
+        return f.read()
+
+def tweets():
+    """Return the recorded tweets."""
+    return json.loads(fixture('tweets.json'))
+
+def simbad_tables():
+    """Return the recorded Simbad cones, or a synthetic dense one."""
+    from astropy.table import Table
+    filenames = sorted(glob.glob(os.path.join(FIXTURE_DIRECTORY, '*.xml')))
+    if filenames:
+        return [(os.path.basename(filename),
+                 Table.read(filename, format='votable'))
+                for filename in filenames]
+    return [('synthetic dense cone', synthetic_simbad_table())]
+
+def synthetic_simbad_table(n_rows=5000, centre=DENSE_CONE_CENTRE, seed=0):
+    """Return a Simbad-like table of objects scattered over one cone."""
+    from astropy.table import Table, MaskedColumn
+    random_state = np.random.RandomState(seed)
+    radius = bot.SEARCH_RADIUS * np.sqrt(random_state.rand(n_rows))
+    angle = 2 * np.pi * random_state.rand(n_rows)
+    dec = centre['dec'] + radius * np.sin(angle)
+    ra = centre['ra'] + radius * np.cos(angle) / np.cos(np.radians(dec))
+    ra_strings = []
+    dec_strings = []
+    for idx, (r, d) in enumerate(zip(ra / 15.0, dec)):
+        sign = '-' if d < 0 else '+'
+        d = abs(d)
+        if idx % 10 == 0:
+            # Some positions are only known to low precision
+            ra_strings.append('{:02d} {:04.1f}'.format(
+                int(r), (r % 1) * 60))
+            dec_strings.append('{}{:02d} {:02d}'.format(
+                sign, int(d), int((d % 1) * 60)))
+        else:
+            ra_strings.append('{:02d} {:02d} {:07.4f}'.format(
+                int(r), int((r % 1) * 60), (r * 60 % 1) * 60))
+            dec_strings.append('{}{:02d} {:02d} {:06.3f}'.format(
+                sign, int(d), int((d % 1) * 60), (d * 60 % 1) * 60))
+    table = Table()
+    table['MAIN_ID'] = ['2MASS J{:08d}'.format(idx) for idx in xrange(n_rows)]
+    table['RA'] = ra_strings
+    table['DEC'] = dec_strings
+    table['OTYPE'] = random_state.choice(
+        ['Star', 'IR', '*inCl', 'V*', 'X', 'Radio', 'PN', 'HII'], n_rows)
+    table['ze_redshift'] = MaskedColumn(
+        np.zeros(n_rows), mask=np.ones(n_rows, dtype=bool))
+    table['RVZ_RADVEL'] = MaskedColumn(
+        random_state.normal(0, 50, n_rows),
+        mask=random_state.rand(n_rows) < 0.9)
+    for filt in ['V', 'r', 'B', 'g', 'R', 'i', 'U', 'u', 'I', 'z']:
+        table['FLUX_' + filt] = MaskedColumn(
+            random_state.uniform(8, 20, n_rows),
+            mask=random_state.rand(n_rows) < 0.7)
+    return table
+
+def aladin_jpeg():
+    """Return a recorded Aladin preview, or a synthetic image of the same size."""
+    try:
+        return fixture('aladin.jpeg')
+    except IOError:
+        from PIL import Image
+        image = Image.effect_noise((800, 800), 64).convert('RGB')
+        output = BytesIO()
+        image.save(output, format='JPEG')
+        return output.getvalue()
+
+def record_aladin(ra, dec, filename=None):
+    """Save a live Aladin preview centred on ra, dec as the fixture."""
+    from astropy import coordinates
+    import astropy.units as u
+    if filename is None:
+        filename = os.path.join(FIXTURE_DIRECTORY, 'aladin.jpeg')
+    coords = coordinates.SkyCoord(ra=ra, dec=dec, unit=(u.deg, u.deg))
+    response = transport.get(bot.aladin_url_image(coords))
+    response.raise_for_status()
+    with open(filename, 'wb') as f:
+        f.write(response.content)
+    print 'Saved {} bytes to {}'.format(len(response.content), filename)
+
+@contextmanager
+def stand_ins(wam_bot, simbad_table=None, image_bytes=None,
+              autocomplete='google_autocomplete.json', latency=0.0):
+    """
+    Point a bot at the stand-ins for as long as the context lasts.
+
+    Every response is delayed by `latency` seconds, to mimic the network.
+    """
+    responses = {
+        bot.GOOGLE_URL_AUTOCOMPLETE: fixture(autocomplete),
+        bot.GOOGLE_URL_DETAILS: fixture('google_details.json'),
+        bot.TEXT_PROCESSING_URL: fixture('text_processing_iob.json'),
+        bot.TWITTER_URL_MEDIA_UPLOAD: json.dumps({'media_id_string': '1'}),
+    }
+    aladin_url = bot.ALADIN_URL_IMAGE_BASE.split('?')[0]
+    def respond(url, *args, **kwargs):
+        time.sleep(latency)
+        if url.startswith(aladin_url):
+            return StandInResponse(image_bytes)
+        return StandInResponse(responses[url])
+    original = (transport.get, transport.post, wam_bot.simbad_client)
+    transport.get = respond
+    transport.post = respond
+    wam_bot.simbad_client = StandInSimbad(simbad_table, latency=latency)
+    try:
+        yield
+    finally:
+        (transport.get, transport.post, wam_bot.simbad_client) = original
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'record-aladin':
+        record_aladin(float(sys.argv[2]), float(sys.argv[3]),
+                      *sys.argv[4:5])
+    else:
+        print __doc__
@@ -0,0 +1,69 @@
+"""
+Measure how long the bot takes to start.
+
+Usage: python -m benchmarks.startup [--save-baseline]
+
+Every measurement runs in a fresh interpreter, so nothing has been imported
+already. This reports the import time of bot.py and of each of the heavy
+dependencies it loads lazily, and the time from starting Python to reading
+the first tweet from the stream (using a stand-in for Twitter). Timings are
+compared against the saved baseline to catch regressions.
+"""
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks import check_baseline
+
+MODULES = ['bot', 'numpy', 'scipy.spatial', 'requests', 'astropy.units',
+           'astropy.coordinates', 'astroquery.simbad', 'TwitterAPI',
+           'PIL.Image', 'wordpress_xmlrpc']
+
+IMPORT_SCRIPT = '''
+import time
+start = time.time()
+import {}
+print time.time() - start
+'''
+
+FIRST_READ_SCRIPT = '''
+import os
+import time
+start = time.time()
+import bot
+import TwitterAPI
+
+class StandInTwitter(object):
+    def request(self, resource, params=None):
+        return self
+    def __iter__(self):
+        print time.time() - start
+        os._exit(0)
+
+wam_bot = bot.Bot()
+wam_bot.twitter_api_client = StandInTwitter()
+wam_bot.activate(n_workers=0)
+'''
+
+
+def run_script(script, repeat=3):
+    """Run a script in fresh interpreters and return the median it prints."""
+    times = []
+    for _ in xrange(repeat):
+        output = subprocess.check_output([sys.executable, '-c', script])
+        times.append(float(output.strip().split('\n')[-1]))
+    return np.median(times)
+
+def main(save=False):
+    results = {}
+    for module in MODULES:
+        results['import ' + module] = run_script(IMPORT_SCRIPT.format(module))
+    results['first stream read'] = run_script(FIRST_READ_SCRIPT)
+    for key, value in sorted(results.items()):
+        print '{}: {:.3f} s'.format(key, value)
+    check_baseline('startup', results, save=save)
+
+
+if __name__ == '__main__':
+    main(save='--save-baseline' in sys.argv)
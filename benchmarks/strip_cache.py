@@ -0,0 +1,80 @@
+"""
+Simulate a night of requests from a few places against the strip cache.
+
+Usage: python -m benchmarks.strip_cache [n_objects] [n_places] [hours]
+
+A random sky of objects stands in for Simbad. Each place asks what is
+overhead once a minute, and the strip cache answers. Its answers are
+checked against a brute force search. The number of Simbad queries is
+printed (one per request without the cache), along with the hit rate, the
+rows held and the lookup latency.
+"""
+import sys
+
+import numpy as np
+from astropy.table import Table
+
+from stripcache import StripCache
+from sky import separations
+from sidereal import lst_degrees
+from benchmarks import time_calls, summarise, random_coords
+
+
+def random_sky(n_objects, seed=0):
+    """Return a Simbad-like table of objects spread over the whole sky."""
+    coords = random_coords(n_objects, seed=seed)
+    ra = np.array([c['ra'] for c in coords])
+    dec = np.array([c['dec'] for c in coords])
+    hours = ra / 15.0
+    sign = np.where(dec < 0, '-', '+')
+    dec_abs = np.abs(dec)
+    table = Table()
+    table['MAIN_ID'] = ['Object {}'.format(idx) for idx in xrange(n_objects)]
+    table['RA'] = ['{:02d} {:02d} {:07.4f}'.format(
+        int(h), int(h % 1 * 60), h * 60 % 1 * 60) for h in hours]
+    table['DEC'] = ['{}{:02d} {:02d} {:06.3f}'.format(
+        s, int(d), int(d % 1 * 60), d * 60 % 1 * 60)
+        for s, d in zip(sign, dec_abs)]
+    return table, ra, dec
+
+def main(n_objects=500000, n_places=5, hours=8):
+    table, ra, dec = random_sky(n_objects)
+    queries = []
+    def fetch(ra_min, ra_max, dec_min, dec_max):
+        queries.append((ra_min, ra_max, dec_min, dec_max))
+        keep = ((ra >= ra_min) & (ra < ra_max) &
+                (dec >= dec_min) & (dec <= dec_max))
+        return table[keep] if keep.any() else None
+    strip_cache = StripCache(fetch, 0.25)
+    random_state = np.random.RandomState(1)
+    lat = random_state.uniform(-60, 60, n_places)
+    lng = random_state.uniform(-180, 180, n_places)
+    start = 1426843800.0
+    requests = [(lst_degrees(lng[place], start + 60 * minute), lat[place])
+                for minute in xrange(int(hours * 60))
+                for place in xrange(n_places)]
+    latencies = time_calls(
+        lambda r, d: strip_cache.nearest(r, d, 0.25), requests)
+    wrong = 0
+    for r, d in requests[::50]:
+        found = strip_cache.nearest(r, d, 0.25)
+        seps = separations(ra, dec, r, d)
+        expected = np.argmin(seps) if seps.min() < 0.25 else None
+        if found is None:
+            wrong += expected is not None
+        else:
+            wrong += found[0]['MAIN_ID'][found[1]] != table['MAIN_ID'][expected]
+    stats = strip_cache.stats()
+    print '{} requests, {} Simbad queries ({} without the cache)'.format(
+        len(requests), len(queries), len(requests))
+    print 'Hits: {}, misses: {}, rows held: {}'.format(
+        stats['hits'], stats['misses'], stats['rows'])
+    print 'Wrong answers in {} checked: {}'.format(
+        len(requests[::50]), wrong)
+    summarise('Lookup (including fetches)', latencies)
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    args += [float(arg) for arg in sys.argv[3:]]
+    main(*args)
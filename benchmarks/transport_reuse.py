@@ -0,0 +1,93 @@
+"""
+Compare fresh connections per request against the pooled transport.
+
+Usage: python -m benchmarks.transport_reuse [n_requests] [n_threads]
+
+A local keep-alive HTTP server stands in for an upstream API. The same
+requests are made with a bare requests.get each time (a new connection per
+call, as the bot used to do) and through transport.Transport, from several
+threads at once. Latencies and the number of connections the server had to
+accept are printed for each. Against a real host the saving per connection
+is a TCP and TLS handshake, i.e. several round trips.
+"""
+import sys
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+import numpy as np
+import requests
+
+from transport import Transport
+from benchmarks import summarise
+
+BODY = '{"status": "OK"}'
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Answers every GET with a small JSON body, keeping connections open."""
+
+    protocol_version = 'HTTP/1.1'
+    # Send each response in one packet, or delayed ACKs stall keep-alive
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.n_connections += 1
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadedServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def run_threads(get, url, n_requests, n_threads):
+    """Make `n_requests` GETs spread over threads, and return the latencies."""
+    latencies = []
+    lock = threading.Lock()
+    def work(n):
+        for _ in xrange(n):
+            start = time.time()
+            get(url).content
+            with lock:
+                latencies.append(time.time() - start)
+    threads = [threading.Thread(target=work, args=(n_requests // n_threads,))
+               for _ in xrange(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies)
+
+def main(n_requests=2000, n_threads=4):
+    server = ThreadedServer(('127.0.0.1', 0), KeepAliveHandler)
+    server.lock = threading.Lock()
+    server.n_connections = 0
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = 'http://127.0.0.1:{}/'.format(server.server_address[1])
+    transport = Transport(pool_sizes={'127.0.0.1': n_threads})
+    for name, get in [('new connection each time', requests.get),
+                      ('pooled transport', transport.get)]:
+        server.n_connections = 0
+        latencies = run_threads(get, url, n_requests, n_threads)
+        summarise(name, latencies)
+        print '  connections accepted: {}'.format(server.n_connections)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,124 @@
+"""
+Count and time the XML-RPC calls made to publish a post.
+
+Usage: python -m benchmarks.wordpress_round_trips [n_posts] [latency]
+
+A local XML-RPC server stands in for WordPress, answering wp.uploadFile,
+wp.newPost and wp.getPost after a fixed delay. Posts are published with
+Bot.make_post_with_info, first looking up each permalink with wp.getPost
+(as the bot used to) and then building it from the post ID. The calls,
+connections and latency for each are printed.
+"""
+import datetime
+import sys
+import threading
+import time
+from SimpleXMLRPCServer import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+from SocketServer import ThreadingMixIn
+
+import pytz
+from PIL import Image
+
+import bot
+from benchmarks import time_calls, summarise
+
+OBJECT = {'name': 'M 31', 'type': 'Galaxy', 'mag': 3.4, 'redshift': -0.001}
+
+
+class KeepAliveHandler(SimpleXMLRPCRequestHandler):
+    """Counts connections, and keeps them open between calls."""
+
+    rpc_paths = ('/xmlrpc.php',)
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        SimpleXMLRPCRequestHandler.setup(self)
+        self.server.n_connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInWordPress(object):
+    """The few wp.* methods the bot uses, each taking `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = []
+        self.posts = {}
+
+    def call(self, method, blog_id, username, password, *args):
+        self.calls.append(method)
+        time.sleep(self.latency)
+        if method == 'wp.uploadFile':
+            return {'id': '1', 'file': args[0]['name'],
+                    'url': 'http://example.com/' + args[0]['name'],
+                    'type': args[0]['type']}
+        if method == 'wp.newPost':
+            post_id = str(len(self.posts) + 1)
+            self.posts[post_id] = args[0]
+            return post_id
+        if method == 'wp.getPost':
+            return {'post_id': args[0],
+                    'post_title': self.posts[args[0]]['post_title'],
+                    'link': 'http://example.com/?p=' + args[0]}
+
+    def _dispatch(self, method, params):
+        if method == 'mt.supportedMethods':
+            # Asked once when the client is created
+            return ['wp.uploadFile', 'wp.newPost', 'wp.getPost']
+        return self.call(method, *params)
+
+
+class ThreadedServer(ThreadingMixIn, SimpleXMLRPCServer):
+    """Handles each kept-alive connection on its own thread."""
+
+    daemon_threads = True
+
+
+def serve(latency):
+    """Start the stand-in server and return it."""
+    server = ThreadedServer(('127.0.0.1', 0), KeepAliveHandler,
+                            logRequests=False, allow_none=True)
+    server.n_connections = 0
+    server.wordpress = StandInWordPress(latency)
+    server.register_instance(server.wordpress)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def main(n_posts=20, latency=0.1):
+    from wordpress_xmlrpc import Client
+    server = serve(latency)
+    url = 'http://127.0.0.1:{}/xmlrpc.php'.format(server.server_address[1])
+    image = Image.new('RGB', (400, 400))
+    image.filename = 'M 31.jpeg'
+    at_time = datetime.datetime(2015, 3, 20, 9, 30, tzinfo=pytz.utc)
+    args_list = [(OBJECT, 'London', at_time, pytz.utc, image)] * n_posts
+    template = bot.WORDPRESS_PERMALINK_TEMPLATE
+    for name, permalink_template in [('Looking up permalinks', ''),
+                                     ('Building permalinks', template)]:
+        bot.WORDPRESS_PERMALINK_TEMPLATE = permalink_template
+        wam_bot = bot.Bot()
+        del server.wordpress.calls[:]
+        server.n_connections = 0
+        client = Client(url, 'user', 'password')
+        wam_bot.thread_local.wp_client = client
+        latencies = time_calls(wam_bot.make_post_with_info, args_list)
+        summarise(name, latencies)
+        print '  {:.1f} calls per post, {} connection(s)'.format(
+            len(server.wordpress.calls) / float(n_posts),
+            server.n_connections)
+        client.server('close')()
+    bot.WORDPRESS_PERMALINK_TEMPLATE = template
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    n_posts = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    main(n_posts, latency)
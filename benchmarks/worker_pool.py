@@ -0,0 +1,33 @@
+"""
+Measure WorkerPool throughput against the number of workers.
+
+Usage: python -m benchmarks.worker_pool [n_tweets] [latency_seconds]
+
+Each fake tweet sleeps for a fixed time, standing in for the external API
+calls that dominate a real reply.
+"""
+import sys
+import time
+
+from workers import WorkerPool
+
+
+def fake_stream(n_tweets, n_users=50):
+    """Yield minimal tweets from a handful of users."""
+    for idx in xrange(n_tweets):
+        yield {'id': idx, 'user': {'screen_name': 'user{}'.format(idx % n_users)}}
+
+def main(n_tweets=200, latency=0.05):
+    process = lambda tweet: time.sleep(latency)
+    for n_workers in (1, 2, 4, 8, 16):
+        pool = WorkerPool(process, n_workers=n_workers,
+                          report_interval=float('inf'))
+        start = time.time()
+        pool.run(fake_stream(n_tweets))
+        elapsed = time.time() - start
+        print '{} workers: {:.1f} tweets/s'.format(
+            n_workers, n_tweets / elapsed)
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,50 @@
+"""
+Build zenith grids at several resolutions and time lookups in each.
+
+Usage: python -m benchmarks.zenith_grid catalog.npz [resolution_arcsec ...]
+
+For each resolution this reports the build time, the size of the grid files,
+the fraction of cells that need the kd-tree fallback, and the lookup latency
+compared with querying the catalog's kd-tree directly.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from zenith import SEARCH_RADIUS
+from catalog import LocalCatalog
+from zenithgrid import ZenithGrid, build_grid, grid_size
+from benchmarks import time_calls, summarise, random_coords
+
+
+def main(catalog_filename, resolutions=(600.0, 180.0, 60.0)):
+    catalog = LocalCatalog(catalog_filename)
+    args_list = [(coords['ra'], coords['dec'], SEARCH_RADIUS)
+                 for coords in random_coords(10000)]
+    summarise('kd-tree', time_calls(catalog.nearest, args_list))
+    directory = tempfile.mkdtemp()
+    try:
+        for resolution in resolutions:
+            prefix = os.path.join(directory, 'grid')
+            start = time.time()
+            n_cells = build_grid(catalog, prefix, resolution / 3600.0)
+            build_time = time.time() - start
+            grid = ZenithGrid(prefix, catalog)
+            print '{:.0f} arcsec: {} cells, built in {:.1f} s, {:.1f} MB, ' \
+                '{:.2%} fallback cells'.format(
+                    resolution, n_cells, build_time, grid_size(prefix) / 1e6,
+                    1.0 - np.mean(grid.exact))
+            summarise('  grid', time_calls(grid.nearest, args_list))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        main(sys.argv[1], [float(arg) for arg in sys.argv[2:]])
+    else:
+        main(sys.argv[1])
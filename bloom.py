@@ -0,0 +1,150 @@
+"""
+A quick check of whether a tweet could name a place at all.
+
+A Bloom filter holds every single-word place name, and the first two words
+of every longer one, from a gazetteer. Any tweet that names a place must
+contain one of these, so a tweet with no word or pair of words in the
+filter can be skipped without tagging it. Some tweets without a place name
+get through (false positives), but none with one are rejected.
+
+Usage: python bloom.py gazetteer.txt prescreen.bloom [false_positive_rate]
+"""
+import hashlib
+import math
+import struct
+import sys
+
+from gazetteer import tokenize
+
+HEADER = struct.Struct('<QII')
+
+
+class BloomFilter(object):
+    """A fixed-size set of strings that may give false positives."""
+
+    def __init__(self, n_bits, n_hashes, bits=None, n_items=0):
+        self.n_bits = n_bits
+        self.n_hashes = n_hashes
+        if bits is None:
+            bits = bytearray((n_bits + 7) // 8)
+        self.bits = bits
+        self.n_items = n_items
+
+    @classmethod
+    def for_size(cls, n_items, false_positive_rate=0.01):
+        """Return an empty filter sized for `n_items` at the given rate."""
+        n_items = max(n_items, 1)
+        n_bits = int(math.ceil(
+            -n_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        n_hashes = max(1, int(round(n_bits / float(n_items) * math.log(2))))
+        return cls(n_bits, n_hashes)
+
+    @classmethod
+    def load(cls, filename):
+        """Load a filter saved by save()."""
+        with open(filename, 'rb') as f:
+            n_bits, n_hashes, n_items = HEADER.unpack(f.read(HEADER.size))
+            return cls(n_bits, n_hashes, bytearray(f.read()), n_items)
+
+    def save(self, filename):
+        """Save the filter to a file."""
+        with open(filename, 'wb') as f:
+            f.write(HEADER.pack(self.n_bits, self.n_hashes, self.n_items))
+            f.write(self.bits)
+
+    def positions(self, key):
+        """Return the bits used for a key, by double hashing one digest."""
+        digest = hashlib.md5(key.encode('utf-8')).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return [(h1 + i * h2) % self.n_bits for i in xrange(self.n_hashes)]
+
+    def add(self, key):
+        """Add a key to the filter."""
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.n_items += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self.positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def n_bytes(self):
+        """Memory used by the bits."""
+        return len(self.bits)
+
+    def false_positive_rate(self):
+        """Return the expected false positive rate, from the bits set."""
+        n_set = sum(bin(byte).count('1') for byte in self.bits)
+        return (n_set / float(self.n_bits)) ** self.n_hashes
+
+
+class Prescreen(object):
+    """Rejects text that can't contain any of a gazetteer's place names."""
+
+    def __init__(self, bloom_filter):
+        self.bloom_filter = bloom_filter
+        self.n_checked = 0
+        self.n_rejected = 0
+
+    @classmethod
+    def load(cls, filename):
+        """Load a prescreen saved by build_prescreen()."""
+        return cls(BloomFilter.load(filename))
+
+    @classmethod
+    def from_gazetteer(cls, filename, false_positive_rate=0.01):
+        """Build a prescreen from a gazetteer file of place names."""
+        import codecs
+        keys = set()
+        with codecs.open(filename, encoding='utf-8') as f:
+            for line in f:
+                words = [word.lower() for word in tokenize(line)
+                         if word != ',']
+                if words:
+                    keys.add(' '.join(words[:2]))
+        bloom_filter = BloomFilter.for_size(len(keys), false_positive_rate)
+        for key in keys:
+            bloom_filter.add(key)
+        return cls(bloom_filter)
+
+    def might_contain_location(self, text):
+        """Return False if the text certainly names no place."""
+        self.n_checked += 1
+        words = [word.lower() for word in tokenize(text) if word != ',']
+        for idx, word in enumerate(words):
+            if word in self.bloom_filter:
+                return True
+            if (idx + 1 < len(words) and
+                    word + ' ' + words[idx+1] in self.bloom_filter):
+                return True
+        self.n_rejected += 1
+        return False
+
+    def stats(self):
+        """Return the size, expected error rate and rejections so far."""
+        return {
+            'n_keys': self.bloom_filter.n_items,
+            'n_bytes': self.bloom_filter.n_bytes,
+            'false_positive_rate': self.bloom_filter.false_positive_rate(),
+            'checked': self.n_checked,
+            'rejected': self.n_rejected,
+        }
+
+
+def build_prescreen(gazetteer_filename, filename, false_positive_rate=0.01):
+    """Build a prescreen from a gazetteer file and save it."""
+    prescreen = Prescreen.from_gazetteer(
+        gazetteer_filename, false_positive_rate)
+    prescreen.bloom_filter.save(filename)
+    return prescreen
+
+
+if __name__ == '__main__':
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+    stats = build_prescreen(sys.argv[1], sys.argv[2], rate).stats()
+    print 'Saved {} keys in {:.1f} kB, false positive rate {:.2%}'.format(
+        stats['n_keys'], stats['n_bytes'] / 1e3, stats['false_positive_rate'])
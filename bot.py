@@ -1,36 +1,41 @@
 import os
-import re
 import json
-import urllib
 from io import BytesIO
 import datetime
 import string
+import threading
+import random
 
-import numpy as np
-import requests
-from astropy.time import Time
-from astropy import coordinates
-import astropy.units as u
-from astroquery.simbad import Simbad
-from TwitterAPI import TwitterAPI
-from PIL import Image
-from wordpress_xmlrpc import Client as WordPressClient
-from wordpress_xmlrpc import WordPressPost
-from wordpress_xmlrpc import methods as wordpress_methods
-from wordpress_xmlrpc.compat import xmlrpc_client
 import pytz
 
+# The heavier dependencies (numpy, astropy, astroquery, requests, PIL and the
+# Twitter and WordPress clients) are imported where they are first needed,
+# so that the bot starts reading the stream as soon as possible.
+
 from otype import OTYPES_DICT, info
+from geocache import GeocodeCache
+from workers import WorkerPool
+from pipeline import Stage, run_stages
+from imagecache import ImageCache
+from metrics import Metrics
+from scheduler import Scheduler
+from singleflight import SingleFlight
+from zenith import SEARCH_RADIUS
+import transport
 
 GOOGLE_URL_AUTOCOMPLETE = 'https://maps.googleapis.com/maps/api/place/autocomplete/json'
 GOOGLE_URL_DETAILS = 'https://maps.googleapis.com/maps/api/place/details/json'
 
 TWITTER_URL_MEDIA_UPLOAD = 'https://upload.twitter.com/1.1/media/upload.json'
+TWITTER_URL_REST_BASE = 'https://api.twitter.com/1.1/{}.json'
 
 TEXT_PROCESSING_URL = 'http://text-processing.com/api/tag/'
 
 ALADIN_URL_IMAGE_BASE = 'http://alasky.u-strasbg.fr/cgi/portal/aladin/get-preview-img.py?pos={},{}&rgb=1'
 
+# Quality of the JPEG that is uploaded to Twitter and WordPress and cached
+JPEG_QUALITY = 95
+
 CHARACTERS_MEDIA = 23
 CHARACTERS_URL = 22
 CHARACTERS_MAXIMUM = 140
@@ -60,7 +65,112 @@ except KeyError:
     print 'WordPress password not found.'
     WORDPRESS_PASSWORD = None
 
-START_TIME = Time('2000-01-01 12:00:00.0', scale='utc')
+# Post URLs can be made from their IDs without asking WordPress. WordPress
+# redirects ?p=<id> to the post's permalink. Set this to '' to look the
+# permalink up instead.
+WORDPRESS_PERMALINK_TEMPLATE = os.environ.get(
+    'WORDPRESS_PERMALINK_TEMPLATE',
+    'https://whatsaboveme.wordpress.com/?p={post_id}')
+
+try:
+    CATALOG_FILENAME = os.environ['WHATSABOVEME_CATALOG']
+except KeyError:
+    CATALOG_FILENAME = None
+
+try:
+    ZENITH_GRID_PREFIX = os.environ['WHATSABOVEME_ZENITH_GRID']
+except KeyError:
+    ZENITH_GRID_PREFIX = None
+
+try:
+    GAZETTEER_FILENAME = os.environ['WHATSABOVEME_GAZETTEER']
+except KeyError:
+    GAZETTEER_FILENAME = None
+
+try:
+    PRESCREEN_FILENAME = os.environ['WHATSABOVEME_PRESCREEN']
+except KeyError:
+    PRESCREEN_FILENAME = None
+
+try:
+    GEOCODE_CACHE_FILENAME = os.environ['WHATSABOVEME_GEOCODE_CACHE']
+except KeyError:
+    GEOCODE_CACHE_FILENAME = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'geocode_cache.sqlite')
+
+try:
+    N_WORKERS = int(os.environ['WHATSABOVEME_WORKERS'])
+except KeyError:
+    N_WORKERS = 0
+except ValueError:
+    print ('Ignoring WHATSABOVEME_WORKERS, which should be a whole number; '
+           'processing tweets on the stream thread.')
+    N_WORKERS = 0
+
+try:
+    IMAGE_CACHE_DIRECTORY = os.environ['WHATSABOVEME_IMAGE_CACHE']
+except KeyError:
+    IMAGE_CACHE_DIRECTORY = None
+
+CONCURRENT_STAGES = bool(os.environ.get('WHATSABOVEME_CONCURRENT_STAGES'))
+
+USE_ASTROPY_TIME = bool(os.environ.get('WHATSABOVEME_ASTROPY_TIME'))
+
+USE_STRIP_CACHE = bool(os.environ.get('WHATSABOVEME_STRIP_CACHE'))
+
+SCHEDULE_REQUESTS = bool(os.environ.get('WHATSABOVEME_SCHEDULER'))
+
+RANK_OBJECTS = bool(os.environ.get('WHATSABOVEME_RANK_OBJECTS'))
+
+# Overrides for the weights in ranking.py, e.g. 'separation=4,rarity=1.5'
+try:
+    RANK_WEIGHTS = dict(
+        (key, float(value)) for key, value in
+        (item.split('=')
+         for item in os.environ['WHATSABOVEME_RANK_WEIGHTS'].split(',')))
+    # Also rejects NaN
+    if not all(0 <= weight < float('inf') for weight in RANK_WEIGHTS.values()):
+        raise ValueError('Rank weights must be finite and non-negative')
+except KeyError:
+    RANK_WEIGHTS = None
+except ValueError:
+    print ('Ignoring WHATSABOVEME_RANK_WEIGHTS, which should look like '
+           '"separation=4,rarity=1.5" with weights of 0 or more; using the '
+           'default weights.')
+    RANK_WEIGHTS = None
+
+try:
+    COALESCE_SECONDS = float(os.environ['WHATSABOVEME_COALESCE_SECONDS'])
+except KeyError:
+    COALESCE_SECONDS = 10.0
+except ValueError:
+    print ('Ignoring WHATSABOVEME_COALESCE_SECONDS, which should be a number '
+           'of seconds; using 10.')
+    COALESCE_SECONDS = 10.0
+
+try:
+    RESULTS_FILENAME = os.environ['WHATSABOVEME_RESULTS']
+except KeyError:
+    RESULTS_FILENAME = None
+
+try:
+    JOURNAL_DIRECTORY = os.environ['WHATSABOVEME_JOURNAL']
+except KeyError:
+    JOURNAL_DIRECTORY = None
+
+try:
+    METRICS_PORT = int(os.environ['WHATSABOVEME_METRICS_PORT'])
+except KeyError:
+    METRICS_PORT = None
+except ValueError:
+    print ('Ignoring WHATSABOVEME_METRICS_PORT, which should be a port '
+           'number; not serving metrics.')
+    METRICS_PORT = None
+
+try:
+    METRICS_LOG_FILENAME = os.environ['WHATSABOVEME_METRICS_LOG']
+except KeyError:
+    METRICS_LOG_FILENAME = None
 
 TZ_DICT = {"International Date Line West": "Pacific/Midway", "Midway Island": "Pacific/Midway", "American Samoa": "Pacific/Pago_Pago", "Hawaii": "Pacific/Honolulu", "Alaska": "America/Juneau", "Pacific Time (US & Canada)": "America/Los_Angeles", "Tijuana": "America/Tijuana", "Mountain Time (US & Canada)": "America/Denver", "Arizona": "America/Phoenix", "Chihuahua": "America/Chihuahua", "Mazatlan": "America/Mazatlan", "Central Time (US & Canada)": "America/Chicago", "Saskatchewan": "America/Regina", "Guadalajara": "America/Mexico_City", "Mexico City": "America/Mexico_City", "Monterrey": "America/Monterrey", "Central America": "America/Guatemala", "Eastern Time (US & Canada)": "America/New_York", "Indiana (East)": "America/Indiana/Indianapolis", "Bogota": "America/Bogota", "Lima": "America/Lima", "Quito": "America/Lima", "Atlantic Time (Canada)": "America/Halifax", "Caracas": "America/Caracas", "La Paz": "America/La_Paz", "Santiago": "America/Santiago", "Newfoundland": "America/St_Johns", "Brasilia": "America/Sao_Paulo", "Buenos Aires": "America/Argentina/Buenos_Aires", "Montevideo": "America/Montevideo", "Georgetown": "America/Guyana", "Greenland": "America/Godthab", "Mid-Atlantic": "Atlantic/South_Georgia", "Azores": "Atlantic/Azores", "Cape Verde Is.": "Atlantic/Cape_Verde", "Dublin": "Europe/Dublin", "Edinburgh": "Europe/London", "Lisbon": "Europe/Lisbon", "London": "Europe/London", "Casablanca": "Africa/Casablanca", "Monrovia": "Africa/Monrovia", "UTC": "Etc/UTC", "Belgrade": "Europe/Belgrade", "Bratislava": "Europe/Bratislava", "Budapest": "Europe/Budapest", "Ljubljana": "Europe/Ljubljana", "Prague": "Europe/Prague", "Sarajevo": "Europe/Sarajevo", "Skopje": "Europe/Skopje", "Warsaw": "Europe/Warsaw", "Zagreb": "Europe/Zagreb", "Brussels": "Europe/Brussels", "Copenhagen": "Europe/Copenhagen", "Madrid": "Europe/Madrid", "Paris": "Europe/Paris", "Amsterdam": "Europe/Amsterdam", "Berlin": "Europe/Berlin", "Bern": "Europe/Berlin", "Rome": "Europe/Rome", "Stockholm": "Europe/Stockholm", "Vienna": "Europe/Vienna", "West Central Africa": "Africa/Algiers", "Bucharest": "Europe/Bucharest", "Cairo": "Africa/Cairo", "Helsinki": "Europe/Helsinki", "Kyiv": "Europe/Kiev", "Riga": "Europe/Riga", "Sofia": "Europe/Sofia", "Tallinn": "Europe/Tallinn", "Vilnius": "Europe/Vilnius", "Athens": "Europe/Athens", "Istanbul": "Europe/Istanbul", "Minsk": "Europe/Minsk", "Jerusalem": "Asia/Jerusalem", "Harare": "Africa/Harare", "Pretoria": "Africa/Johannesburg", "Moscow": "Europe/Moscow", "St. Petersburg": "Europe/Moscow", "Volgograd": "Europe/Moscow", "Kuwait": "Asia/Kuwait", "Riyadh": "Asia/Riyadh", "Nairobi": "Africa/Nairobi", "Baghdad": "Asia/Baghdad", "Tehran": "Asia/Tehran", "Abu Dhabi": "Asia/Muscat", "Muscat": "Asia/Muscat", "Baku": "Asia/Baku", "Tbilisi": "Asia/Tbilisi", "Yerevan": "Asia/Yerevan", "Kabul": "Asia/Kabul", "Ekaterinburg": "Asia/Yekaterinburg", "Islamabad": "Asia/Karachi", "Karachi": "Asia/Karachi", "Tashkent": "Asia/Tashkent", "Chennai": "Asia/Kolkata", "Kolkata": "Asia/Kolkata", "Mumbai": "Asia/Kolkata", "New Delhi": "Asia/Kolkata", "Kathmandu": "Asia/Kathmandu", "Astana": "Asia/Dhaka", "Dhaka": "Asia/Dhaka", "Sri Jayawardenepura": "Asia/Colombo", "Almaty": "Asia/Almaty", "Novosibirsk": "Asia/Novosibirsk", "Rangoon": "Asia/Rangoon", "Bangkok": "Asia/Bangkok", "Hanoi": "Asia/Bangkok", "Jakarta": "Asia/Jakarta", "Krasnoyarsk": "Asia/Krasnoyarsk", "Beijing": "Asia/Shanghai", "Chongqing": "Asia/Chongqing", "Hong Kong": "Asia/Hong_Kong", "Urumqi": "Asia/Urumqi", "Kuala Lumpur": "Asia/Kuala_Lumpur", "Singapore": "Asia/Singapore", "Taipei": "Asia/Taipei", "Perth": "Australia/Perth", "Irkutsk": "Asia/Irkutsk", "Ulaanbaatar": "Asia/Ulaanbaatar", "Seoul": "Asia/Seoul", "Osaka": "Asia/Tokyo", "Sapporo": "Asia/Tokyo", "Tokyo": "Asia/Tokyo", "Yakutsk": "Asia/Yakutsk", "Darwin": "Australia/Darwin", "Adelaide": "Australia/Adelaide", "Canberra": "Australia/Melbourne", "Melbourne": "Australia/Melbourne", "Sydney": "Australia/Sydney", "Brisbane": "Australia/Brisbane", "Hobart": "Australia/Hobart", "Vladivostok": "Asia/Vladivostok", "Guam": "Pacific/Guam", "Port Moresby": "Pacific/Port_Moresby", "Magadan": "Asia/Magadan", "Solomon Is.": "Pacific/Guadalcanal", "New Caledonia": "Pacific/Noumea", "Fiji": "Pacific/Fiji", "Kamchatka": "Asia/Kamchatka", "Marshall Is.": "Pacific/Majuro", "Auckland": "Pacific/Auckland", "Wellington": "Pacific/Auckland", "Nuku'alofa": "Pacific/Tongatapu", "Tokelau Is.": "Pacific/Fakaofo", "Chatham Is.": "Pacific/Chatham", "Samoa": "Pacific/Apia"}
 
@@ -73,36 +183,247 @@ class Bot(object):
     """The WhatsAboveMe twitterbot."""
 
     def __init__(self, n_pix_image=400, arrow_offset=(179, 130),
-                 comment_fraction=0.1):
-        self.twitter_api = TwitterAPI(
-            TWITTER_CONSUMER_KEY, TWITTER_CONSUMER_SECRET,
-            TWITTER_ACCESS_TOKEN_KEY, TWITTER_ACCESS_TOKEN_SECRET)
+                 comment_fraction=0.1, catalog_filename=CATALOG_FILENAME,
+                 zenith_grid_prefix=ZENITH_GRID_PREFIX,
+                 gazetteer_filename=GAZETTEER_FILENAME,
+                 prescreen_filename=PRESCREEN_FILENAME,
+                 geocode_cache_filename=GEOCODE_CACHE_FILENAME,
+                 concurrent_stages=CONCURRENT_STAGES,
+                 image_cache_directory=IMAGE_CACHE_DIRECTORY,
+                 use_astropy_time=USE_ASTROPY_TIME,
+                 metrics_log_filename=METRICS_LOG_FILENAME,
+                 schedule_requests=SCHEDULE_REQUESTS,
+                 coalesce_seconds=COALESCE_SECONDS,
+                 use_strip_cache=USE_STRIP_CACHE,
+                 rank_objects=RANK_OBJECTS, rank_weights=RANK_WEIGHTS,
+                 results_filename=RESULTS_FILENAME):
+        self.twitter_api_client = None
         self.stream = None
-        self.wp_client = WordPressClient(
-            WORDPRESS_ENDPOINT, 'whatsaboveme', WORDPRESS_PASSWORD)
+        # Clients that can't be shared between worker threads
+        self.thread_local = threading.local()
+        # Held while creating any client, so it's only done once
+        self.client_lock = threading.Lock()
         self.n_pix_image = n_pix_image
-        try:
-            self.arrow = Image.open('/app/arrow.png')
-        except IOError:
-            self.arrow = Image.open('arrow.png')
+        self.arrow_image = None
         self.arrow_offset = arrow_offset
         self.comment_fraction = comment_fraction
         # The following list is in descending order of preference
         self.filternames = ['V', 'r', 'B', 'g', 'R', 'i', 'U', 'u', 'I', 'z']
-        self.simbad = Simbad()
-        self.simbad.add_votable_fields('otype', 'ze', 'velocity')
-        self.simbad.add_votable_fields(
-            *['flux({})'.format(f) for f in self.filternames])
+        self.flux_keys = ['FLUX_' + f for f in self.filternames]
+        self.simbad_client = None
+        # Use a local copy of Simbad if one has been provided
+        self.catalog_filename = catalog_filename
+        self.local_catalog = None
+        # A precomputed grid makes local lookups a single array index
+        self.zenith_grid_prefix = zenith_grid_prefix
+        self.local_zenith_grid = None
+        # Place names to look for in tweets, instead of asking a remote tagger
+        self.gazetteer_filename = gazetteer_filename
+        self.local_gazetteer = None
+        # A Bloom filter that rules out tweets with no place names in them
+        self.prescreen_filename = prescreen_filename
+        self.local_prescreen = None
+        self.geocode_cache = GeocodeCache(geocode_cache_filename)
+        self.concurrent_stages = concurrent_stages
+        self.use_astropy_time = use_astropy_time
+        if image_cache_directory:
+            self.image_cache = ImageCache(image_cache_directory)
+        else:
+            self.image_cache = None
+        self.metrics = Metrics(log_filename=metrics_log_filename)
+        # Shares out the upstream APIs' rate limits by tweet type
+        if schedule_requests:
+            self.scheduler = Scheduler()
+        else:
+            self.scheduler = None
+        # Simbad results for strips of sky around recent declinations
+        if use_strip_cache:
+            from stripcache import StripCache
+            self.strip_cache = StripCache(self.query_box, SEARCH_RADIUS)
+        else:
+            self.strip_cache = None
+        # Prefer rarer and brighter objects over the very closest one
+        if rank_objects:
+            from ranking import Ranker
+            self.ranker = Ranker(weights=rank_weights)
+        else:
+            self.ranker = None
+        # Tweets already replied to, and recent answers to reuse
+        if results_filename:
+            from results import ResultStore
+            self.results = ResultStore(results_filename)
+        else:
+            self.results = None
+        # Identical lookups within this many seconds share one answer
+        self.coalesce_seconds = coalesce_seconds
+        self.single_flight = SingleFlight()
+        self.metrics.register_counter(
+            'whatsaboveme_coalesced_total',
+            'Lookups that shared an identical one already running.',
+            lambda: self.single_flight.n_coalesced)
+        for name, help_text in [
+                ('hits', 'Place names found in the geocode cache.'),
+                ('negative_hits',
+                 'Place names the geocode cache knows can\'t be found.'),
+                ('misses', 'Place names not in the geocode cache.')]:
+            self.metrics.register_counter(
+                'whatsaboveme_geocode_cache_{}_total'.format(name), help_text,
+                lambda name=name: getattr(self.geocode_cache, name))
+
+    @property
+    def twitter_api(self):
+        """The Twitter client, created on first use."""
+        with self.client_lock:
+            if self.twitter_api_client is None:
+                from TwitterAPI import TwitterAPI
+                self.twitter_api_client = TwitterAPI(
+                    TWITTER_CONSUMER_KEY, TWITTER_CONSUMER_SECRET,
+                    TWITTER_ACCESS_TOKEN_KEY, TWITTER_ACCESS_TOKEN_SECRET)
+        return self.twitter_api_client
+
+    @property
+    def simbad(self):
+        """The Simbad client, created on first use."""
+        with self.client_lock:
+            if self.simbad_client is None:
+                from astroquery.simbad import Simbad
+                simbad = Simbad()
+                simbad.add_votable_fields('otype', 'ze', 'velocity')
+                simbad.add_votable_fields(
+                    *['flux({})'.format(f) for f in self.filternames])
+                self.simbad_client = simbad
+        return self.simbad_client
+
+    @property
+    def catalog(self):
+        """The local copy of Simbad, loaded on first use, or None."""
+        with self.client_lock:
+            if self.local_catalog is None and self.catalog_filename:
+                from catalog import LocalCatalog
+                self.local_catalog = LocalCatalog(self.catalog_filename)
+        return self.local_catalog
+
+    @property
+    def zenith_grid(self):
+        """The precomputed zenith grid, loaded on first use, or None."""
+        catalog = self.catalog
+        with self.client_lock:
+            if (self.local_zenith_grid is None and catalog is not None and
+                    self.zenith_grid_prefix):
+                from zenithgrid import ZenithGrid
+                self.local_zenith_grid = ZenithGrid(
+                    self.zenith_grid_prefix, catalog)
+        return self.local_zenith_grid
 
-    def activate(self):
-        """Switch the bot on."""
+    @property
+    def gazetteer(self):
+        """The local gazetteer, loaded on first use, or None."""
+        with self.client_lock:
+            if self.local_gazetteer is None and self.gazetteer_filename:
+                from gazetteer import Gazetteer
+                self.local_gazetteer = Gazetteer.load(self.gazetteer_filename)
+        return self.local_gazetteer
+
+    @property
+    def prescreen(self):
+        """The place name prescreen, loaded on first use, or None."""
+        with self.client_lock:
+            if self.local_prescreen is None and self.prescreen_filename:
+                from bloom import Prescreen
+                self.local_prescreen = Prescreen.load(self.prescreen_filename)
+        return self.local_prescreen
+
+    @property
+    def arrow(self):
+        """The arrow to paste onto images, loaded on first use."""
+        with self.client_lock:
+            if self.arrow_image is None:
+                from PIL import Image
+                try:
+                    self.arrow_image = Image.open('/app/arrow.png')
+                except IOError:
+                    self.arrow_image = Image.open('arrow.png')
+        return self.arrow_image
+
+    @property
+    def wp_client(self):
+        """The WordPress client for the current thread."""
+        try:
+            return self.thread_local.wp_client
+        except AttributeError:
+            from wordpress_xmlrpc import Client as WordPressClient
+            self.thread_local.wp_client = WordPressClient(
+                WORDPRESS_ENDPOINT, 'whatsaboveme', WORDPRESS_PASSWORD)
+            return self.thread_local.wp_client
+
+    def activate(self, n_workers=N_WORKERS, metrics_port=METRICS_PORT,
+                 journal_directory=JOURNAL_DIRECTORY):
+        """
+        Switch the bot on.
+
+        If `n_workers` is non-zero, tweets are processed on that many worker
+        threads while this thread keeps reading the stream. If `metrics_port`
+        is set, the stage metrics are served on that port. If
+        `journal_directory` is set, tweets go through a journal there (see
+        process_journal).
+        """
+        if metrics_port:
+            self.metrics.serve(metrics_port)
         self.stream = self.twitter_api.request('user')
-        for tweet in self.stream:
-            self.process_tweet(tweet)
+        if journal_directory:
+            self.process_journal(journal_directory, n_workers)
+        elif n_workers:
+            WorkerPool(self.process_tweet, n_workers=n_workers).run(
+                self.stream)
+        else:
+            for tweet in self.stream:
+                self.process_tweet(tweet)
+        if self.scheduler is not None:
+            self.scheduler.report()
+
+    def process_journal(self, journal_directory, n_workers=0):
+        """
+        Read the stream into a journal on disk, and process it from there.
+
+        A background thread appends every tweet from the stream to the
+        journal, and this thread (or the workers) processes them. Tweets
+        left unprocessed when the bot stops are processed after a restart.
+        """
+        from journal import Journal
+        journal = Journal(journal_directory)
+        reader = threading.Thread(target=journal.append_all,
+                                  args=(self.stream,))
+        reader.daemon = True
+        reader.start()
+        def process(entry):
+            offset, tweet = entry
+            try:
+                self.process_tweet(tweet)
+            finally:
+                # A tweet that fails would only fail again after a restart
+                journal.done(offset)
+        try:
+            if n_workers:
+                WorkerPool(process, n_workers=n_workers,
+                           tweet_of=lambda entry: entry[1]).run(
+                               journal.entries())
+            else:
+                for entry in journal.entries():
+                    process(entry)
+        finally:
+            journal.close()
 
     def process_tweet(self, tweet):
-        """Process and reply to a tweet."""
-        tweet_info = self.parse_tweet(tweet)
+        """Process and reply to a tweet, recording how long it took."""
+        with self.metrics.timer('process_tweet') as process_timer:
+            with self.metrics.timer('parse_tweet') as parse_timer:
+                tweet_info = self.parse_tweet(tweet)
+                parse_timer.tweet_type = tweet_info['type']
+            process_timer.tweet_type = tweet_info['type']
+            self.respond(tweet, tweet_info)
+
+    def respond(self, tweet, tweet_info):
+        """Act on the information parsed from a tweet."""
         print 'Retrieved this information from the tweet:'
         print tweet_info
         if tweet_info['type'] in ['other', 'mention', 'not_tweet']:
@@ -110,7 +431,32 @@ class Bot(object):
         if tweet['user']['screen_name'].lower() == 'whatsaboveme':
             # Don't reply to your own tweets!
             return
-        elif tweet_info['type'] == 'follow':
+        if self.results is None:
+            self.act_on(tweet, tweet_info)
+            return
+        if not self.results.claim(tweet['id']):
+            print 'Already handled tweet {}'.format(tweet['id'])
+            return
+        try:
+            acted = self.act_on(tweet, tweet_info)
+        except:
+            self.results.release(tweet['id'])
+            raise
+        if acted:
+            self.results.finish(tweet['id'])
+        else:
+            self.results.release(tweet['id'])
+
+    def act_on(self, tweet, tweet_info):
+        """Reply to or follow a tweet. Return False if it was dropped."""
+        if self.scheduler is not None:
+            waited = self.scheduler.acquire(tweet_info['type'])
+            if waited is None:
+                print 'Dropped {} tweet, upstream APIs are busy'.format(
+                    tweet_info['type'])
+                return False
+            self.metrics.observe('scheduler_wait', tweet_info['type'], waited)
+        if tweet_info['type'] == 'follow':
             self.follow(
                 tweet_info['username'],
                 in_reply_to=tweet['id'],
@@ -129,7 +475,8 @@ class Bot(object):
                 False,
                 tweet['id'],
                 location_in_tweet=tweet_info['location'],
-                strict=True)
+                strict=True,
+                tweet_type='location')
         elif tweet_info['type'] == 'request':
             self.tweet_location(
                 tweet_info['location'],
@@ -137,14 +484,14 @@ class Bot(object):
                 tweet_info['username'],
                 tweet_info['tz'],
                 tweet_info['dot_at'],
-                tweet['id'])
+                tweet['id'],
+                tweet_type='request')
+        return True
 
     def follow(self, username, in_reply_to=None, send_tweet=True):
         """Follow a user and send them an explanatory tweet."""
         payload = {'screen_name': username}
-        self.twitter_api.request(
-            'friendships/create',
-            payload)
+        self.twitter_request('friendships/create', payload)
         if send_tweet:
             message = '@{} I am now following you, and will occasionally tweet you with updates. Tweet "@WhatsAboveMe unfollow" to stop at any time.'.format(username)
             self.tweet_text(message, in_reply_to=in_reply_to)
@@ -152,32 +499,132 @@ class Bot(object):
     def unfollow(self, username, in_reply_to=None, send_tweet=True):
         """Unfollow a user and send them an explanatory tweet."""
         payload = {'screen_name': username}
-        self.twitter_api.request(
-            'friendships/destroy',
-            payload)
+        self.twitter_request('friendships/destroy', payload)
         if send_tweet:
             message = '@{} Sorry to say goodbye! I will no longer tweet you any updates. If you change your mind, tweet "@WhatsAboveMe follow".'.format(username)
             self.tweet_text(message, in_reply_to=in_reply_to)
 
     def tweet_location(self, location_name, tweet_time, username, tweet_tz,
                        dot_at, tweet_id, location_in_tweet='you',
-                       strict=False):
+                       strict=False, tweet_type='request'):
+        """Find the object above a location and reply to the tweet."""
+        timer = lambda stage: self.metrics.timer(stage, tweet_type)
         try:
-            location = self.get_location(location_name, strict=strict)
+            with timer('location'):
+                location = self.get_location(location_name, strict=strict)
         except LocationNotFoundError:
             return
-        ra_dec = self.get_ra_dec(location, tweet_time)
-        obj = self.get_object(ra_dec)
-        image = self.get_sky_image(obj['coords'])
-        processed_image = self.process_image(image)
-        processed_image.filename = obj['name']+'.jpeg'
-        link = self.make_post_with_info(
-            obj, location['description'], tweet_time, tweet_tz,
-            processed_image)
-        reply_text = self.construct_reply(
-            obj, link, username, dot_at, location_in_tweet)
+        if self.results is not None:
+            answer = self.results.get_answer(
+                sky_key(location, tweet_time, self.results.bucket_seconds))
+            if answer is not None:
+                obj, link, media_id = answer
+                with timer('reply_text'):
+                    reply_text = self.construct_reply(
+                        obj, link, username, dot_at, location_in_tweet)
+                print 'Sending earlier answer: {}'.format(reply_text)
+                with timer('sent'):
+                    self.tweet_media(
+                        reply_text, media_id, in_reply_to=tweet_id)
+                return
+        if self.concurrent_stages:
+            self.tweet_location_concurrent(
+                location, tweet_time, username, tweet_tz, dot_at, tweet_id,
+                location_in_tweet=location_in_tweet, tweet_type=tweet_type)
+            return
+        try:
+            with timer('sky'):
+                obj, processed_image = self.get_sky(
+                    location, tweet_time, tweet_type=tweet_type)
+        except ObjectNotFoundError:
+            return
+        with timer('link'):
+            link = self.make_post_with_info(
+                obj, location['description'], tweet_time, tweet_tz,
+                processed_image)
+        with timer('reply_text'):
+            reply_text = self.construct_reply(
+                obj, link, username, dot_at, location_in_tweet)
         print 'Sending reply: {}'.format(reply_text)
-        self.tweet_image(reply_text, processed_image, in_reply_to=tweet_id)
+        with timer('sent'):
+            media_id = self.upload_twitter_media(processed_image)
+            self.tweet_media(reply_text, media_id, in_reply_to=tweet_id)
+        self.store_answer(location, tweet_time, obj, link, media_id)
+
+    def tweet_location_concurrent(self, location, tweet_time, username,
+                                  tweet_tz, dot_at, tweet_id,
+                                  location_in_tweet='you',
+                                  tweet_type='request'):
+        """Reply to a tweet, running independent stages at the same time."""
+        def send_reply(reply_text, media_id, sky, link):
+            print 'Sending reply: {}'.format(reply_text)
+            self.tweet_media(reply_text, media_id, in_reply_to=tweet_id)
+            self.store_answer(location, tweet_time, sky[0], link, media_id)
+        stages = [
+            Stage('sky',
+                  lambda location: self.get_sky(
+                      location, tweet_time, tweet_type=tweet_type),
+                  ['location']),
+            Stage('wp_image', lambda sky: self.upload_wp_image(sky[1]),
+                  ['sky']),
+            Stage('media_id', lambda sky: self.upload_twitter_media(sky[1]),
+                  ['sky']),
+            Stage('link',
+                  lambda sky, location, wp_image: self.make_post_with_image(
+                      sky[0], location['description'], tweet_time, tweet_tz,
+                      wp_image),
+                  ['sky', 'location', 'wp_image']),
+            Stage('reply_text',
+                  lambda sky, link: self.construct_reply(
+                      sky[0], link, username, dot_at, location_in_tweet),
+                  ['sky', 'link']),
+            Stage('sent', send_reply,
+                  ['reply_text', 'media_id', 'sky', 'link']),
+        ]
+        stages = [
+            Stage(stage.name,
+                  self.metrics.timed(stage.func, stage.name, tweet_type),
+                  stage.requires)
+            for stage in stages]
+        try:
+            run_stages(stages, location=location)
+        except ObjectNotFoundError:
+            return
+
+    def store_answer(self, location, at_time, obj, link, media_id):
+        """Keep an answer, so requests for the same place can reuse it."""
+        if self.results is None:
+            return
+        self.results.put_answer(
+            sky_key(location, at_time, self.results.bucket_seconds),
+            obj, link, media_id)
+
+    def get_sky(self, location, at_time, tweet_type='request'):
+        """
+        Return the object above a location and its processed image.
+
+        Identical lookups made at the same time (the same location, in the
+        same time bucket) share one computation.
+        """
+        if not self.coalesce_seconds:
+            return self.compute_sky(location, at_time, tweet_type)
+        key = sky_key(location, at_time, self.coalesce_seconds)
+        obj, processed_image = self.single_flight.do(
+            key, self.compute_sky, location, at_time, tweet_type)
+        # Each reply gets its own copy of the object to work with
+        return dict(obj), processed_image
+
+    def compute_sky(self, location, at_time, tweet_type='request'):
+        """Work out the object above a location and its processed image."""
+        timer = lambda stage: self.metrics.timer(stage, tweet_type)
+        with timer('ra_dec'):
+            ra_dec = self.get_ra_dec(location, at_time)
+        with timer('obj'):
+            obj = self.get_object(ra_dec)
+        with timer('processed_image'):
+            processed_image = self.get_processed_image(obj['coords'])
+        processed_image.filename = obj['name']+'.jpeg'
+        return obj, processed_image
 
     def construct_reply(self, obj, link, screen_name, dot_at,
                         location_in_tweet):
@@ -289,13 +736,10 @@ class Bot(object):
             # We weren't mentioned in this tweet.
             # Don't check them all for locations, only a fraction.
             # This is to avoid spamming people and using up API resources.
-            if np.random.rand() <= self.comment_fraction:
+            if (random.random() <= self.comment_fraction and
+                    self.might_contain_location(text_johnned)):
                 # Check it for locations that might be named.
-                response = requests.post(
-                    TEXT_PROCESSING_URL,
-                    data={'text': text_johnned, 'output': 'iob'})
-                tagged = json.loads(response.content)['text']
-                location = find_location_in_tags(tagged)
+                location = self.find_location(text_johnned)
                 if location:
                     tweet_type = 'location'
         # Now construct an appropriate response, depending on the tweet type
@@ -313,36 +757,84 @@ class Bot(object):
             result['username'] = tweet['user']['screen_name']
         return result
 
+    def might_contain_location(self, text):
+        """Return False if some text certainly doesn't name a place."""
+        if self.prescreen is None:
+            return True
+        return self.prescreen.might_contain_location(text)
+
+    def find_location(self, text):
+        """Return the longest location named in some text, or ''."""
+        if self.gazetteer is not None:
+            return self.gazetteer.find_location(text)
+        if (self.scheduler is not None and
+                not self.scheduler.try_take('text_processing')):
+            # Sampled tweets can wait for another day
+            return ''
+        response = transport.post(
+            TEXT_PROCESSING_URL,
+            data={'text': text, 'output': 'iob'},
+            idempotent=True)
+        tagged = json.loads(response.content)['text']
+        return find_location_in_tags(tagged)
+
     def tweet_image(self, status, image, in_reply_to=None):
         """Tweet with an image. `image` is a PIL Image."""
-        image_bytes = image.tobytes('jpeg', image.mode)
-        response = requests.post(
+        media_id = self.upload_twitter_media(image)
+        self.tweet_media(status, media_id, in_reply_to=in_reply_to)
+
+    def upload_twitter_media(self, image):
+        """Upload a PIL Image to Twitter and return its media ID."""
+        image_bytes = jpeg_bytes(image)
+        response = transport.post(
             TWITTER_URL_MEDIA_UPLOAD,
             files={'media': image_bytes},
             auth=self.twitter_api.auth)
         response_json = json.loads(response.text)
-        media_id = response_json['media_id_string']
+        return response_json['media_id_string']
+
+    def tweet_media(self, status, media_id, in_reply_to=None):
+        """Tweet with media that has already been uploaded."""
         payload = {'status': status,
                    'media_ids': media_id}
         if in_reply_to is not None:
             payload['in_reply_to_status_id'] = in_reply_to
-        self.twitter_api.request(
-            'statuses/update',
-            payload)
+        self.twitter_request('statuses/update', payload)
 
     def tweet_text(self, status, in_reply_to=None):
         """Tweet with text only, no image."""
         payload = {'status': status}
         if in_reply_to is not None:
             payload['in_reply_to_status_id'] = in_reply_to
-        self.twitter_api.request(
-            'statuses/update',
-            payload)
+        self.twitter_request('statuses/update', payload)
+
+    def twitter_request(self, endpoint, payload):
+        """POST to a Twitter REST endpoint and return the response."""
+        return transport.post(
+            TWITTER_URL_REST_BASE.format(endpoint), data=payload,
+            auth=self.twitter_api.auth)
 
     def get_location(self, name, strict=False):
-        """Convert a location name into lon+lat."""
+        """Convert a location name into lon+lat, using the cache if possible."""
+        found, location = self.geocode_cache.get(name, strict)
+        if found:
+            if location is None:
+                raise LocationNotFoundError(name)
+            print 'Location found in cache: {}, {}'.format(
+                location['lng'], location['lat'])
+            return dict(location)
+        try:
+            location = self.get_location_google(name, strict=strict)
+        except LocationNotFoundError:
+            self.geocode_cache.set(name, strict, None)
+            raise
+        self.geocode_cache.set(name, strict, location)
+        return location
+
+    def get_location_google(self, name, strict=False):
+        """Convert a location name into lon+lat using the Google API."""
         print 'Searching for location: {}'.format(name)
-        req_id = requests.get(
+        req_id = transport.get(
             GOOGLE_URL_AUTOCOMPLETE,
             params={'input':name, 'key':GOOGLE_MAPS_API_KEY})
         result = req_id.json()
@@ -354,7 +846,7 @@ class Bot(object):
         terms = result['predictions'][0]['terms']
         if strict and not perfect_match(name, terms):
             raise LocationNotFoundError(name)
-        req_loc = requests.get(
+        req_loc = transport.get(
             GOOGLE_URL_DETAILS,
             params={'placeid': place_id, 'key':GOOGLE_MAPS_API_KEY})
         location = req_loc.json()['result']['geometry']['location']
@@ -364,32 +856,127 @@ class Bot(object):
 
     def get_ra_dec(self, location, at_time):
         """Convert lon+lat+time into ra+dec."""
-        delta = (Time(at_time, scale='utc') - START_TIME).value
-        gst = 18.697374558 + 24.06570982441908 * delta
-        ra = (gst * 15.0 + location['lng']) % 360                                                      
+        from sidereal import lst_degrees
+        ra = lst_degrees(
+            location['lng'], at_time, use_astropy=self.use_astropy_time)
         dec = location['lat']
         print 'Coordinates found: {}, {}'.format(ra, dec)
         return {'ra': ra, 'dec': dec}
 
     def get_object(self, coords_dict):
+        """
+        Find the closest object to a given ra+dec.
+
+        With ranking switched on, find the best object near it instead. That
+        needs every candidate, so the strip cache and zenith grid, which
+        only know the closest object, aren't used.
+        """
+        if self.catalog is None:
+            return self.get_object_simbad(coords_dict)
+        else:
+            return self.get_object_local(coords_dict)
+
+    def get_object_simbad(self, coords_dict):
         """Query Simbad for the object at a given ra+dec."""
+        from astropy import coordinates
+        import astropy.units as u
+        if (self.strip_cache is not None and self.ranker is None and
+                self.strip_cache.covers(coords_dict['dec'])):
+            return self.get_object_strip(coords_dict)
         coords = coordinates.SkyCoord(
             ra=coords_dict['ra'], dec=coords_dict['dec'], unit=(u.deg, u.deg))
-        simbad_result = self.simbad.query_region(coords, radius=0.25*u.deg)
+        simbad_result = self.simbad.query_region(
+            coords, radius=SEARCH_RADIUS*u.deg)
+        if simbad_result is None:
+            # astroquery returns None rather than an empty table
+            raise ObjectNotFoundError(coords_dict)
         print 'Simbad results received: {} objects'.format(len(simbad_result))
-        keep = np.array([bool(re.match(r'.+ .+ .+\..+', line['RA'])) and
-                         bool(re.match(r'.+ .+ .+\..+', line['DEC']))
-                         for line in simbad_result])
-        trimmed_result = simbad_result[keep]
-        coords_result = coordinates.SkyCoord(
-            ra=trimmed_result['RA'], dec=trimmed_result['DEC'],
-            unit=(u.hour, u.deg))
-        idx = np.argmin(coords_result.separation(coords))
-        closest_object = trimmed_result[idx]
+        return self.closest_object(simbad_result, coords_dict)
+
+    def get_object_strip(self, coords_dict):
+        """Find the object at a given ra+dec in the cached Simbad strips."""
+        from astropy import coordinates
+        import astropy.units as u
+        found = self.strip_cache.nearest(
+            coords_dict['ra'], coords_dict['dec'], SEARCH_RADIUS)
+        if found is None:
+            raise ObjectNotFoundError(coords_dict)
+        table, idx, ra, dec = found
+        mags = first_set_values(table[idx:idx+1], self.flux_keys)
+        coords = coordinates.SkyCoord(ra=ra, dec=dec, unit=(u.deg, u.deg))
+        return self.make_object(table[idx], coords, mags[0])
+
+    def query_box(self, ra_min, ra_max, dec_min, dec_max):
+        """Query Simbad for everything in a box of ra+dec."""
+        criteria = 'region(box, {} {:+}, {}d {}d)'.format(
+            (ra_min + ra_max) / 2.0, (dec_min + dec_max) / 2.0,
+            ra_max - ra_min, dec_max - dec_min)
+        print 'Querying Simbad for {}'.format(criteria)
+        return self.simbad.query_criteria(criteria)
+
+    def closest_object(self, table, coords_dict):
+        """Return the object in a Simbad table closest to a given ra+dec."""
+        import numpy as np
+        from astropy import coordinates
+        import astropy.units as u
+        from sky import separations, valid_sexagesimal, parse_sexagesimal
+        keep = valid_sexagesimal(table['RA']) & valid_sexagesimal(table['DEC'])
+        if not keep.any():
+            raise ObjectNotFoundError(coords_dict)
+        trimmed_result = table[keep]
+        ra = parse_sexagesimal(trimmed_result['RA'], scale=15.0)
+        dec = parse_sexagesimal(trimmed_result['DEC'])
+        seps = separations(ra, dec, coords_dict['ra'], coords_dict['dec'])
+        mags = first_set_values(trimmed_result, self.flux_keys)
+        if self.ranker is not None:
+            idx = self.ranker.best(
+                trimmed_result['OTYPE'], seps, mags, SEARCH_RADIUS)
+        else:
+            idx = np.argmin(seps)
+        coords = coordinates.SkyCoord(
+            ra=ra[idx], dec=dec[idx], unit=(u.deg, u.deg))
+        return self.make_object(trimmed_result[idx], coords, mags[idx])
+
+    def get_object_local(self, coords_dict):
+        """Look up the object at a given ra+dec in the local catalog."""
+        from astropy import coordinates
+        import astropy.units as u
+        if self.ranker is not None:
+            idx = self.best_local_index(coords_dict)
+        elif self.zenith_grid is not None:
+            idx = self.zenith_grid.nearest(
+                coords_dict['ra'], coords_dict['dec'], SEARCH_RADIUS)
+        else:
+            idx = self.catalog.nearest(
+                coords_dict['ra'], coords_dict['dec'], SEARCH_RADIUS)
+        if idx is None:
+            raise ObjectNotFoundError(coords_dict)
+        row = self.catalog.row(idx)
+        coords = coordinates.SkyCoord(
+            ra=row['RA_d'], dec=row['DEC_d'], unit=(u.deg, u.deg))
+        mags = first_set_values(
+            dict((key, [row[key]]) for key in self.flux_keys), self.flux_keys)
+        return self.make_object(row, coords, mags[0])
+
+    def best_local_index(self, coords_dict):
+        """Return the index of the best local catalog object, or None."""
+        indices, seps = self.catalog.within(
+            coords_dict['ra'], coords_dict['dec'], SEARCH_RADIUS)
+        if not len(indices):
+            return None
+        mags = first_set_values(
+            dict((key, self.catalog.columns[key][indices])
+                 for key in self.flux_keys), self.flux_keys)
+        return indices[self.ranker.best(
+            self.catalog.columns['OTYPE'][indices], seps, mags, SEARCH_RADIUS)]
+
+    def make_object(self, closest_object, coords, mag):
+        """Convert a Simbad row (or equivalent dict) into an object dict."""
+        import numpy as np
         obj = {
             'name': closest_object['MAIN_ID'],
             'type': closest_object['OTYPE'],
-            'coords': coords_result[idx],
+            'coords': coords,
         }
         if closest_object['ze_redshift']:
             obj['redshift'] = closest_object['ze_redshift']
@@ -399,32 +986,67 @@ class Bot(object):
         #     obj['redshift'] = closest_object['RV_VALUE'] / c
         else:
             obj['redshift'] = None
-        for filt in self.filternames:
-            key = 'FLUX_' + filt
-            if closest_object[key]:
-                obj['mag'] = closest_object[key]
-                break
-        else:
+        if np.isnan(mag):
             obj['mag'] = None
+        else:
+            obj['mag'] = mag
         print 'Object found: {}, {}'.format(obj['name'], obj['type'])
         return obj
 
+    def get_processed_image(self, coords):
+        """
+        Return the cropped and annotated sky image around some coords.
+
+        The image is encoded as a JPEG here, once, and both uploads use the
+        same bytes (see jpeg_bytes).
+        """
+        from PIL import Image
+        if self.image_cache is not None:
+            data = self.image_cache.get(
+                coords, 'processed', n_pix=self.n_pix_image)
+            if data is not None:
+                print 'Processed image found in cache'
+                # Opening only reads the header; the pixels are never needed
+                processed_image = Image.open(BytesIO(data))
+                processed_image.jpeg = data
+                return processed_image
+        processed_image = self.process_image(self.get_sky_image(coords))
+        data = jpeg_bytes(processed_image)
+        if self.image_cache is not None:
+            self.image_cache.put(
+                coords, 'processed', data, n_pix=self.n_pix_image)
+        return processed_image
+
     def get_sky_image(self, coords):
         """Return a jpeg PIL Image downloaded from Aladin."""
+        from PIL import Image
+        if self.image_cache is not None:
+            data = self.image_cache.get(coords, 'raw')
+            if data is not None:
+                print 'Image found in cache'
+                return Image.open(BytesIO(data))
         print 'Downloading image'
-        response = urllib.urlopen(aladin_url_image(coords))
-        image = Image.open(BytesIO(response.read()))
+        response = transport.get(aladin_url_image(coords))
+        response.raise_for_status()
+        data = response.content
+        image = Image.open(BytesIO(data))
         print 'Image received'
+        if self.image_cache is not None:
+            self.image_cache.put(coords, 'raw', data)
         return image
 
     def process_image(self, image):
         """Crop the image and add an arrow pointing to the central object."""
         size = image.size
-        image_crop = image.convert(mode='RGB').crop((
+        image_crop = image.crop((
             size[0]/2-self.n_pix_image/2,
             size[1]/2-self.n_pix_image/2,
             size[0]/2+self.n_pix_image/2,
             size[1]/2+self.n_pix_image/2))
+        # Converting after cropping touches a quarter of the pixels, and
+        # Aladin's previews are usually RGB already
+        if image_crop.mode != 'RGB':
+            image_crop = image_crop.convert(mode='RGB')
         image_crop.paste(self.arrow, box=self.arrow_offset, mask=self.arrow)
         print 'Image processed'
         return image_crop
@@ -432,6 +1054,8 @@ class Bot(object):
     def make_wp_post(self, title, content, tags=None, categories=None,
                      publish=True):
         """Make a WordPress blog post and return its ID."""
+        from wordpress_xmlrpc import WordPressPost
+        from wordpress_xmlrpc import methods as wordpress_methods
         if tags is None:
             tags = []
         if categories is None:
@@ -448,8 +1072,9 @@ class Bot(object):
 
     def upload_wp_image(self, image):
         """Upload a PIL Image to WordPress and return the response."""
-        image_bytes = image.tobytes('jpeg', image.mode)
-        image_bits = xmlrpc_client.Binary(image_bytes)
+        from wordpress_xmlrpc import methods as wordpress_methods
+        from wordpress_xmlrpc.compat import xmlrpc_client
+        image_bits = xmlrpc_client.Binary(jpeg_bytes(image))
         data = {'name': image.filename,
                 'type': 'image/jpg',
                 'bits': image_bits}
@@ -457,13 +1082,22 @@ class Bot(object):
 
     def get_wp_link(self, post_id):
         """Get the URL of a WordPress post with the given ID."""
+        if WORDPRESS_PERMALINK_TEMPLATE:
+            return WORDPRESS_PERMALINK_TEMPLATE.format(post_id=post_id)
+        from wordpress_xmlrpc import methods as wordpress_methods
         post = self.wp_client.call(wordpress_methods.posts.GetPost(post_id))
         return post.link
 
     def make_post_with_info(self, obj, location, at_time, time_zone, image):
         """Make a WordPress post about the object and return its URL."""
-        title = obj['name']
         image_response = self.upload_wp_image(image)
+        return self.make_post_with_image(
+            obj, location, at_time, time_zone, image_response)
+
+    def make_post_with_image(self, obj, location, at_time, time_zone,
+                             image_response):
+        """Make a WordPress post using an uploaded image and return its URL."""
+        title = obj['name']
         image_html = '''[caption id="attachment_22" align="aligncenter" width="{n_pix_image}"]<a href="{image_url}"><img class="wp-image-22 size-full" src="{image_url}" alt="{name}" width="{n_pix_image}" height="{n_pix_image}" /></a> {name}[/caption]'''.format(
             n_pix_image=self.n_pix_image,
             image_url=image_response['url'],
@@ -504,6 +1138,22 @@ class Bot(object):
         return time_str
 
 
+def sky_key(location, at_time, bucket_seconds):
+    """Return a key shared by lookups of one location in one time bucket."""
+    from sidereal import unix_seconds
+    return (round(location['lat'], 4), round(location['lng'], 4),
+            int(unix_seconds(at_time) // bucket_seconds))
+
+def jpeg_bytes(image):
+    """Return a PIL Image as JPEG bytes, encoding it the first time only."""
+    data = getattr(image, 'jpeg', None)
+    if data is None:
+        output = BytesIO()
+        image.save(output, format='JPEG', quality=JPEG_QUALITY)
+        data = output.getvalue()
+        image.jpeg = data
+    return data
+
 def find_location_in_tags(tagged):
     """Return the longest location in the tagged text, or None."""
     location = []
@@ -526,6 +1176,24 @@ def find_location_in_tags(tagged):
         location = current_location
     return ' '.join(location)
 
+def first_set_values(columns, keys):
+    """
+    Return the value of the first of `keys` that is set, for every row.
+
+    Masked, None and zero values count as not set, as do NaNs. Rows with
+    none of the keys set get NaN.
+    """
+    import numpy as np
+    result = None
+    for key in reversed(keys):
+        values = np.ma.filled(np.ma.asarray(columns[key]).astype(float), np.nan)
+        if result is None:
+            result = np.empty(len(values))
+            result.fill(np.nan)
+        is_set = ~np.isnan(values) & (values != 0)
+        result = np.where(is_set, values, result)
+    return result
+
 def perfect_match(requested, matched):
     """Make sure the requested location full matches the matched one."""
     requested_simple = requested.lower()
@@ -552,6 +1220,9 @@ class BotError(Exception):
 class LocationNotFoundError(BotError):
     pass
 
+class ObjectNotFoundError(BotError):
+    pass
+
 
 if __name__ == '__main__':
     bot = Bot()
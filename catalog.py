@@ -0,0 +1,121 @@
+"""
+Offline copy of the Simbad columns used by the bot.
+
+The catalog is stored as a numpy .npz file with one array per column, and is
+searched with a kd-tree built on unit vectors, so finding the closest object
+to a point takes microseconds rather than a round trip to Simbad.
+"""
+import sys
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from sky import (unit_vectors, chord_length, chord_to_angle,
+                 valid_sexagesimal, parse_sexagesimal)
+
+STRING_COLUMNS = ('MAIN_ID', 'OTYPE')
+NUMBER_COLUMNS = ('ze_redshift', 'RVZ_RADVEL')
+
+
+class LocalCatalog(object):
+    """A columnar extract of Simbad with a spatial index."""
+
+    def __init__(self, filename):
+        data = np.load(filename)
+        self.columns = dict((key, data[key]) for key in data.files)
+        self.ra = self.columns.pop('RA_d')
+        self.dec = self.columns.pop('DEC_d')
+        self.tree = cKDTree(unit_vectors(self.ra, self.dec))
+        print 'Local catalog loaded: {} objects'.format(len(self))
+
+    def __len__(self):
+        return len(self.ra)
+
+    def nearest(self, ra, dec, radius):
+        """Return the index of the closest object within `radius` degrees."""
+        distance, idx = self.tree.query(
+            unit_vectors(ra, dec)[0],
+            distance_upper_bound=chord_length(radius))
+        if np.isinf(distance):
+            return None
+        return idx
+
+    def nearest_many(self, ra, dec, radius):
+        """
+        Find the closest object to each of many points.
+
+        Returns arrays of indices and separations in degrees. Where there is
+        no object within `radius` degrees the index is -1.
+        """
+        distance, idx = self.tree.query(
+            unit_vectors(ra, dec), distance_upper_bound=chord_length(radius))
+        missing = np.isinf(distance)
+        idx[missing] = -1
+        distance[missing] = np.nan
+        return idx, chord_to_angle(distance)
+
+    def within(self, ra, dec, radius):
+        """
+        Find every object within `radius` degrees of a point.
+
+        Returns arrays of indices and separations in degrees.
+        """
+        point = unit_vectors(ra, dec)[0]
+        indices = np.array(
+            self.tree.query_ball_point(point, chord_length(radius)),
+            dtype=int)
+        chords = unit_vectors(self.ra[indices], self.dec[indices]) - point
+        return indices, chord_to_angle(np.sqrt(np.sum(chords**2, axis=1)))
+
+    def row(self, idx):
+        """Return a dict of the values for one object, None where missing."""
+        row = {'RA_d': self.ra[idx], 'DEC_d': self.dec[idx]}
+        for key, column in self.columns.items():
+            value = column[idx]
+            if column.dtype.kind == 'f' and np.isnan(value):
+                value = None
+            row[key] = value
+        return row
+
+
+def build_catalog(tables, filename):
+    """Write the usable rows of some Simbad result tables to a catalog file."""
+    flux_columns = [key for key in tables[0].colnames
+                    if key.startswith('FLUX_')]
+    number_columns = list(NUMBER_COLUMNS) + flux_columns
+    values = dict((key, []) for key in STRING_COLUMNS)
+    values.update((key, []) for key in number_columns)
+    ra_strings = []
+    dec_strings = []
+    seen = set()
+    for table in tables:
+        # Same test as the live query, so both give the same answers
+        keep = valid_sexagesimal(table['RA']) & valid_sexagesimal(table['DEC'])
+        for line in table[keep]:
+            if line['MAIN_ID'] in seen:
+                # Neighbouring cones overlap
+                continue
+            seen.add(line['MAIN_ID'])
+            ra_strings.append(line['RA'])
+            dec_strings.append(line['DEC'])
+            for key in STRING_COLUMNS:
+                values[key].append(line[key])
+            for key in number_columns:
+                value = line[key]
+                if np.ma.is_masked(value):
+                    value = np.nan
+                values[key].append(value)
+    arrays = dict((key, np.array(values[key])) for key in STRING_COLUMNS)
+    arrays.update((key, np.array(values[key], dtype=float))
+                  for key in number_columns)
+    arrays['RA_d'] = parse_sexagesimal(ra_strings, scale=15.0)
+    arrays['DEC_d'] = parse_sexagesimal(dec_strings)
+    np.savez(filename, **arrays)
+    print 'Catalog written: {} objects'.format(len(seen))
+
+
+if __name__ == '__main__':
+    # Usage: python catalog.py output.npz simbad_1.xml [simbad_2.xml ...]
+    from astropy.table import Table
+    build_catalog([Table.read(path, format='votable')
+                   for path in sys.argv[2:]], sys.argv[1])
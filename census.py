@@ -0,0 +1,124 @@
+"""
+Counts of each object type in Simbad, kept in a versioned JSON file.
+
+The counts are refreshed by asking Simbad's sim-sam page for each type on a
+small pool of threads. Failed requests are retried, and only the types whose
+counts are older than `max_age_days` are asked for again, so a refresh that
+falls over part way through can just be run again.
+
+Usage: python census.py [filename] [max_age_days]
+"""
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+from multiprocessing.pool import ThreadPool
+
+CENSUS_VERSION = 1
+
+CENSUS_FILENAME = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'otype_counts.json')
+
+# Types counted within this many days aren't asked for again
+MAX_AGE_DAYS = 90
+
+# Concurrent requests to Simbad, and attempts at each one
+N_THREADS = 8
+ATTEMPTS = 3
+BACKOFF = 2.0
+
+
+def load_census(filename=CENSUS_FILENAME):
+    """Return the census as a dict of otype name -> entry, or {} if missing."""
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+    except IOError:
+        return {}
+    if data.get('version') != CENSUS_VERSION:
+        raise ValueError('{} has census version {}, expected {}'.format(
+            filename, data.get('version'), CENSUS_VERSION))
+    return data['types']
+
+def load_counts(filename=CENSUS_FILENAME):
+    """Return a dict of otype name -> number of objects in Simbad."""
+    return dict((name, entry['count'])
+                for name, entry in load_census(filename).items())
+
+def save_census(types, filename=CENSUS_FILENAME):
+    """Write the census, replacing the old file only once it's complete."""
+    handle, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(filename)))
+    with os.fdopen(handle, 'w') as f:
+        json.dump({'version': CENSUS_VERSION, 'types': types}, f,
+                  indent=1, sort_keys=True)
+        f.write('\n')
+    os.rename(temp_path, filename)
+
+def stale_otypes(otypes, types, max_age_days=MAX_AGE_DAYS, today=None):
+    """Return the otypes that are missing from the census or out of date."""
+    if today is None:
+        today = datetime.date.today()
+    oldest = (today - datetime.timedelta(days=max_age_days)).isoformat()
+    return [otype for otype in otypes
+            if otype.name not in types or types[otype.name]['updated'] < oldest]
+
+def count_with_retries(condensed_name, attempts=ATTEMPTS, backoff=BACKOFF,
+                       verbose=False):
+    """
+    Return the count for one otype, or None if every attempt failed.
+
+    An attempt fails if the request does, or if the response has no count.
+    """
+    from requests import RequestException
+    from otype import count_single_otype
+    for attempt in xrange(attempts):
+        try:
+            return count_single_otype(condensed_name, verbose=verbose)
+        except (RequestException, ValueError) as e:
+            print 'Counting {} failed ({}: {})'.format(
+                condensed_name, type(e).__name__, e)
+            if attempt < attempts - 1:
+                time.sleep(backoff * 2 ** attempt)
+    return None
+
+def count_all(otypes, n_threads=N_THREADS, attempts=ATTEMPTS, verbose=False):
+    """Return a dict of otype name -> count, leaving out any that failed."""
+    pool = ThreadPool(n_threads)
+    try:
+        counts = pool.map(
+            lambda otype: count_with_retries(
+                otype.condensed, attempts=attempts, verbose=verbose),
+            otypes)
+    finally:
+        pool.close()
+        pool.join()
+    return dict((otype.name, count) for otype, count in zip(otypes, counts)
+                if count is not None)
+
+def refresh_census(filename=CENSUS_FILENAME, max_age_days=MAX_AGE_DAYS,
+                   n_threads=N_THREADS):
+    """Count the stale types again and save the census. Return the census."""
+    from otype import OTYPES_LIST
+    types = load_census(filename)
+    stale = stale_otypes(OTYPES_LIST, types, max_age_days)
+    print 'Counting {} of {} types'.format(len(stale), len(OTYPES_LIST))
+    counts = count_all(stale, n_threads=n_threads)
+    today = datetime.date.today().isoformat()
+    for otype in stale:
+        if otype.name in counts:
+            types[otype.name] = {'condensed': otype.condensed,
+                                 'count': counts[otype.name],
+                                 'updated': today}
+    save_census(types, filename)
+    print 'Saved {}; {} types failed and are still stale'.format(
+        filename, len(stale) - len(counts))
+    return types
+
+
+if __name__ == '__main__':
+    filename = sys.argv[1] if len(sys.argv) > 1 else CENSUS_FILENAME
+    max_age_days = float(sys.argv[2]) if len(sys.argv) > 2 else MAX_AGE_DAYS
+    refresh_census(filename, max_age_days)
@@ -0,0 +1,126 @@
+"""
+Find place names in text without a remote tagger.
+
+Place names from a gazetteer are loaded once into a trie of lowercased
+words. Text is split into words and commas, and the trie is walked from
+each capitalised word to find the longest place name starting there. As
+with the tagged output from text-processing.com, place names that follow
+one another, or are separated only by a comma ("Paris, Texas"), make up a
+single location, and the location with the most words wins.
+
+The gazetteer file has one place name per line. To make one from a GeoNames
+dump (e.g. cities15000.txt from http://download.geonames.org/export/dump/):
+
+Usage: python gazetteer.py cities15000.txt gazetteer.txt [min_population]
+"""
+import codecs
+import re
+import string
+import sys
+
+# Marks the end of a complete place name in the trie
+END = ''
+
+TOKEN_PATTERN = re.compile(r'[^\s,]+|,', re.UNICODE)
+
+
+class Gazetteer(object):
+    """A trie of place names, split into words."""
+
+    def __init__(self, names=()):
+        self.trie = {}
+        self.n_names = 0
+        for name in names:
+            self.add(name)
+
+    @classmethod
+    def load(cls, filename):
+        """Load a gazetteer file with one place name per line."""
+        with codecs.open(filename, encoding='utf-8') as f:
+            return cls(line.strip() for line in f if line.strip())
+
+    def add(self, name):
+        """Add one place name."""
+        words = [word.lower() for word in tokenize(name) if word != ',']
+        if not words:
+            return
+        node = self.trie
+        for word in words:
+            node = node.setdefault(word, {})
+        if END not in node:
+            node[END] = True
+            self.n_names += 1
+
+    def match(self, words, start):
+        """Return the number of words in the longest name at `start`, or 0."""
+        node = self.trie
+        longest = 0
+        for idx in xrange(start, len(words)):
+            node = node.get(words[idx].lower())
+            if node is None:
+                break
+            if END in node:
+                longest = idx - start + 1
+        return longest
+
+    def find_location(self, text):
+        """Return the longest location in the text, or ''."""
+        tokens = tokenize(text)
+        location = []
+        current_location = []
+        idx = 0
+        while idx < len(tokens):
+            token = tokens[idx]
+            n_words = 0
+            if token[:1].isupper():
+                n_words = self.match(tokens, idx)
+            if n_words:
+                # A place name, add it to the current location
+                current_location.extend(tokens[idx:idx+n_words])
+                idx += n_words
+                continue
+            if token == ',' and current_location:
+                current_location[-1] += ','
+            else:
+                # Not part of a location
+                if len(current_location) > len(location):
+                    location = current_location
+                current_location = []
+            idx += 1
+        if len(current_location) > len(location):
+            location = current_location
+        return ' '.join(location)
+
+
+def tokenize(text):
+    """Split text into words and commas, trimming other punctuation."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text):
+        if token != ',':
+            token = token.strip(string.punctuation)
+            if not token:
+                continue
+        tokens.append(token)
+    return tokens
+
+def build_gazetteer(geonames_filename, filename, min_population=15000):
+    """Write the names of places in a GeoNames dump to a gazetteer file."""
+    names = set()
+    with codecs.open(geonames_filename, encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            if int(fields[14] or 0) < min_population:
+                continue
+            # The name, and its plain ASCII version
+            names.update(fields[1:3])
+    names.discard('')
+    with codecs.open(filename, 'w', encoding='utf-8') as f:
+        for name in sorted(names):
+            f.write(name + '\n')
+    return len(names)
+
+
+if __name__ == '__main__':
+    min_population = int(sys.argv[3]) if len(sys.argv) > 3 else 15000
+    n_names = build_gazetteer(sys.argv[1], sys.argv[2], min_population)
+    print 'Wrote {} place names to {}'.format(n_names, sys.argv[2])
@@ -0,0 +1,116 @@
+"""
+Cache of geocoding results, so that repeated place names skip Google.
+
+Entries live in an in-memory LRU in front of a SQLite file, so they survive
+restarts. Names that could not be found are cached too (as None), with a
+shorter lifetime, so junk requests don't keep hitting the API. Expired
+entries are deleted from the file every `prune_every` writes.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class GeocodeCache(object):
+    """An LRU cache of location dicts, backed by a SQLite file."""
+
+    def __init__(self, filename=':memory:', max_entries=1000,
+                 ttl=30*24*3600, negative_ttl=24*3600, prune_every=1000):
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS locations '
+            '(key TEXT PRIMARY KEY, location TEXT, expires REAL)')
+        self.connection.commit()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.prune_every = prune_every
+        self.n_writes = 0
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.prune()
+
+    def get(self, name, strict):
+        """
+        Look up a request in the cache.
+
+        Returns a tuple (found, location). `location` is None if the name is
+        known not to exist.
+        """
+        key = cache_key(name, strict)
+        now = time.time()
+        with self.lock:
+            if key in self.memory:
+                location, expires = self.memory.pop(key)
+            else:
+                row = self.connection.execute(
+                    'SELECT location, expires FROM locations WHERE key = ?',
+                    (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return False, None
+                location, expires = json.loads(row[0]), row[1]
+            if expires < now:
+                self.connection.execute(
+                    'DELETE FROM locations WHERE key = ?', (key,))
+                self.connection.commit()
+                self.misses += 1
+                return False, None
+            self._remember(key, location, expires)
+            if location is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+        return True, location
+
+    def set(self, name, strict, location):
+        """Store a location dict, or None if the name could not be found."""
+        key = cache_key(name, strict)
+        if location is None:
+            expires = time.time() + self.negative_ttl
+        else:
+            expires = time.time() + self.ttl
+        with self.lock:
+            self._remember(key, location, expires)
+            self.connection.execute(
+                'INSERT OR REPLACE INTO locations VALUES (?, ?, ?)',
+                (key, json.dumps(location), expires))
+            self.connection.commit()
+            self.n_writes += 1
+            due = self.n_writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Delete all expired entries from the disk store."""
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM locations WHERE expires < ?', (time.time(),))
+            self.connection.commit()
+
+    def stats(self):
+        """Return the hit and miss counts, and the number of entries held."""
+        with self.lock:
+            n_disk = self.connection.execute(
+                'SELECT COUNT(*) FROM locations').fetchone()[0]
+            return {'hits': self.hits,
+                    'negative_hits': self.negative_hits,
+                    'misses': self.misses,
+                    'memory_entries': len(self.memory),
+                    'disk_entries': n_disk}
+
+    def _remember(self, key, location, expires):
+        """Put an entry at the fresh end of the in-memory LRU."""
+        self.memory[key] = (location, expires)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+
+def cache_key(name, strict):
+    """Normalise a location request into a cache key."""
+    return u'{}|{}'.format(' '.join(name.lower().split()), bool(strict))
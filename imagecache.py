@@ -0,0 +1,124 @@
+"""
+Disk cache of sky images, keyed by object coordinates.
+
+Both the raw Aladin JPEG and the cropped image with the arrow are kept, so a
+repeat object costs one disk read instead of a download, decode and crop.
+Files are evicted least-recently-used first once the cache is over its size
+limit. The total size is kept track of as images are added, so the directory
+is only scanned when something has to be evicted, and then enough is deleted
+to get down to `low_water` of the limit.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+
+# Coordinates are rounded to this many degrees (0.1 arcsec) before hashing
+COORDS_QUANTUM = 1.0 / 36000
+
+# Fraction of the size limit that eviction brings the cache down to
+LOW_WATER = 0.9
+
+
+class ImageCache(object):
+    """A size-limited directory of JPEG files."""
+
+    def __init__(self, directory, max_bytes=200*1024*1024,
+                 low_water=LOW_WATER):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.lock = threading.Lock()
+        self.total_bytes = sum(size for _, size, _ in self.entries())
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, coords, kind, n_pix=None):
+        """Return the cached bytes for an image, or None."""
+        path = self.path(coords, kind, n_pix)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            self.misses += 1
+            return None
+        # Mark it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, coords, kind, data, n_pix=None):
+        """
+        Store the bytes for an image, evicting old images if necessary.
+
+        Errors are printed rather than raised: failing to cache an image
+        shouldn't fail the reply it's for.
+        """
+        path = self.path(coords, kind, n_pix)
+        temp_path = None
+        try:
+            handle, temp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(handle, 'wb') as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.rename(temp_path, path)
+        except (IOError, OSError) as e:
+            print 'Could not cache image {}: {}'.format(path, e)
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self.lock:
+            self.total_bytes += len(data) - replaced
+            over = self.total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def path(self, coords, kind, n_pix=None):
+        """Return the file path for an image."""
+        key = '{:d}:{:d}:{}'.format(
+            int(round(coords.ra.degree / COORDS_QUANTUM)),
+            int(round(coords.dec.degree / COORDS_QUANTUM)),
+            n_pix)
+        digest = hashlib.sha1(key).hexdigest()
+        return os.path.join(self.directory, '{}.{}.jpeg'.format(digest, kind))
+
+    def entries(self):
+        """Return (mtime, size, path) for every file, oldest first."""
+        entries = []
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Evicted by another thread
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Delete the least recently used images until under the low water."""
+        with self.lock:
+            try:
+                entries = self.entries()
+            except OSError as e:
+                print 'Could not evict images: {}'.format(e)
+                return
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.low_water * self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+            self.total_bytes = total
@@ -0,0 +1,331 @@
+"""
+An append-only journal of tweets on disk, between the stream and processing.
+
+The thread reading the Twitter stream only appends each tweet to the
+journal, so it keeps up however slowly tweets are processed, and nothing it
+has read is lost if the bot falls over. Tweets are read back in order, and
+once a tweet and every one before it have been processed, its offset is
+committed. After a restart, reading carries on from the last committed
+offset, so every tweet is processed at least once.
+
+Each record is a 4-byte length and a 4-byte CRC-32, followed by the tweet as
+JSON. Appends are fsynced in batches, after `sync_every` records or
+`sync_interval` seconds, whichever comes first. The journal is split into
+segment files named by the offset they start at, and a segment is deleted
+once everything in it has been committed.
+
+A record that fails its CRC part way through the journal is skipped: reading
+carries on from the next valid record after it. Only bad bytes at the very
+end, left by a write that never finished, are cut off.
+"""
+import bisect
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+
+HEADER = struct.Struct('>II')
+
+# Records appended between fsyncs, and the longest they wait for one
+SYNC_EVERY = 100
+SYNC_INTERVAL = 0.05
+
+# Size at which a new segment is started
+SEGMENT_BYTES = 64 * 1024 * 1024
+
+# Records processed between writes of the committed offset
+COMMIT_EVERY = 20
+
+COMMITTED_FILENAME = 'committed'
+
+
+class Journal(object):
+    """A directory of segment files, with one appender and one reader."""
+
+    def __init__(self, directory, sync_every=SYNC_EVERY,
+                 sync_interval=SYNC_INTERVAL, segment_bytes=SEGMENT_BYTES,
+                 commit_every=COMMIT_EVERY):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.segment_bytes = segment_bytes
+        self.commit_every = commit_every
+        # Guards everything below, and is notified when records are added
+        self.condition = threading.Condition()
+        self.segments = sorted(
+            int(name[:-4]) for name in os.listdir(directory)
+            if name.endswith('.log'))
+        self.committed = self.read_committed()
+        if not self.segments:
+            self.segments = [self.committed]
+        # Offset just past the last complete record
+        self.end = self.recover()
+        # Anything committed but never synced was lost with the last run
+        self.committed = min(self.committed, self.end)
+        self.write_file = open(self.segment_path(self.segments[-1]), 'ab')
+        self.n_unsynced = 0
+        self.last_sync = time.time()
+        self.finished = False
+        self.closed = threading.Event()
+        # Offsets handed out but not yet done, in order, and the done ones
+        self.in_flight = deque()
+        self.done_offsets = set()
+        # Offset just past the last record handed out
+        self.consumed = self.committed
+        self.n_done = 0
+        self.syncer = threading.Thread(target=self._sync_periodically)
+        self.syncer.daemon = True
+        self.syncer.start()
+
+    def segment_path(self, base):
+        """Return the filename of the segment starting at `base`."""
+        return os.path.join(self.directory, '{:020d}.log'.format(base))
+
+    def read_committed(self):
+        """Return the committed offset saved on disk, or 0."""
+        try:
+            with open(os.path.join(self.directory, COMMITTED_FILENAME)) as f:
+                return int(f.read())
+        except (IOError, ValueError):
+            return 0
+
+    def recover(self):
+        """Cut off any partly written record at the end, and return the end."""
+        base = self.segments[-1]
+        path = self.segment_path(base)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            return base
+        position = 0
+        while position < len(data):
+            record_end = end_of_record(data, position)
+            if record_end is not None:
+                position = record_end
+                continue
+            following = next_record(data, position + 1)
+            if following is None:
+                break
+            print ('Corrupt journal record in {} at {}, '
+                   'skipping {} bytes').format(
+                       path, position, following - position)
+            position = following
+        if position < len(data):
+            print 'Truncating journal segment {} at {}'.format(path, position)
+            with open(path, 'r+b') as f:
+                f.truncate(position)
+        return base + position
+
+    def append(self, tweet):
+        """Add a tweet to the end of the journal."""
+        payload = json.dumps(tweet)
+        record = HEADER.pack(
+            len(payload), zlib.crc32(payload) & 0xffffffff) + payload
+        with self.condition:
+            if self.end - self.segments[-1] >= self.segment_bytes:
+                self._roll()
+            self.write_file.write(record)
+            # Readers use their own file handles, so it has to reach the OS
+            self.write_file.flush()
+            self.end += len(record)
+            self.n_unsynced += 1
+            if (self.n_unsynced >= self.sync_every or
+                    time.time() - self.last_sync >= self.sync_interval):
+                self._sync()
+            self.condition.notify_all()
+
+    def append_all(self, stream):
+        """Append every tweet from a stream, then mark the journal finished."""
+        try:
+            for tweet in stream:
+                self.append(tweet)
+        finally:
+            self.finish()
+
+    def finish(self):
+        """Mark that nothing more will be appended."""
+        with self.condition:
+            self._sync()
+            self.finished = True
+            self.condition.notify_all()
+
+    def entries(self):
+        """
+        Yield (offset, tweet) for each record after the committed offset.
+
+        Waits for more records to be appended, until finish() is called.
+        Call done(offset) once each tweet has been processed.
+        """
+        offset = self.consumed
+        read_file = None
+        read_base = None
+        try:
+            while True:
+                with self.condition:
+                    while offset >= self.end and not self.finished:
+                        self.condition.wait(1.0)
+                    if offset >= self.end:
+                        return
+                    idx = bisect.bisect_right(self.segments, offset) - 1
+                    base = self.segments[idx]
+                if base != read_base:
+                    if read_file is not None:
+                        read_file.close()
+                    read_file = open(self.segment_path(base), 'rb')
+                    read_base = base
+                read_file.seek(offset - base)
+                payload = read_record(read_file)
+                if payload is None:
+                    offset = self._skip_corrupt(read_file, base, offset)
+                    continue
+                next_offset = base + read_file.tell()
+                with self.condition:
+                    self.in_flight.append(offset)
+                    self.consumed = next_offset
+                yield offset, json.loads(payload)
+                offset = next_offset
+        finally:
+            if read_file is not None:
+                read_file.close()
+
+    def done(self, offset):
+        """Mark the record at `offset` as processed."""
+        with self.condition:
+            self.done_offsets.add(offset)
+            while self.in_flight and self.in_flight[0] in self.done_offsets:
+                self.done_offsets.remove(self.in_flight.popleft())
+            self.n_done += 1
+            if self.n_done % self.commit_every == 0:
+                self._commit()
+
+    def commit(self):
+        """Save the committed offset now."""
+        with self.condition:
+            self._commit()
+
+    def close(self):
+        """Commit, sync and close the journal."""
+        with self.condition:
+            self.finished = True
+            self._commit()
+            self._sync()
+            self.write_file.close()
+            self.closed.set()
+            self.condition.notify_all()
+        self.syncer.join()
+
+    def stats(self):
+        """Return the size of the backlog waiting to be processed."""
+        with self.condition:
+            return {'end': self.end, 'committed': self.committed,
+                    'backlog_bytes': self.end - self.consumed,
+                    'in_flight': len(self.in_flight),
+                    'segments': len(self.segments)}
+
+    def _skip_corrupt(self, read_file, base, offset):
+        """Return the offset of the next valid record after a corrupt one."""
+        with self.condition:
+            idx = self.segments.index(base)
+            if idx + 1 < len(self.segments):
+                limit = self.segments[idx + 1]
+            else:
+                limit = self.end
+        read_file.seek(offset - base)
+        following = next_record(read_file.read(limit - offset), 1)
+        if following is None:
+            following = limit - offset
+        print 'Corrupt journal record at {}, skipping {} bytes'.format(
+            offset, following)
+        with self.condition:
+            self.consumed = offset + following
+        return offset + following
+
+    def _commit(self):
+        """Save the offset before which everything has been processed."""
+        if self.in_flight:
+            committed = self.in_flight[0]
+        else:
+            committed = self.consumed
+        if committed == self.committed:
+            return
+        handle, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'w') as f:
+            f.write(str(committed))
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(temp_path, os.path.join(self.directory, COMMITTED_FILENAME))
+        sync_directory(self.directory)
+        self.committed = committed
+        # Delete the segments that have been entirely committed
+        while len(self.segments) > 1 and self.segments[1] <= committed:
+            os.remove(self.segment_path(self.segments.pop(0)))
+
+    def _sync(self):
+        """Make sure everything appended so far is on disk."""
+        if self.n_unsynced and not self.write_file.closed:
+            os.fsync(self.write_file.fileno())
+        self.n_unsynced = 0
+        self.last_sync = time.time()
+
+    def _roll(self):
+        """Start a new segment at the current end."""
+        self._sync()
+        self.write_file.close()
+        self.segments.append(self.end)
+        self.write_file = open(self.segment_path(self.end), 'ab')
+        sync_directory(self.directory)
+
+    def _sync_periodically(self):
+        """Sync anything left waiting by a lull in appends."""
+        while not self.closed.wait(self.sync_interval):
+            with self.condition:
+                if self.n_unsynced:
+                    self._sync()
+
+
+def read_record(f):
+    """Return the next record's payload from a file, or None if it's bad."""
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    length, crc = HEADER.unpack(header)
+    # Every tweet is some JSON, so an empty record is zeroed disk
+    if length == 0:
+        return None
+    payload = f.read(length)
+    if len(payload) < length or zlib.crc32(payload) & 0xffffffff != crc:
+        return None
+    return payload
+
+def end_of_record(data, position):
+    """Return where the record at `position` in a string ends, or None."""
+    if position + HEADER.size > len(data):
+        return None
+    length, crc = HEADER.unpack_from(data, position)
+    end = position + HEADER.size + length
+    if (length == 0 or end > len(data) or
+            zlib.crc32(data[position + HEADER.size:end]) & 0xffffffff != crc):
+        return None
+    return end
+
+def next_record(data, start):
+    """Return the position of the first valid record from `start`, or None."""
+    for position in xrange(start, len(data) - HEADER.size):
+        if end_of_record(data, position) is not None:
+            return position
+    return None
+
+def sync_directory(directory):
+    """Make renames and new files in a directory durable."""
+    handle = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(handle)
+    finally:
+        os.close(handle)
@@ -0,0 +1,162 @@
+"""
+Latency and error metrics for each stage of replying to a tweet.
+
+Every observation is labelled with the stage and the type of tweet being
+handled. The totals can be served in Prometheus text format from a small
+HTTP endpoint, and each observation can also be written as a line of JSON
+to a log file for anyone not running Prometheus.
+"""
+import bisect
+import json
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+# Upper edges of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+           30.0)
+
+
+class Timer(object):
+    """Times a block of code. The tweet type can be changed inside it."""
+
+    def __init__(self, metrics, stage, tweet_type):
+        self.metrics = metrics
+        self.stage = stage
+        self.tweet_type = tweet_type
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.metrics.observe(self.stage, self.tweet_type,
+                             time.time() - self.start, error=exc_type)
+        return False
+
+
+class Metrics(object):
+    """Latency histograms and error counts, by stage and tweet type."""
+
+    def __init__(self, log_filename=None, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        # (stage, tweet_type) -> [bucket counts..., sum, count]
+        self.histograms = {}
+        # (stage, tweet_type, error name) -> count
+        self.errors = {}
+        # name -> (help text, function returning the current count)
+        self.counters = {}
+        self.lock = threading.Lock()
+        if log_filename:
+            self.log_file = open(log_filename, 'a')
+        else:
+            self.log_file = None
+        self.server = None
+
+    def timer(self, stage, tweet_type='unknown'):
+        """Return a context manager that records how long its block takes."""
+        return Timer(self, stage, tweet_type)
+
+    def timed(self, func, stage, tweet_type='unknown'):
+        """Wrap a function so that every call to it is timed."""
+        def timed_func(*args, **kwargs):
+            with self.timer(stage, tweet_type):
+                return func(*args, **kwargs)
+        return timed_func
+
+    def register_counter(self, name, help_text, func):
+        """Add a counter kept elsewhere, read by calling `func`."""
+        self.counters[name] = (help_text, func)
+
+    def observe(self, stage, tweet_type, seconds, error=None):
+        """Record one run of a stage. `error` is the exception class, if any."""
+        key = (stage, tweet_type)
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = [0] * (len(self.buckets) + 2)
+                self.histograms[key] = histogram
+            if bucket < len(self.buckets):
+                histogram[bucket] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+            if error is not None:
+                error_key = key + (error.__name__,)
+                self.errors[error_key] = self.errors.get(error_key, 0) + 1
+            if self.log_file is not None:
+                self.log_file.write(json.dumps({
+                    'time': time.time(), 'stage': stage,
+                    'tweet_type': tweet_type, 'seconds': seconds,
+                    'error': error.__name__ if error is not None else None,
+                }) + '\n')
+                self.log_file.flush()
+
+    def render(self):
+        """Return all the metrics in Prometheus text format."""
+        with self.lock:
+            histograms = dict((key, list(value))
+                              for key, value in self.histograms.items())
+            errors = dict(self.errors)
+        lines = [
+            '# HELP whatsaboveme_stage_seconds Time taken by each stage.',
+            '# TYPE whatsaboveme_stage_seconds histogram',
+        ]
+        for (stage, tweet_type), histogram in sorted(histograms.items()):
+            labels = 'stage="{}",tweet_type="{}"'.format(stage, tweet_type)
+            cumulative = 0
+            for edge, count in zip(self.buckets, histogram):
+                cumulative += count
+                lines.append('whatsaboveme_stage_seconds_bucket{{{},le="{}"}} {}'
+                             .format(labels, edge, cumulative))
+            lines.append('whatsaboveme_stage_seconds_bucket{{{},le="+Inf"}} {}'
+                         .format(labels, histogram[-1]))
+            lines.append('whatsaboveme_stage_seconds_sum{{{}}} {!r}'.format(
+                labels, histogram[-2]))
+            lines.append('whatsaboveme_stage_seconds_count{{{}}} {}'.format(
+                labels, histogram[-1]))
+        lines.extend([
+            '# HELP whatsaboveme_stage_errors_total Exceptions raised by '
+            'each stage.',
+            '# TYPE whatsaboveme_stage_errors_total counter',
+        ])
+        for (stage, tweet_type, error), count in sorted(errors.items()):
+            lines.append(
+                'whatsaboveme_stage_errors_total{{stage="{}",tweet_type="{}",'
+                'error="{}"}} {}'.format(stage, tweet_type, error, count))
+        for name, (help_text, func) in sorted(self.counters.items()):
+            lines.extend([
+                '# HELP {} {}'.format(name, help_text),
+                '# TYPE {} counter'.format(name),
+                '{} {}'.format(name, func()),
+            ])
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve the metrics over HTTP from a background thread."""
+        self.server = HTTPServer((host, port), MetricsHandler)
+        self.server.metrics = self
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        print 'Serving metrics on http://{}:{}/metrics'.format(host, port)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Answers GET /metrics with the current metrics."""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.render()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would drown out the bot's own output
+        pass
@@ -1,10 +1,9 @@
-import requests
-# from astropy.cosmology import WMAP9
-import astropy.units as u
-
 import re
 from collections import namedtuple
 import math
+import bisect
+
+from census import load_counts, count_all
 
 Otype = namedtuple(
     'Otype', ('name', 'condensed', 'explanation',
@@ -245,133 +244,172 @@ OTYPES_LIST = [Otype(*o) for o in [
 OTYPES_DICT = {
     otype.name: otype for otype in OTYPES_LIST}
 
-def info(obj):
-    """Return HTML info about a specific object."""
-    if obj['type'] == 'Star':
-        text = '<p>There are around 300 billion stars in our galaxy, the Milky Way. In general, the most massive stars are the most luminous, but they also live for a shorter time. How bright a star appears from Earth also depends on how close to us it is.</p>'
-        links = {
+# Number of objects of each type in Simbad, refreshed with census.py
+OTYPE_COUNTS = load_counts()
+
+# What to say about the commonest types, keyed by Otype.name. The 'text' is
+# a paragraph, and 'faint' is added to it when the object has no magnitude.
+# Both are str.format templates, filled in with the object's name.
+CONTENT = {
+    'Star': {
+        'text': 'There are around 300 billion stars in our galaxy, the Milky Way. In general, the most massive stars are the most luminous, but they also live for a shorter time. How bright a star appears from Earth also depends on how close to us it is.',
+        'links': {
             "'Stars' on NASA": "http://science.nasa.gov/astrophysics/focus-areas/how-do-stars-form-and-evolve/",
             "'Star' on Wikipedia": "http://en.wikipedia.org/wiki/Star",
             "Visualisation of nearby stars": "http://stars.chromeexperiments.com/",
-        }
-    elif obj['type'] == 'IR':
-        text = "<p>We don't know much about this object except that it emits plenty of infrared light. It might be a small, cool star or a distant galaxy."
-        if not obj['mag']:
-            text += " Because it's fainter in visible light than in the infrared, you might not be able to see anything in the image."
-        text += '</p>'
-        links = {
+        },
+    },
+    'IR': {
+        'text': "We don't know much about this object except that it emits plenty of infrared light. It might be a small, cool star or a distant galaxy.",
+        'faint': " Because it's fainter in visible light than in the infrared, you might not be able to see anything in the image.",
+        'links': {
             "'IR astronomy: overview' on NASA/IPAC": "http://www.ipac.caltech.edu/outreach/Edu/importance.html",
             "'Infrared astronomy' on Wikipedia": "http://en.wikipedia.org/wiki/Infrared_astronomy",
             "'Why does infrared astronomy matter?' by Eric Diaz": "http://ericfdiaz.wordpress.com/why-does-infrared-astronomy-matters/",
-        }
-    elif obj['type'] == 'Galaxy':
-        text = "<p>Galaxies can contain hundreds of billions of stars, or sometimes even more. Because they are so far away, we normally can't see the individual stars. Instead we see the total light from all of them together."
-        # if obj['redshift']:
-        #     text += " This particular galaxy has been measured to be about {} light years away.".format(wordify_number(distance(obj['redshift'])))
-        text += '</p>'
-        links = {
+        },
+    },
+    'Galaxy': {
+        'text': "Galaxies can contain hundreds of billions of stars, or sometimes even more. Because they are so far away, we normally can't see the individual stars. Instead we see the total light from all of them together.",
+        'links': {
             "'Galaxy' on Wikipedia": "http://en.wikipedia.org/wiki/Galaxy",
             "Help astronomers classify galaxies at Galaxy Zoo": "http://www.galaxyzoo.org/",
-        }
-    elif obj['type'] == 'Radio':
-        text = "<p>We don't know much about this object except that it emits radio waves. It's probably a distant galaxy, with strong magnetic fields that produce the radio waves we see. Alternatively, it could be a pulsar or other object inside our own galaxy, the Milky Way."
-        if not obj['mag']:
-            text += " Because it's fainter in visible light than in the radio, you might not be able to see anything in the image."
-        text += '</p>'
-        links = {
+        },
+    },
+    'Radio': {
+        'text': "We don't know much about this object except that it emits radio waves. It's probably a distant galaxy, with strong magnetic fields that produce the radio waves we see. Alternatively, it could be a pulsar or other object inside our own galaxy, the Milky Way.",
+        'faint': " Because it's fainter in visible light than in the radio, you might not be able to see anything in the image.",
+        'links': {
             "'What is radio astronomy?' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/everyone/radio-astronomy/index.html",
             "'Radio astronomy' on Wikipedia": "http://en.wikipedia.org/wiki/Radio_astronomy",
             "'Radio astronomy' on theSkyNet": "https://www.theskynet.org/science_portals/radio?locale=en",
-        }
-    elif obj['type'] == '*inCl':
-        text = "<p>This star lives within a cluster, that could contain anything from a hundred stars to many hundreds of thousands. The largest star clusters are very stable and long-lived, but smaller ones are gradually pulled apart by gravitational forces as they move around inside the galaxy.</p>"
-        links = {
+        },
+    },
+    '*inCl': {
+        'text': 'This star lives within a cluster, that could contain anything from a hundred stars to many hundreds of thousands. The largest star clusters are very stable and long-lived, but smaller ones are gradually pulled apart by gravitational forces as they move around inside the galaxy.',
+        'links': {
             "'Star cluster' on Wikipedia": "http://en.wikipedia.org/wiki/Star_cluster",
             "'Star clusters' clips on the BBC": "http://www.bbc.co.uk/science/space/universe/sights/star_clusters",
             "'Star clusters' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/senior/astrophysics/stellarevolution_clusters.html",
-        }
-    elif obj['type'] == 'GinGroup':
-        text = "<p>This galaxy lives inside a group of galaxies, which may contain up to around 50 galaxies in a region of space a few million light years across. Our own galaxy, the Milky Way, lives in a small group like this, called the Local Group."
-        # if obj['redshift']:
-        #     text += " This galaxy has been measured to be about {} light years away.".format(wordify_number(distance(obj['redshift'])))
-        text += '</p>'
-        links = {
+        },
+    },
+    'GinGroup': {
+        'text': 'This galaxy lives inside a group of galaxies, which may contain up to around 50 galaxies in a region of space a few million light years across. Our own galaxy, the Milky Way, lives in a small group like this, called the Local Group.',
+        'links': {
             "'Galaxy group' on Wikipedia": "http://en.wikipedia.org/wiki/Galaxy_group",
             "'Group environment' on Swinburne COSMOS": "http://astronomy.swin.edu.au/cosmos/G/group+environment",
-        }
-    elif obj['type'] == 'V*':
-        text = "<p>Many stars, including this one, vary in brightness over time. There are many things that can cause this, such as changes in the size of the star. Alternatively, if there are two stars orbiting each other they might periodically block some of each other's light.</p>"
-        links = {
+        },
+    },
+    'V*': {
+        'text': "Many stars, including this one, vary in brightness over time. There are many things that can cause this, such as changes in the size of the star. Alternatively, if there are two stars orbiting each other they might periodically block some of each other's light.",
+        'links': {
             "'Variable star' on Wikipedia": "http://en.wikipedia.org/wiki/Variable_star",
             "'Variable stars' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/senior/astrophysics/variable_types.html",
             "The American Association of Variable Star Observers": "http://www.aavso.org/public",
             "'Types of variable stars' on space.com": "http://www.space.com/15396-variable-stars.html",
-        }
-    elif obj['type'] == 'X':
-        text = "<p>We don't know much about this object except that it emits X-ray radiation. This means that, whatever it is, it must be extremely hot: millions of degrees Celcius. The Earth's atmosphere absorbs X-rays, so we can only observe these objects using telescopes on satellites or high-altitude balloons."
-        if not obj['mag']:
-            text += " Because {} is fainter in visible light than in X-rays, you might not be able to see anything in the image.".format(obj['name'])
-        text += '</p>'
-        links = {
+        },
+    },
+    'X': {
+        'text': "We don't know much about this object except that it emits X-ray radiation. This means that, whatever it is, it must be extremely hot: millions of degrees Celcius. The Earth's atmosphere absorbs X-rays, so we can only observe these objects using telescopes on satellites or high-altitude balloons.",
+        'faint': ' Because {name} is fainter in visible light than in X-rays, you might not be able to see anything in the image.',
+        'links': {
             "'X-ray astronomy' on Wikipedia": "http://en.wikipedia.org/wiki/X-ray_astronomy",
             "'History of X-ray astronomy' by NASA's Chandra X-ray Observatory": "http://chandra.harvard.edu/xray_astro/history.html",
             "'X-rays reveal the violent side of the universe' by EarthSky": "http://earthsky.org/astronomy-essentials/x-rays-reveal-the-violent-side-of-the-universe",
-        }
-    elif obj['type'] == 'QSO':
-        text = "<p>A quasar, or quasi-stellar object (QSO), occurs when a large amount of material is falling onto the supermassive black hole in the centre of a galaxy. This material can get heated up until it shines brighter than the galaxy itself. Quasars are some of the most luminous objects ever seen in the universe."
-        # if obj['redshift']:
-        #     text += " This particular quasar has been measured to be about {} light years away.".format(wordify_number(distance(obj['redshift'])))
-        text += '</p>'
-        links = {
+        },
+    },
+    'QSO': {
+        'text': 'A quasar, or quasi-stellar object (QSO), occurs when a large amount of material is falling onto the supermassive black hole in the centre of a galaxy. This material can get heated up until it shines brighter than the galaxy itself. Quasars are some of the most luminous objects ever seen in the universe.',
+        'links': {
             "'3C273', the first confirmed quasar to be discovered, on Wikipedia": "http://en.wikipedia.org/wiki/3C_273",
             "'Quasar' on Wikipedia": "http://en.wikipedia.org/wiki/Quasar",
             "'What is a quasar?' on Universe Today": "http://www.universetoday.com/73222/what-is-a-quasar/",
-        }
-    elif obj['type'] == 'PM*':
-        text = "<p>This star has a high 'proper motion', which means that it is moving relatively fast across the sky. However, because they are so far away, even the 'fastest' stars move very slowly: the highest proper motion of any star is just one degree every 350 years.</p>"
-        links = {
+        },
+    },
+    'PM*': {
+        'text': "This star has a high 'proper motion', which means that it is moving relatively fast across the sky. However, because they are so far away, even the 'fastest' stars move very slowly: the highest proper motion of any star is just one degree every 350 years.",
+        'links': {
             "'Proper motion' on Wikipedia": "http://en.wikipedia.org/wiki/Proper_motion",
             "'Stellar motions' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/senior/astrophysics/proper_motion.html",
             "'The motion of stars' by Courtney Seligman": "http://cseligman.com/text/stars/propermotion.htm",
-        }
-    elif obj['type'] == 'Candidate_RGB*':
-        text = "<p>This star may be a red giant branch star, although we don't know for sure. Stars on the red giant branch are running out of the hydrogen fuel that keeps them lit up for most of their lives. Their core has been entirely converted into helium, while the remaining hydrogen is in an outer shell.</p>"
-        links = {
+        },
+    },
+    'Candidate_RGB*': {
+        'text': "This star may be a red giant branch star, although we don't know for sure. Stars on the red giant branch are running out of the hydrogen fuel that keeps them lit up for most of their lives. Their core has been entirely converted into helium, while the remaining hydrogen is in an outer shell.",
+        'links': {
             "'Red giant' on Wikipedia": "http://en.wikipedia.org/wiki/Red_giant",
             "'Post main sequence stars' by the Australia Telescope National Facility": "http://www.atnf.csiro.au/outreach/education/senior/astrophysics/stellarevolution_postmain.html",
             "'The transition to the red giant phase for sun-like stars' by Penn State University": "https://www.e-education.psu.edu/astro801/content/l6_p2.html",
-        }
-    elif obj['type'] == 'LensingEv':
-        text = "<p>A lensing event can occur when one object, such as a star, passes in front of another. If the alignment is just right, the gravity of the first object acts as a lens for the light of the second object, making it appear brighter for a short amount of time.</p>"
-        links = {
+        },
+    },
+    'LensingEv': {
+        'text': 'A lensing event can occur when one object, such as a star, passes in front of another. If the alignment is just right, the gravity of the first object acts as a lens for the light of the second object, making it appear brighter for a short amount of time.',
+        'links': {
             "'Gravitational microlensing' on Wikipedia": "http://en.wikipedia.org/wiki/Gravitational_microlensing",
             "'Gravitational microlensing' by Las Cumbres Observatory": "http://lcogt.net/spacebook/gravitational-microlensing",
-        }
-    else:
-        text = ''
-        links = {}
+        },
+    },
+}
+
+# Upper edges of the magnitude buckets, and what each one means
+MAG_EDGES = (3.0, 6.0, 9.5, 13.0)
+MAG_VISIBILITY = (
+    'which means it can be seen quite easily with the naked eye.',
+    'which means it can be seen with the naked eye on a dark night.',
+    'which means it can be seen with a good pair of binoculars.',
+    'which means it can be seen with a good telescope.',
+    'which means it is too faint to be seen without a professional-quality telescope.',
+)
+
+# (type, magnitude bucket) -> template, compiled the first time it's needed.
+# The bucket is None for objects without a magnitude.
+INFO_TEMPLATES = {}
+
+def info(obj):
+    """Return HTML info about a specific object."""
     if obj['mag']:
-        text += '<p>{} has a magnitude of {:.1f}, '.format(obj['name'], obj['mag'])
-        if obj['mag'] < 3.0:
-            text += 'which means it can be seen quite easily with the naked eye.'
-        elif obj['mag'] < 6.0:
-            text += 'which means it can be seen with the naked eye on a dark night.'
-        elif obj['mag'] < 9.5:
-            text += 'which means it can be seen with a good pair of binoculars.'
-        elif obj['mag'] < 13.0:
-            text += 'which means it can be seen with a good telescope.'
-        else:
-            text += 'which means it is too faint to be seen without a professional-quality telescope.'
-        text += '</p>'
-    if links:
-        text += '<p>You can learn more by following these links:<ul>'
-        for description, url in links.items():
-            text += '<li><a href="{}">{}</a></li>'.format(url, description)
-        text += '</ul></p>'
-    return text
+        bucket = bisect.bisect_right(MAG_EDGES, obj['mag'])
+    else:
+        bucket = None
+    key = (obj['type'], bucket)
+    template = INFO_TEMPLATES.get(key)
+    if template is None:
+        template = compile_info(*key)
+        INFO_TEMPLATES[key] = template
+    return template % obj
+
+def compile_info(otype_name, bucket):
+    """
+    Return the template for info about one type and magnitude bucket.
+
+    The template is %-style, to be filled in from the object dict itself.
+    """
+    content = CONTENT.get(otype_name)
+    parts = []
+    if content is not None:
+        parts.append('<p>' + escape_percent(content['text']))
+        if bucket is None and 'faint' in content:
+            parts.append(escape_percent(content['faint']).format(
+                name='%(name)s'))
+        parts.append('</p>')
+    if bucket is not None:
+        parts.append('<p>%(name)s has a magnitude of %(mag).1f, ' +
+                     MAG_VISIBILITY[bucket] + '</p>')
+    if content is not None and content['links']:
+        parts.append('<p>You can learn more by following these links:<ul>')
+        for description, url in content['links'].items():
+            parts.append(escape_percent(
+                '<li><a href="{}">{}</a></li>'.format(url, description)))
+        parts.append('</ul></p>')
+    return ''.join(parts)
+
+def escape_percent(text):
+    """Escape text for use in a %-style template."""
+    return text.replace('%', '%%')
 
 def distance(redshift):
     """Return comoving distance in light years for a given redshift."""
+    from astropy.cosmology import WMAP9
+    import astropy.units as u
     return WMAP9.comoving_distance(redshift).to(u.lyr).value
 
 def round_to_n(x, n):
@@ -400,252 +438,26 @@ def wordify_number(number):
 
 def count_otypes(verbose=True):
     """Return a dict of the number of each otype in Simbad."""
-    return {otype[0]: count_single_otype(otype[1], verbose=verbose)
-            for otype in OTYPES_LIST}
+    return count_all(OTYPES_LIST, verbose=verbose)
 
 def count_single_otype(condensed_name, verbose=True):
-    """Return the number of objects with that otype in Simbad."""
-    req = requests.get(
+    """
+    Return the number of objects with that otype in Simbad.
+
+    Raises ValueError if the count can't be found in Simbad's response.
+    """
+    import transport
+    req = transport.get(
         'http://simbad.u-strasbg.fr/simbad/sim-sam',
         params={'OutputMode':'COUNT',
                 'Criteria':"otype = '{}'".format(condensed_name)})
+    req.raise_for_status()
     match = re.search(r'<TD>\n(?P<num>\d+)\n.+</TD>', req.text)
-    if match:
-        num = int(match.group('num'))
-    else:
-        num = 0
+    if not match:
+        # Rather than a count of 0, which would mean the type is never seen
+        raise ValueError('No count for {} in the Simbad response'.format(
+            condensed_name))
+    num = int(match.group('num'))
     if verbose:
         print condensed_name, num
     return num
-
-# Results obtained on 8/11/2014
-# Possible_SClG    0    0.0
-# Candidates    0    0.0
-# Candidate_Pec*    0    0.0
-# Candidate_OH    0    0.0
-# Inexistent    0    0.0
-# Radio(m)    0    0.0
-# Candidate_Ae*    0    0.0
-# metal_ALS    0    0.0
-# Candidate_CH    0    0.0
-# OVV    0    0.0
-# Sub-stellar    2    1.71145867794e-07
-# Candidate_BSG*    3    2.56718801691e-07
-# Gravitation    4    3.42291735589e-07
-# radioBurst    6    5.13437603383e-07
-# Candidate_LensSystem    10    8.55729338971e-07
-# Candidate_Symb*    10    8.55729338971e-07
-# Stream*    19    1.62588574405e-06
-# Candidate_HMXB    19    1.62588574405e-06
-# MouvGroup    20    1.71145867794e-06
-# Candidate_LMXB    21    1.79703161184e-06
-# Candidate_BSS    24    2.05375041353e-06
-# Ae*    29    2.48161508302e-06
-# EB*Planet    31    2.65276095081e-06
-# Candidate_Cepheid    33    2.82390681861e-06
-# DQHer    39    3.33734442199e-06
-# FUOr    40    3.42291735589e-06
-# CH    40    3.42291735589e-06
-# High_z_G    40    3.42291735589e-06
-# Broad_ALS    42    3.59406322368e-06
-# Ly-alpha_ALS    48    4.10750082706e-06
-# Candidate_Nova    54    4.62093843045e-06
-# Neutron*    55    4.70651136434e-06
-# Candidate_RRLyr    57    4.87765723214e-06
-# Candidate_XB*    66    5.64781363721e-06
-# Eruptive*    69    5.9045324389e-06
-# Candidate_SG*    71    6.0756783067e-06
-# Candidate_NS    79    6.76026177787e-06
-# Possible_G    80    6.84583471177e-06
-# Possible_lensImage    85    7.27369938126e-06
-# AMHer    87    7.44484524905e-06
-# ComGlob    100    8.55729338971e-06
-# Candidate_YSG*    102    8.72843925751e-06
-# Candidate_CV*    107    9.15630392699e-06
-# Nova-like    109    9.32744979479e-06
-# Candidate_WR*    111    9.49859566258e-06
-# SFregion    112    9.58416859648e-06
-# Candidate_Lens    112    9.58416859648e-06
-# Circumstellar    122    1.04398979355e-05
-# Possible_GrG    125    1.06966167371e-05
-# ULX?    141    1.20657836795e-05
-# BlueCompG    145    1.24080754151e-05
-# Ly-limit_ALS    147    1.25792212829e-05
-# GalNeb    150    1.28359400846e-05
-# Erupt*RCrB    150    1.28359400846e-05
-# Candidate_BH    151    1.29215130185e-05
-# Outflow    159    1.36060964896e-05
-# SG*    170    1.45473987625e-05
-# Candidate_S*    179    1.53175551676e-05
-# Candidate_low-mass*    183    1.56598469032e-05
-# Void    210    1.79703161184e-05
-# LensedQ    212    1.81414619862e-05
-# pulsWD*    220    1.88260454574e-05
-# Symbiotic*    230    1.96817747963e-05
-# BrNeb    241    2.06230770692e-05
-# BLLac_Candidate    242    2.07086500031e-05
-# PulsV*RVTau    261    2.23345357472e-05
-# Red    269    2.30191192183e-05
-# Rapid_Irreg_V*    284    2.43027132268e-05
-# HV*    284    2.43027132268e-05
-# ULX    303    2.59285989708e-05
-# Seyfert    303    2.59285989708e-05
-# Globule    306    2.61853177725e-05
-# PulsV*bCep    317    2.71266200454e-05
-# Candidate_post-AGB*    347    2.96938080623e-05
-# gammaDor    370    3.16619855419e-05
-# GravLensSystem    376    3.21754231453e-05
-# Cl*?    404    3.45714652944e-05
-# LMXB    423    3.61973510385e-05
-# multiple_object    424    3.62829239724e-05
-# pulsV*SX    447    3.8251101452e-05
-# post-AGB*    454    3.88501119893e-05
-# EllipVar    481    4.11605812045e-05
-# BlueSG*    509    4.35566233536e-05
-# RSCVn    510    4.36421962875e-05
-# outflow?    511    4.37277692214e-05
-# RotV*alf2CVn    515    4.4070060957e-05
-# YellowSG*    516    4.41556338909e-05
-# Candidate_TTau*    555    4.74929783129e-05
-# DwarfNova    639    5.46811047603e-05
-# GravLens    702    6.00721995958e-05
-# DLy-alpha_ALS    725    6.20403770754e-05
-# PulsV*WVir    749    6.4094127489e-05
-# Bubble    863    7.38494419532e-05
-# SNR?    867    7.41917336888e-05
-# LINER    887    7.59031923668e-05
-# Region    917    7.84703803837e-05
-# BYDra    969    8.29201729463e-05
-# LensedG    1026    8.77978301785e-05
-# Candidate_brownD*    1043    8.92525700547e-05
-# StarburstG    1052    9.00227264598e-05
-# CataclyV*    1056    9.03650181954e-05
-# Blazar_Candidate    1098    9.39590814191e-05
-# SuperClG    1118    9.5670540097e-05
-# RedSG*    1154    9.87511657173e-05
-# RedExtreme    1213    0.000103799968817
-# Candidate_C*    1215    0.000103971114685
-# Pec*    1217    0.000104142260553
-# OH/IR    1253    0.000107222886173
-# LensedImage    1318    0.000112785126876
-# Candidate_SN*    1339    0.000114582158488
-# WR*    1369    0.000117149346505
-# HMXB    1373    0.000117491638241
-# XB    1422    0.000121684712002
-# Candidate_**    1441    0.000123310597746
-# S*    1510    0.000129215130185
-# SNR    1545    0.000132210182871
-# Candidate_Be*    1584    0.000135547527293
-# EB*betLyr    1590    0.000136060964896
-# Irregular_V*    1613    0.000138029142376
-# Transient    1654    0.000141537632666
-# Be*    1708    0.000146158571096
-# HIshell    1719    0.000147099873369
-# Planet    1741    0.000148982477915
-# RfNeb    1782    0.000152490968205
-# Nova    1783    0.000152576541139
-# BLLac    1865    0.000159593521718
-# IR>30um    2140    0.00018312607854
-# Possible_ClG    2178    0.000186377850028
-# TTau*    2415    0.000206658635362
-# Pulsar    2434    0.000208284521106
-# Orion_V*    2498    0.000213761188875
-# Flare*    2588    0.000221462752926
-# Candidate_pMS*    2747    0.000235068849415
-# Candidate_EB*    2909    0.000248931664707
-# IG    3144    0.000269041304173
-# Blazar    3258    0.000278796618637
-# HH    3426    0.000293172871532
-# *inNeb    3468    0.000296766934755
-# V*?    3477    0.00029753709116
-# Planet?    3505    0.000299933133309
-# Candidate_RSG*    3576    0.000306008811616
-# brownD*    3679    0.000314822823808
-# OpCl    3705    0.000317047720089
-# PartofG    3851    0.000329541368438
-# denseCore    3961    0.000338954391167
-# gamma    4017    0.000343746475465
-# BlueStraggler    4024    0.000344345486002
-# HII_G    4079    0.000349051997366
-# PairG    4335    0.000370958668444
-# deltaCep    4420    0.000378232367825
-# PN?    4470    0.00038251101452
-# AGB*    4517    0.000386532942413
-# ISM    4671    0.000399711174234
-# PulsV*delSct    4697    0.000401936070515
-# Assoc*    4887    0.000418194927955
-# Candidate_HB*    4888    0.000418280500889
-# HVCld    4997    0.000427607950684
-# EB*WUMa    5062    0.000433170191387
-# Seyfert_2    5064    0.000433341337255
-# AGN_Candidate    5095    0.000435994098206
-# Maser    5591    0.000478438273419
-# GinPair    6041    0.000516946093673
-# pMS*    6105    0.000522422761442
-# PartofCloud    6281    0.000537483597808
-# AbsLineSystem    6287    0.000537997035411
-# Radio(cm)    6316    0.000540478650494
-# EB*Algol    6635    0.000567776416407
-# Unknown    6872    0.000588057201741
-# SB*    6983    0.000597555797404
-# BClG    7081    0.000605941944926
-# MolCld    7392    0.000632555127368
-# PulsV*    7718    0.000660451903818
-# RotV*    7773    0.000665158415182
-# LSB_G    7908    0.000676710761259
-# gammaBurst    8507    0.000727968948663
-# Cloud    8795    0.000752613953625
-# SN    9030    0.000772723593091
-# Radio(sub-mm)    10489    0.000897574503647
-# Mira    10777    0.000922219508609
-# PN    11159    0.000954908369358
-# HI    11457    0.000980409103659
-# IR<10um    11872    0.00101592187123
-# Radio(mm)    12503    0.00106991839252
-# EmObj    12887    0.00110277839913
-# Cepheid    13544    0.0011589998167
-# GlCl?    14574    0.00124713993862
-# RGB*    15418    0.00131936349483
-# Seyfert_1    15611    0.00133587907107
-# *inAssoc    15794    0.00135153891797
-# GlCl    16727    0.0014313784653
-# Candidate_WD*    17183    0.00147039972315
-# HB*    18633    0.00159448047731
-# Cl*    18974    0.00162366084776
-# EB*    19060    0.00163102012008
-# Blue    19335    0.0016545526769
-# semi-regV*    20105    0.001720443836
-# WD*    20474    0.00175202024861
-# GroupG    20920    0.00179018577713
-# Em*    21375    0.00182912146205
-# RadioG    22102    0.00189133298499
-# C*    23823    0.00203860400423
-# Candidate_YSO    26483    0.0022662280084
-# YSO    28231    0.00241580949685
-# DkNeb    28640    0.00245080882681
-# ClG    31303    0.00267868954978
-# HII    34297    0.00293489491387
-# EmG    39208    0.00335514359224
-# QSO_Candidate    41864    0.00358242530467
-# low-mass*    46306    0.00396254027704
-# *in**    55555    0.00475400434266
-# Candidate_AGB*    59129    0.0050598420084
-# RRLyr    62315    0.0053324773758
-# AGN    74253    0.00635404706066
-# Compact_Gr_G    76826    0.00657422621958
-# LPV*    76870    0.00657799142867
-# UV    91260    0.00780938594745
-# **    99450    0.00851022827607
-# GinCl    120792    0.0103365258313
-# LensingEv    132667    0.0113527044213
-# Candidate_RGB*    134349    0.0114966380961
-# PM*    155804    0.0133326053929
-# QSO    157499    0.0134776515159
-# X    234938    0.0201043339439
-# V*    242606    0.020760507201
-# GinGroup    343981    0.0294354633749
-# *inCl    382546    0.0327355835706
-# Radio    500599    0.042837725136
-# Galaxy    1839642    0.15742356326
-# IR    2207854    0.188932544397
-# Star    3653977    0.312681532283
@@ -0,0 +1,61 @@
+"""
+Run the stages of a reply as a dependency graph.
+
+Each stage runs on its own thread as soon as the stages it depends on have
+finished, so independent network calls (e.g. uploading the same image to
+Twitter and to WordPress) overlap instead of running one after the other.
+"""
+import threading
+from collections import namedtuple
+import sys
+
+Stage = namedtuple('Stage', ('name', 'func', 'requires'))
+
+
+def run_stages(stages, **inputs):
+    """
+    Run the stages and return a dict of all their results by name.
+
+    `func` is called with the results of the stages named in `requires`, in
+    that order. Keyword arguments are available as results from the start.
+    If any stage raises an exception, the stages depending on it are skipped
+    and the first exception is re-raised once everything has stopped.
+    """
+    results = dict(inputs)
+    finished = dict((name, threading.Event()) for name in results)
+    finished.update((stage.name, threading.Event()) for stage in stages)
+    for name in inputs:
+        finished[name].set()
+    errors = []
+    skipped = set()
+    lock = threading.Lock()
+
+    def run(stage):
+        for name in stage.requires:
+            finished[name].wait()
+        try:
+            if any(name in skipped for name in stage.requires):
+                with lock:
+                    skipped.add(stage.name)
+                return
+            try:
+                result = stage.func(*[results[name] for name in stage.requires])
+            except Exception:
+                with lock:
+                    errors.append(sys.exc_info())
+                    skipped.add(stage.name)
+            else:
+                results[stage.name] = result
+        finally:
+            finished[stage.name].set()
+
+    threads = [threading.Thread(target=run, args=(stage,)) for stage in stages]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        exc_type, exc_value, exc_traceback = errors[0]
+        raise exc_type, exc_value, exc_traceback
+    return results
@@ -0,0 +1,80 @@
+"""
+Choose which of the objects around the zenith to reply about.
+
+The closest object is nearly always one of the millions of stars or
+infrared sources in Simbad, even when something much rarer, like a quasar
+or a gravitational lens, is only a little further away. Ranking scores
+every candidate on how far it is from the zenith, how rare its type is and
+how bright it is, and picks the best.
+
+Object types are interned to small integer codes, so the rarity of every
+candidate is a single array lookup and the whole cone is scored in one
+vectorised pass.
+"""
+import numpy as np
+
+from otype import OTYPES_LIST, OTYPE_COUNTS
+
+# How much each term counts. Separation is in units of the search radius,
+# rarity in powers of ten fewer objects than the commonest type, and
+# magnitude in magnitudes.
+WEIGHTS = {'separation': 4.0, 'rarity': 1.0, 'magnitude': 0.05}
+
+# Objects with no magnitude are scored as if they were this faint
+FAINT_MAG = 20.0
+
+
+class Ranker(object):
+    """Scores candidate objects using integer codes for their types."""
+
+    def __init__(self, weights=None, counts=OTYPE_COUNTS, faint_mag=FAINT_MAG):
+        self.weights = dict(WEIGHTS)
+        if weights is not None:
+            self.weights.update(weights)
+        self.faint_mag = faint_mag
+        self.codes = dict((otype.name, code)
+                          for code, otype in enumerate(OTYPES_LIST))
+        # Types that aren't in OTYPES_LIST get the last code
+        self.unknown_code = len(OTYPES_LIST)
+        n_objects = np.array([counts.get(otype.name, np.nan)
+                              for otype in OTYPES_LIST], dtype=float)
+        # The census has no count for some types, and neither it nor
+        # OTYPES_LIST knows every type Simbad returns. Rather than guess,
+        # those are all treated as the commonest.
+        counted = ~np.isnan(n_objects)
+        empty = counted & (np.nan_to_num(n_objects) == 0)
+        counted &= ~empty
+        rarity = np.zeros(len(n_objects) + 1)
+        rarity[:-1][counted] = np.log10(
+            n_objects[counted].max() / n_objects[counted])
+        self.rarity = rarity
+        # The census found none at all of some types, e.g. 'Inexistent' and
+        # the catch-all 'Candidates', so their rarity means nothing. Those
+        # are skipped unless nothing else is near enough.
+        self.empty = np.append(empty, False)
+
+    def encode(self, otypes):
+        """Return the integer codes for a column of OTYPE strings."""
+        names, inverse = np.unique(np.asarray(otypes).astype(str),
+                                   return_inverse=True)
+        lookup = np.array([self.codes.get(name, self.unknown_code)
+                           for name in names], dtype=np.int16)
+        return lookup[inverse]
+
+    def scores(self, codes, separations, mags, radius):
+        """Return the score of every candidate; higher is better."""
+        mags = np.where(np.isnan(mags), self.faint_mag, mags)
+        return (self.weights['rarity'] * self.rarity[codes] -
+                self.weights['separation'] * separations / radius -
+                self.weights['magnitude'] * mags)
+
+    def best(self, otypes, separations, mags, radius):
+        """Return the index of the best candidate."""
+        codes = self.encode(otypes)
+        eligible = np.flatnonzero(~self.empty[codes])
+        if not len(eligible):
+            return int(np.argmin(separations))
+        scores = self.scores(
+            codes[eligible], np.asarray(separations)[eligible],
+            np.asarray(mags)[eligible], radius)
+        return int(eligible[np.argmax(scores)])
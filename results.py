@@ -0,0 +1,178 @@
+"""
+A record of the tweets already handled and the answers already given.
+
+Twitter sometimes delivers a tweet twice, and a restart after a crash
+processes some tweets again (see journal.py), so each tweet ID is claimed
+before it's replied to and later claims are turned away. Answers are kept
+too, keyed by the place and a bucket of time, so a second request for the
+same place a few seconds later gets the same object, WordPress post and
+uploaded image without working any of them out again.
+
+A claim only becomes permanent once the reply has been sent. Until then it's
+released if the tweet is dropped or replying fails, and it expires after
+`claim_ttl` seconds. Claims left unfinished by an earlier run are cleared
+when the store is opened, so only one process should use a file at a time.
+
+Both live in a SQLite file. Handled tweets are kept for `tweet_ttl` seconds
+and answers for `answer_ttl` seconds, and older rows are deleted every
+`prune_every` writes.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+# Requests for the same place within one bucket share an answer. The sky
+# moves by the search radius in about a minute.
+BUCKET_SECONDS = 60
+
+TWEET_TTL = 7 * 24 * 3600
+# Claims not finished within this long are assumed to have been abandoned
+CLAIM_TTL = 600
+# Answers are only looked up within their bucket, so they needn't be kept
+# long. Twitter's media IDs expire after a day in any case.
+ANSWER_TTL = 3600
+
+PRUNE_EVERY = 1000
+
+
+class ResultStore(object):
+    """Handled tweet IDs and recent answers, in a SQLite file."""
+
+    def __init__(self, filename=':memory:', bucket_seconds=BUCKET_SECONDS,
+                 tweet_ttl=TWEET_TTL, claim_ttl=CLAIM_TTL,
+                 answer_ttl=ANSWER_TTL, prune_every=PRUNE_EVERY):
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS handled '
+            '(tweet_id INTEGER PRIMARY KEY, handled REAL, done INTEGER)')
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS handled_time ON handled (handled)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS answers '
+            '(key TEXT PRIMARY KEY, answer TEXT, created REAL)')
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS answers_time ON answers (created)')
+        # Whatever the last run was replying to when it stopped
+        self.connection.execute('DELETE FROM handled WHERE done = 0')
+        self.connection.commit()
+        self.bucket_seconds = bucket_seconds
+        self.tweet_ttl = tweet_ttl
+        self.claim_ttl = claim_ttl
+        self.answer_ttl = answer_ttl
+        self.prune_every = prune_every
+        self.n_writes = 0
+        self.lock = threading.Lock()
+        self.duplicates = 0
+        self.hits = 0
+        self.misses = 0
+        self.prune()
+
+    def claim(self, tweet_id):
+        """
+        Claim a tweet to reply to. Return False if it's already claimed.
+
+        Call finish() once the reply has been sent, or release() if it
+        won't be.
+        """
+        now = time.time()
+        with self.lock:
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO handled VALUES (?, ?, 0)',
+                (tweet_id, now))
+            if cursor.rowcount == 0:
+                # Take over a claim that was abandoned
+                cursor = self.connection.execute(
+                    'UPDATE handled SET handled = ? WHERE tweet_id = ? '
+                    'AND done = 0 AND handled < ?',
+                    (now, tweet_id, now - self.claim_ttl))
+            self.connection.commit()
+            if cursor.rowcount == 0:
+                self.duplicates += 1
+                return False
+        self._wrote()
+        return True
+
+    def finish(self, tweet_id):
+        """Record that a claimed tweet has been handled."""
+        with self.lock:
+            self.connection.execute(
+                'UPDATE handled SET handled = ?, done = 1 WHERE tweet_id = ?',
+                (time.time(), tweet_id))
+            self.connection.commit()
+
+    def release(self, tweet_id):
+        """Give up a claim, so the tweet can be handled again later."""
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM handled WHERE tweet_id = ? AND done = 0',
+                (tweet_id,))
+            self.connection.commit()
+
+    def get_answer(self, key):
+        """
+        Return the (obj, link, media_id) given for a key, or None.
+
+        `key` comes from bot.sky_key, using this store's bucket_seconds.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT answer FROM answers WHERE key = ? AND created >= ?',
+                (answer_key(key), time.time() - self.answer_ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        answer = json.loads(row[0])
+        return answer['obj'], answer['link'], answer['media_id']
+
+    def put_answer(self, key, obj, link, media_id):
+        """Store the answer given for a key. `obj` loses its coords."""
+        obj = dict((name, value) for name, value in obj.items()
+                   if name != 'coords')
+        answer = json.dumps({'obj': obj, 'link': link, 'media_id': media_id},
+                            default=float)
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO answers VALUES (?, ?, ?)',
+                (answer_key(key), answer, time.time()))
+            self.connection.commit()
+        self._wrote()
+
+    def prune(self):
+        """Delete the handled tweets and answers that have expired."""
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM handled WHERE handled < ?',
+                (now - self.tweet_ttl,))
+            self.connection.execute(
+                'DELETE FROM answers WHERE created < ?',
+                (now - self.answer_ttl,))
+            self.connection.commit()
+
+    def stats(self):
+        """Return the duplicate, hit and miss counts and the rows held."""
+        with self.lock:
+            n_handled = self.connection.execute(
+                'SELECT COUNT(*) FROM handled').fetchone()[0]
+            n_answers = self.connection.execute(
+                'SELECT COUNT(*) FROM answers').fetchone()[0]
+            return {'duplicates': self.duplicates, 'hits': self.hits,
+                    'misses': self.misses, 'handled': n_handled,
+                    'answers': n_answers}
+
+    def _wrote(self):
+        """Count a write, pruning every `prune_every` of them."""
+        with self.lock:
+            self.n_writes += 1
+            due = self.n_writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+
+def answer_key(key):
+    """Turn a (lat, lng, bucket) key into a string for the database."""
+    return '{:.4f}|{:.4f}|{:d}'.format(*key)
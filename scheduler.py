@@ -0,0 +1,195 @@
+"""
+Share the upstream APIs' rate limits out between tweets by priority.
+
+Each upstream API has a token bucket sized to its real limits. Before a
+tweet's reply starts, it asks for the tokens it will need from each API
+and waits its turn: direct requests first, then follows and unfollows, and
+locations sampled from the timeline last. Low priority work can't take the
+last part of any bucket, which is kept for high priority replies, and it's
+dropped if it has waited too long. The time spent waiting is recorded for
+each tweet type.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+# (tokens per second, bucket size) for each upstream API
+RATE_LIMITS = {
+    # Places API, 150,000 requests a day
+    'google': (150000 / 86400.0, 50),
+    # CDS blacklists clients making more than about 6 queries a second
+    'simbad': (5.0, 5),
+    'aladin': (5.0, 5),
+    # WordPress.com doesn't publish a limit for XML-RPC, so keep it gentle
+    'wordpress': (1.0, 10),
+    # 300 tweets every 3 hours. Media uploads don't count towards this and
+    # have no published limit, so they aren't scheduled.
+    'twitter': (300 / 10800.0, 300),
+    # Follows are limited to 400 a day; unfollows are counted with them
+    'friendships': (400 / 86400.0, 50),
+    # text-processing.com allows 1000 calls a day without a key
+    'text_processing': (1000 / 86400.0, 20),
+}
+
+# Lower numbers go first
+PRIORITIES = {
+    'request': 0,
+    'follow': 1,
+    'unfollow': 1,
+    'location': 2,
+}
+LOW_PRIORITY = 2
+
+# Calls to each API needed to handle each type of tweet. These are upper
+# bounds: e.g. a cached location doesn't need Google at all. WordPress takes
+# an image upload and a new post.
+COSTS = {
+    'request': {'google': 2, 'simbad': 1, 'aladin': 1, 'wordpress': 2,
+                'twitter': 1},
+    'location': {'google': 2, 'simbad': 1, 'aladin': 1, 'wordpress': 2,
+                 'twitter': 1},
+    'follow': {'friendships': 1, 'twitter': 1},
+    'unfollow': {'friendships': 1, 'twitter': 1},
+}
+
+# Fraction of every bucket that low priority work can't use
+RESERVE = 0.2
+
+# Seconds low priority work waits before it's dropped
+MAX_LOW_PRIORITY_WAIT = 10.0
+
+
+class TokenBucket(object):
+    """Tokens that refill at a steady rate, up to a maximum."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.time()
+
+    def refill(self, now):
+        """Add the tokens accrued since the last refill."""
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, n, reserve=0.0):
+        """Seconds until `n` tokens can be taken leaving `reserve` behind."""
+        missing = n + reserve - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate
+
+
+class Scheduler(object):
+    """Hands out upstream API tokens to tweets in priority order."""
+
+    def __init__(self, rate_limits=RATE_LIMITS, priorities=PRIORITIES,
+                 costs=COSTS, reserve=RESERVE,
+                 max_low_priority_wait=MAX_LOW_PRIORITY_WAIT):
+        self.buckets = dict((api, TokenBucket(rate, capacity))
+                            for api, (rate, capacity) in rate_limits.items())
+        self.priorities = priorities
+        self.costs = costs
+        self.reserve = reserve
+        self.max_low_priority_wait = max_low_priority_wait
+        self.condition = threading.Condition()
+        # (priority, arrival order) of everything waiting
+        self.waiting = []
+        self.counter = itertools.count()
+        self.waits = dict((tweet_type, deque(maxlen=1000))
+                          for tweet_type in priorities)
+        self.n_dropped = dict((tweet_type, 0) for tweet_type in priorities)
+
+    def acquire(self, tweet_type, costs=None):
+        """
+        Wait for the tokens a tweet needs and take them.
+
+        Returns the time waited in seconds, or None if the tweet was dropped
+        for waiting too long.
+        """
+        if costs is None:
+            costs = self.costs.get(tweet_type, {})
+        priority = self.priorities.get(tweet_type, LOW_PRIORITY)
+        entry = (priority, next(self.counter))
+        start = time.time()
+        with self.condition:
+            heapq.heappush(self.waiting, entry)
+            try:
+                while True:
+                    now = time.time()
+                    delay = None
+                    if self.waiting[0] == entry:
+                        delay = self.delay(costs, priority, now)
+                        if delay == 0:
+                            for api, n in costs.items():
+                                self.buckets[api].tokens -= n
+                            break
+                    if (priority >= LOW_PRIORITY and
+                            now - start > self.max_low_priority_wait):
+                        self.n_dropped[tweet_type] = (
+                            self.n_dropped.get(tweet_type, 0) + 1)
+                        return None
+                    if priority >= LOW_PRIORITY:
+                        remaining = self.max_low_priority_wait - (now - start)
+                        delay = min(delay or remaining, remaining)
+                    self.condition.wait(delay)
+            finally:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+        waited = time.time() - start
+        self.waits.setdefault(tweet_type, deque(maxlen=1000)).append(waited)
+        return waited
+
+    def try_take(self, api, n=1):
+        """Take tokens without waiting, if low priority work could."""
+        with self.condition:
+            bucket = self.buckets[api]
+            now = time.time()
+            bucket.refill(now)
+            if self.waiting or bucket.time_until(
+                    n, self.reserve * bucket.capacity) > 0:
+                return False
+            bucket.tokens -= n
+            return True
+
+    def delay(self, costs, priority, now):
+        """Seconds until every bucket can pay the costs."""
+        delay = 0.0
+        for api, n in costs.items():
+            bucket = self.buckets[api]
+            bucket.refill(now)
+            reserve = 0.0
+            if priority >= LOW_PRIORITY:
+                reserve = self.reserve * bucket.capacity
+            delay = max(delay, bucket.time_until(n, reserve))
+        return delay
+
+    def stats(self):
+        """Return the wait times and drops for each tweet type."""
+        stats = {}
+        for tweet_type, waits in self.waits.items():
+            waits = sorted(waits)
+            stats[tweet_type] = {
+                'n': len(waits),
+                'median_wait': waits[len(waits) // 2] if waits else None,
+                'max_wait': waits[-1] if waits else None,
+                'dropped': self.n_dropped.get(tweet_type, 0),
+            }
+        return stats
+
+    def report(self):
+        """Print the wait times and drops for each tweet type."""
+        for tweet_type, stats in sorted(self.stats().items()):
+            if stats['n']:
+                print '{}: {} scheduled, median wait {:.2f} s, max {:.2f} s, ' \
+                      '{} dropped'.format(
+                          tweet_type, stats['n'], stats['median_wait'],
+                          stats['max_wait'], stats['dropped'])
+            else:
+                print '{}: none scheduled, {} dropped'.format(
+                    tweet_type, stats['dropped'])
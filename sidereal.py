@@ -0,0 +1,89 @@
+"""
+Sidereal time without astropy.
+
+The formula is the one Bot.get_ra_dec has always used, with the time since
+J2000 worked out from Unix seconds and a table of leap seconds instead of
+astropy Time objects. It accepts a single time or an array of them, as
+datetimes, numpy datetime64s or Unix seconds.
+"""
+import calendar
+import datetime
+
+import numpy as np
+
+# Unix time of the J2000 epoch, 2000-01-01 12:00:00 UTC
+J2000_UNIX = 946728000.0
+
+# Dates from which TAI - UTC took each value, in seconds
+LEAP_SECONDS = [
+    ((1972, 1, 1), 10), ((1972, 7, 1), 11), ((1973, 1, 1), 12),
+    ((1974, 1, 1), 13), ((1975, 1, 1), 14), ((1976, 1, 1), 15),
+    ((1977, 1, 1), 16), ((1978, 1, 1), 17), ((1979, 1, 1), 18),
+    ((1980, 1, 1), 19), ((1981, 7, 1), 20), ((1982, 7, 1), 21),
+    ((1983, 7, 1), 22), ((1985, 7, 1), 23), ((1988, 1, 1), 24),
+    ((1990, 1, 1), 25), ((1991, 1, 1), 26), ((1992, 7, 1), 27),
+    ((1993, 7, 1), 28), ((1994, 7, 1), 29), ((1996, 1, 1), 30),
+    ((1997, 7, 1), 31), ((1999, 1, 1), 32), ((2006, 1, 1), 33),
+    ((2009, 1, 1), 34), ((2012, 7, 1), 35), ((2015, 7, 1), 36),
+    ((2017, 1, 1), 37),
+]
+LEAP_SECOND_TIMES = np.array([calendar.timegm(date + (0, 0, 0))
+                              for date, _ in LEAP_SECONDS], dtype=float)
+LEAP_SECOND_OFFSETS = np.array([offset for _, offset in LEAP_SECONDS],
+                               dtype=float)
+# TAI - UTC at J2000
+J2000_OFFSET = 32.0
+
+
+def unix_seconds(times):
+    """Convert datetimes, datetime64s or Unix seconds into Unix seconds."""
+    times = np.asarray(times)
+    if times.dtype.kind == 'M':
+        return times.astype('datetime64[us]').astype(np.int64) / 1e6
+    if times.dtype.kind == 'O':
+        # Naive datetimes are taken to be UTC already
+        return np.vectorize(_datetime_to_unix, otypes=[float])(times)
+    return times.astype(float)
+
+def days_since_j2000(times):
+    """Return the days since J2000, counting leap seconds like astropy."""
+    unix = unix_seconds(times)
+    idx = np.searchsorted(LEAP_SECOND_TIMES, unix, side='right') - 1
+    offset = LEAP_SECOND_OFFSETS[np.maximum(idx, 0)]
+    return (unix - J2000_UNIX + offset - J2000_OFFSET) / 86400.0
+
+def days_since_j2000_astropy(times):
+    """Return the days since J2000 using astropy, as Bot.get_ra_dec did."""
+    from astropy.time import Time
+    start_time = Time('2000-01-01 12:00:00.0', scale='utc')
+    times = np.asarray(times)
+    if times.dtype.kind != 'O':
+        # Time(format='unix') spreads a leap second over the day before it,
+        # which datetimes don't, so always hand astropy datetimes
+        times = np.array([datetime.datetime.utcfromtimestamp(unix)
+                          for unix in np.atleast_1d(unix_seconds(times))],
+                         dtype=object).reshape(times.shape)
+    at_time = Time(np.atleast_1d(times).tolist(), scale='utc')
+    delta = (at_time - start_time).value
+    if times.ndim == 0:
+        return delta[0]
+    return delta.reshape(times.shape)
+
+def gst(times, use_astropy=False):
+    """Return the Greenwich sidereal time in hours (not wrapped to 0-24)."""
+    if use_astropy:
+        delta = days_since_j2000_astropy(times)
+    else:
+        delta = days_since_j2000(times)
+    return 18.697374558 + 24.06570982441908 * delta
+
+def lst_degrees(lng, times, use_astropy=False):
+    """Return the local sidereal time in degrees, i.e. the ra overhead."""
+    return (gst(times, use_astropy=use_astropy) * 15.0 + lng) % 360
+
+def _datetime_to_unix(time):
+    """Convert one datetime (naive UTC, or timezone-aware) to Unix seconds."""
+    if isinstance(time, datetime.datetime):
+        return (calendar.timegm(time.utctimetuple()) +
+                time.microsecond / 1e6)
+    return float(time)
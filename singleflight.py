@@ -0,0 +1,59 @@
+"""
+Let identical work that's already running be shared instead of repeated.
+
+When a popular account tweets a place, many followers ask about it within
+seconds. The first lookup for a key does the work; any others for the same
+key that arrive while it's running wait for it and get the same result (or
+the same exception). Once it's finished the key is forgotten, so this is
+not a cache.
+"""
+import sys
+import threading
+
+
+class Call(object):
+    """One computation in flight, and everyone waiting for it."""
+
+    def __init__(self):
+        self.finished = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Coalesces concurrent calls that have the same key."""
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.n_calls = 0
+        self.n_coalesced = 0
+
+    def do(self, key, func, *args):
+        """Return func(*args), or the result of a running call with this key."""
+        with self.lock:
+            self.n_calls += 1
+            call = self.calls.get(key)
+            if call is not None:
+                self.n_coalesced += 1
+                leader = False
+            else:
+                call = Call()
+                self.calls[key] = call
+                leader = True
+        if not leader:
+            call.finished.wait()
+            if call.error is not None:
+                exc_type, exc_value, exc_traceback = call.error
+                raise exc_type, exc_value, exc_traceback
+            return call.result
+        try:
+            call.result = func(*args)
+        except Exception:
+            call.error = sys.exc_info()
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.finished.set()
+        return call.result
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def unit_vectors(ra, dec):
+    """Return an (N, 3) array of unit vectors for ra+dec in degrees."""
+    ra = np.radians(np.atleast_1d(np.asarray(ra, dtype=float)))
+    dec = np.radians(np.atleast_1d(np.asarray(dec, dtype=float)))
+    cos_dec = np.cos(dec)
+    return np.column_stack((
+        cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)))
+
+def chord_length(angle):
+    """Return the straight-line distance between unit vectors `angle` apart."""
+    return 2.0 * np.sin(np.radians(angle) / 2.0)
+
+def chord_to_angle(chord):
+    """Return the angle in degrees subtended by a chord between unit vectors."""
+    return np.degrees(2.0 * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0)))
+
+def separations(ra, dec, ra0, dec0):
+    """Return the angles in degrees between some points and (ra0, dec0)."""
+    chords = unit_vectors(ra, dec) - unit_vectors(ra0, dec0)
+    return chord_to_angle(np.sqrt(np.sum(chords**2, axis=1)))
+
+def valid_sexagesimal(strings):
+    """
+    Return a mask of the strings that look like 'dd mm ss.s'.
+
+    For the formats Simbad returns this is equivalent to matching the
+    regex r'.+ .+ .+\..+', which rejects low-precision positions such as
+    'dd mm.m', but works on the whole column at once.
+    """
+    first = np.char.partition(_as_strings(strings), ' ')
+    second = np.char.partition(first[..., 2], ' ')
+    last = second[..., 2]
+    dot = np.char.rfind(last, '.')
+    return ((np.char.str_len(first[..., 0]) > 0) &
+            (np.char.str_len(second[..., 0]) > 0) &
+            (dot > 0) & (dot < np.char.str_len(last) - 1))
+
+def parse_sexagesimal(strings, scale=1.0):
+    """
+    Convert 'dd mm ss.s' strings into degrees.
+
+    Use scale=15.0 for right ascensions given in hours.
+    """
+    first = np.char.partition(np.char.strip(_as_strings(strings)), ' ')
+    second = np.char.partition(first[..., 2], ' ')
+    value = (np.abs(first[..., 0].astype(float)) +
+             second[..., 0].astype(float) / 60.0 +
+             np.char.strip(second[..., 2]).astype(float) / 3600.0)
+    negative = np.char.startswith(first[..., 0], '-')
+    return scale * np.where(negative, -value, value)
+
+def _as_strings(strings):
+    """Return a numpy string array, whatever the input column type."""
+    return np.asarray(strings).astype(str)
@@ -0,0 +1,202 @@
+"""
+Cache strips of Simbad results along lines of constant declination.
+
+For a fixed place the declination overhead never changes, and the right
+ascension only creeps forward with sidereal time. So instead of a fresh
+cone search for every request, the sky is fetched in strips: bands of
+declination, each fetched a chunk of right ascension at a time. Requests
+are answered by finding the nearest object among the cached rows, and the
+next chunk of each band is fetched by a background thread before the sky
+gets there. Each band keeps a bounded number of chunks, and the bands for
+latitudes that haven't been asked about recently are evicted.
+
+Near the poles a chunk of right ascension is tiny on the sky, so lookups
+there should go straight to a cone search instead (see covers()).
+"""
+import math
+import threading
+import traceback
+from collections import OrderedDict
+from Queue import Queue, Full
+
+import numpy as np
+
+from sky import separations, valid_sexagesimal, parse_sexagesimal
+from singleflight import SingleFlight
+
+# Height of each declination band, in degrees
+BAND_HEIGHT = 0.25
+
+# Width of each chunk of right ascension, in degrees (15 minutes of sky)
+CHUNK_RA = 3.75
+
+# Chunks kept per band, and bands kept in total
+MAX_CHUNKS = 8
+MAX_BANDS = 32
+
+# Beyond this declination, lookups aren't answered from strips
+POLE_LIMIT = 80.0
+
+# Chunks waiting to be prefetched; more than this and prefetches are skipped
+MAX_PREFETCH = 16
+
+
+class Chunk(object):
+    """The usable rows of one fetched box, with their positions parsed."""
+
+    def __init__(self, table):
+        if table is None:
+            # astroquery returns None when nothing matches
+            self.table = None
+            self.ra = np.zeros(0)
+            self.dec = np.zeros(0)
+            return
+        keep = valid_sexagesimal(table['RA']) & valid_sexagesimal(table['DEC'])
+        self.table = table[keep]
+        self.ra = parse_sexagesimal(self.table['RA'], scale=15.0)
+        self.dec = parse_sexagesimal(self.table['DEC'])
+
+    def __len__(self):
+        return len(self.ra)
+
+
+class StripCache(object):
+    """Chunks of Simbad results, by declination band and right ascension."""
+
+    def __init__(self, fetch, radius, band_height=BAND_HEIGHT,
+                 chunk_ra=CHUNK_RA, max_chunks=MAX_CHUNKS,
+                 max_bands=MAX_BANDS, pole_limit=POLE_LIMIT,
+                 max_prefetch=MAX_PREFETCH):
+        """
+        `fetch(ra_min, ra_max, dec_min, dec_max)` should return a Simbad
+        table of everything in that box. `radius` is the search radius that
+        lookups will use, which sets how far each band's fetches overlap
+        the bands above and below. Chunks don't overlap in right ascension,
+        since a lookup reads every chunk its search circle touches.
+        """
+        self.fetch = fetch
+        self.radius = radius
+        self.band_height = band_height
+        self.n_chunks = int(round(360.0 / chunk_ra))
+        self.chunk_ra = 360.0 / self.n_chunks
+        self.max_chunks = max_chunks
+        self.max_bands = max_bands
+        self.pole_limit = pole_limit
+        # band -> OrderedDict of chunk -> Chunk, least recently used first
+        self.bands = OrderedDict()
+        self.lock = threading.Lock()
+        self.single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.n_fetched = 0
+        # (band, chunk) waiting for the prefetch thread, and the same as a set
+        self.prefetch_queue = Queue(maxsize=max_prefetch)
+        self.queued = set()
+        self.prefetcher = threading.Thread(target=self._prefetch_forever)
+        self.prefetcher.daemon = True
+        self.prefetcher.start()
+
+    def covers(self, dec):
+        """Return True if lookups at this declination can use the strips."""
+        return abs(dec) + self.band_height + self.radius <= self.pole_limit
+
+    def nearest(self, ra, dec, radius):
+        """
+        Return the closest object as (table, index, ra, dec), or None.
+
+        `radius` can't be larger than the radius the cache was made for.
+        """
+        band = int(math.floor((dec + 90.0) / self.band_height))
+        half_width = radius / math.cos(math.radians(abs(dec) + radius))
+        first = int(math.floor((ra - half_width) / self.chunk_ra))
+        last = int(math.floor((ra + half_width) / self.chunk_ra))
+        chunks = [self.chunk(band, idx % self.n_chunks)
+                  for idx in xrange(first, last + 1)]
+        # The right ascension overhead only increases, so the next chunk
+        # along will be wanted soon
+        self.prefetch(band, (last + 1) % self.n_chunks)
+        best = None
+        for chunk in chunks:
+            if not len(chunk):
+                continue
+            seps = separations(chunk.ra, chunk.dec, ra, dec)
+            idx = np.argmin(seps)
+            if seps[idx] < radius and (best is None or seps[idx] < best[0]):
+                best = (seps[idx], chunk, idx)
+        if best is None:
+            return None
+        _, chunk, idx = best
+        return chunk.table, idx, chunk.ra[idx], chunk.dec[idx]
+
+    def chunk(self, band, idx):
+        """Return a chunk, fetching it if it isn't cached."""
+        with self.lock:
+            chunks = self.bands.pop(band, None)
+            if chunks is not None:
+                # Mark the band as recently used
+                self.bands[band] = chunks
+                chunk = chunks.pop(idx, None)
+                if chunk is not None:
+                    chunks[idx] = chunk
+                    self.hits += 1
+                    return chunk
+            self.misses += 1
+        return self.single_flight.do((band, idx), self.load, band, idx)
+
+    def prefetch(self, band, idx):
+        """Queue a chunk to be fetched in the background, if it's needed."""
+        key = (band, idx)
+        with self.lock:
+            if idx in self.bands.get(band, ()) or key in self.queued:
+                return
+            self.queued.add(key)
+        try:
+            self.prefetch_queue.put_nowait(key)
+        except Full:
+            # Lookups will fetch it themselves if it's really needed
+            with self.lock:
+                self.queued.discard(key)
+
+    def load(self, band, idx):
+        """Fetch a chunk and add it to the cache."""
+        with self.lock:
+            chunk = self.bands.get(band, {}).get(idx)
+        if chunk is not None:
+            return chunk
+        dec_min = max(-90.0 + band * self.band_height - self.radius, -90.0)
+        dec_max = min(-90.0 + (band + 1) * self.band_height + self.radius,
+                      90.0)
+        ra_min = idx * self.chunk_ra
+        chunk = Chunk(self.fetch(ra_min, ra_min + self.chunk_ra,
+                                 dec_min, dec_max))
+        with self.lock:
+            self.n_fetched += 1
+            chunks = self.bands.pop(band, OrderedDict())
+            self.bands[band] = chunks
+            chunks[idx] = chunk
+            while len(chunks) > self.max_chunks:
+                chunks.popitem(last=False)
+            while len(self.bands) > self.max_bands:
+                self.bands.popitem(last=False)
+        return chunk
+
+    def _prefetch_forever(self):
+        """Fetch the queued chunks one at a time."""
+        while True:
+            key = self.prefetch_queue.get()
+            try:
+                self.single_flight.do(key, self.load, *key)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self.lock:
+                    self.queued.discard(key)
+
+    def stats(self):
+        """Return the hit rate and the number of rows held."""
+        with self.lock:
+            n_rows = sum(len(chunk) for chunks in self.bands.values()
+                         for chunk in chunks.values())
+            return {'hits': self.hits, 'misses': self.misses,
+                    'fetched': self.n_fetched, 'bands': len(self.bands),
+                    'rows': n_rows}
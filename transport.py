@@ -0,0 +1,127 @@
+"""
+Every outbound HTTP request the bot makes goes through here.
+
+Requests share one keep-alive session per upstream host, so a reply reuses
+warm connections instead of doing a TCP and TLS handshake for every call.
+Every request has connect and read timeouts, so a hung socket can't block a
+worker forever. Failures are retried a bounded number of times, with
+jittered exponential backoff between attempts. Requests that aren't safe to
+repeat (most POSTs) are only retried if the connection was never made.
+
+Use the module-level get() and post() like their requests equivalents.
+"""
+import random
+import threading
+import time
+import urlparse
+
+# Seconds to wait for a connection, and then for each read from it
+TIMEOUT = (5.0, 30.0)
+
+# Attempts after the first, and the base delay between them in seconds
+MAX_RETRIES = 3
+BACKOFF = 0.5
+
+# Responses worth another try
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Connections to keep open to each host, sized to how often it's used
+POOL_SIZES = {
+    'maps.googleapis.com': 8,
+    'alasky.u-strasbg.fr': 8,
+    'upload.twitter.com': 4,
+    'api.twitter.com': 4,
+    'text-processing.com': 4,
+    'simbad.u-strasbg.fr': 4,
+}
+DEFAULT_POOL_SIZE = 2
+
+
+class Transport(object):
+    """Pooled sessions per host, with timeouts and retries."""
+
+    def __init__(self, timeout=TIMEOUT, max_retries=MAX_RETRIES,
+                 backoff=BACKOFF, pool_sizes=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        if pool_sizes is None:
+            pool_sizes = POOL_SIZES
+        self.pool_sizes = pool_sizes
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.n_retries = 0
+
+    def session(self, url):
+        """Return the session for a URL's host, creating it on first use."""
+        parts = urlparse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                pool_size = self.pool_sizes.get(
+                    parts.hostname, DEFAULT_POOL_SIZE)
+                session = requests.Session()
+                # Retries are done here rather than by urllib3, so that they
+                # get the backoff and jitter
+                session.mount(parts.scheme + '://', HTTPAdapter(
+                    pool_connections=1, pool_maxsize=pool_size,
+                    max_retries=0))
+                self.sessions[key] = session
+        return session
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """
+        Make a request and return the response, as requests.request does.
+
+        `idempotent` says whether the request can safely be sent twice. It
+        defaults to True for GET and HEAD, and False for everything else.
+        """
+        from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+        # Older requests let some of urllib3's connection errors through
+        from requests.packages.urllib3.exceptions import ProtocolError
+        if idempotent is None:
+            idempotent = method.upper() in ('GET', 'HEAD')
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session(url)
+        for attempt in xrange(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = session.request(method, url, **kwargs)
+            except ConnectTimeout:
+                if last_attempt:
+                    raise
+            except (ConnectionError, Timeout, ProtocolError):
+                # The request may have been received, so only resend it if
+                # that does no harm
+                if last_attempt or not idempotent:
+                    raise
+            else:
+                if (last_attempt or not idempotent or
+                        response.status_code not in RETRY_STATUSES):
+                    return response
+            self.n_retries += 1
+            # Full jitter, so that workers retrying together spread out
+            time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def get(self, url, **kwargs):
+        """Make a GET request."""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Make a POST request."""
+        return self.request('POST', url, **kwargs)
+
+
+# Shared by the whole process
+default_transport = Transport()
+
+def get(url, **kwargs):
+    """Make a GET request with the shared transport."""
+    return default_transport.get(url, **kwargs)
+
+def post(url, **kwargs):
+    """Make a POST request with the shared transport."""
+    return default_transport.post(url, **kwargs)
@@ -0,0 +1,112 @@
+"""
+Process tweets from the stream on a pool of worker threads.
+
+The thread reading the stream hands each tweet to a worker, so one slow
+reply no longer holds up every tweet queued behind it. Tweets are assigned
+to workers by user, which keeps the replies to any one user in order.
+"""
+import threading
+import time
+import traceback
+from Queue import Queue
+
+STOP = object()
+
+
+class WorkerPool(object):
+    """A fixed set of worker threads, each with its own bounded queue."""
+
+    def __init__(self, process, n_workers=4, max_queue=100,
+                 report_interval=300.0, tweet_of=None):
+        """
+        `process` is called with each item from the stream. If the items
+        aren't tweets, `tweet_of(item)` should return the tweet in one.
+        """
+        self.process = process
+        self.tweet_of = tweet_of
+        self.n_workers = n_workers
+        self.queues = [Queue(maxsize=max_queue) for _ in xrange(n_workers)]
+        self.threads = []
+        self.busy_time = [0.0] * n_workers
+        self.n_processed = [0] * n_workers
+        self.report_interval = report_interval
+        self.start_time = None
+
+    def start(self):
+        """Start the worker threads."""
+        self.start_time = time.time()
+        for idx in xrange(self.n_workers):
+            thread = threading.Thread(target=self._work, args=(idx,))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def run(self, stream):
+        """Read every tweet from the stream and pass it on to the workers."""
+        self.start()
+        last_report = time.time()
+        try:
+            for tweet in stream:
+                self.submit(tweet)
+                if time.time() - last_report > self.report_interval:
+                    self.report()
+                    last_report = time.time()
+        finally:
+            self.stop()
+
+    def submit(self, tweet):
+        """Queue a tweet, blocking if that user's worker is full."""
+        self.queues[self.worker_for(tweet)].put(tweet)
+
+    def worker_for(self, tweet):
+        """Return the index of the worker that handles this tweet's user."""
+        if self.tweet_of is not None:
+            tweet = self.tweet_of(tweet)
+        try:
+            screen_name = tweet['user']['screen_name'].lower()
+        except (KeyError, TypeError, AttributeError):
+            # Not a tweet, e.g. the list of friends sent at the start
+            return 0
+        return hash(screen_name) % self.n_workers
+
+    def stop(self):
+        """Let the workers finish everything queued, then shut them down."""
+        for queue in self.queues:
+            queue.put(STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        self.report()
+
+    def stats(self):
+        """Return the current queue depths and the utilisation of each worker."""
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        return {
+            'queue_depth': [queue.qsize() for queue in self.queues],
+            'utilisation': [busy / elapsed for busy in self.busy_time],
+            'processed': list(self.n_processed),
+        }
+
+    def report(self):
+        """Print the current stats."""
+        stats = self.stats()
+        print 'Worker queue depths: {}'.format(stats['queue_depth'])
+        print 'Worker utilisation: {}'.format(
+            ', '.join('{:.0%}'.format(u) for u in stats['utilisation']))
+        print 'Tweets processed: {}'.format(sum(stats['processed']))
+
+    def _work(self, idx):
+        """Process tweets from one queue until told to stop."""
+        queue = self.queues[idx]
+        while True:
+            tweet = queue.get()
+            if tweet is STOP:
+                break
+            start = time.time()
+            try:
+                self.process(tweet)
+            except Exception:
+                # One bad tweet shouldn't take the worker down with it
+                traceback.print_exc()
+            self.busy_time[idx] += time.time() - start
+            self.n_processed[idx] += 1
@@ -0,0 +1,9 @@
+"""
+What counts as being above a place.
+
+This has no dependencies, so that the bot (which imports numpy lazily) and
+the batch solver can share it without either pulling in the other.
+"""
+
+# Radius of the cone searched around the zenith, in degrees
+SEARCH_RADIUS = 0.25
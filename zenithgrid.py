@@ -0,0 +1,130 @@
+"""
+Precomputed answers to "what is closest to this ra+dec?" for the whole sky.
+
+The sky is cut into rings of constant declination, and each ring into cells
+of roughly equal size. For every cell the few catalog objects closest to its
+centre are stored in a memory-mapped array. At request time the object above
+a point is found by indexing the cell and picking the closest of its
+candidates. Cells where the candidates can't be guaranteed to contain the
+true answer are flagged, and those fall back to the catalog's kd-tree.
+
+Usage: python zenithgrid.py catalog.npz grid_prefix resolution_arcsec [k]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from catalog import LocalCatalog
+from sky import unit_vectors, chord_to_angle, separations
+
+
+class ZenithGrid(object):
+    """A memory-mapped grid of nearest-object candidates."""
+
+    def __init__(self, prefix, catalog):
+        self.catalog = catalog
+        self.candidates = np.load(prefix + '.candidates.npy', mmap_mode='r')
+        self.exact = np.load(prefix + '.exact.npy', mmap_mode='r')
+        rings = np.load(prefix + '.rings.npz')
+        self.resolution = float(rings['resolution'])
+        self.radius = float(rings['radius'])
+        self.n_ra = rings['n_ra']
+        self.offsets = rings['offsets']
+        self.n_fallback = 0
+
+    def cell(self, ra, dec):
+        """Return the index of the cell containing a point."""
+        ring = min(int((dec + 90.0) / self.resolution), len(self.n_ra) - 1)
+        n_ra = self.n_ra[ring]
+        return self.offsets[ring] + int(ra % 360.0 / 360.0 * n_ra) % n_ra
+
+    def nearest(self, ra, dec, radius):
+        """Return the catalog index of the closest object, as for the catalog."""
+        cell = self.cell(ra, dec)
+        if not self.exact[cell] or radius > self.radius:
+            self.n_fallback += 1
+            return self.catalog.nearest(ra, dec, radius)
+        candidates = self.candidates[cell]
+        candidates = candidates[candidates >= 0]
+        if len(candidates) == 0:
+            return None
+        seps = separations(self.catalog.ra[candidates],
+                           self.catalog.dec[candidates], ra, dec)
+        best = np.argmin(seps)
+        if seps[best] >= radius:
+            return None
+        return candidates[best]
+
+
+def ring_layout(resolution):
+    """Return the number of cells in each ring, and the index of the first."""
+    n_rings = int(np.ceil(180.0 / resolution))
+    lower = -90.0 + resolution * np.arange(n_rings)
+    upper = np.minimum(lower + resolution, 90.0)
+    # Size the cells using the edge of the ring nearest the equator
+    widest = np.where(lower * upper <= 0, 0.0,
+                      np.minimum(np.abs(lower), np.abs(upper)))
+    n_ra = np.maximum(
+        1, np.ceil(360.0 * np.cos(np.radians(widest)) / resolution))
+    n_ra = n_ra.astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(n_ra)[:-1]))
+    return lower, upper, n_ra, offsets
+
+def build_grid(catalog, prefix, resolution, k=4, radius=0.25):
+    """
+    Build the grid files for a catalog.
+
+    `resolution` is the height of each ring in degrees. `radius` is the
+    largest search radius the grid can answer without falling back.
+    """
+    lower, upper, n_ra, offsets = ring_layout(resolution)
+    n_cells = int(n_ra.sum())
+    candidates = np.lib.format.open_memmap(
+        prefix + '.candidates.npy', mode='w+', dtype=np.int32,
+        shape=(n_cells, k))
+    exact = np.lib.format.open_memmap(
+        prefix + '.exact.npy', mode='w+', dtype=np.bool_, shape=(n_cells,))
+    for ring in xrange(len(n_ra)):
+        width = 360.0 / n_ra[ring]
+        ra = (np.arange(n_ra[ring]) + 0.5) * width
+        dec = np.zeros(n_ra[ring]) + 0.5 * (lower[ring] + upper[ring])
+        # Furthest any point in a cell can be from the cell's centre
+        half_diagonal = max(
+            separations([ra[0] + width / 2.0], [lower[ring]], ra[0], dec[0])[0],
+            separations([ra[0] + width / 2.0], [upper[ring]], ra[0], dec[0])[0])
+        chords, idx = catalog.tree.query(unit_vectors(ra, dec), k=k)
+        distance = chord_to_angle(chords.reshape(len(ra), k))
+        idx = idx.reshape(len(ra), k)
+        # Objects that can't be within the radius of any point in the cell
+        unreachable = distance - half_diagonal > radius
+        idx[unreachable] = -1
+        # The true answer is certainly a candidate if every other object is
+        # further from the whole cell than the best candidate could be
+        beyond = distance[:, -1] - half_diagonal
+        start = offsets[ring]
+        candidates[start:start+n_ra[ring]] = idx
+        exact[start:start+n_ra[ring]] = (
+            (beyond >= distance[:, 0] + half_diagonal) | (beyond > radius))
+    candidates.flush()
+    exact.flush()
+    np.savez(prefix + '.rings.npz', resolution=resolution, radius=radius,
+             n_ra=n_ra, offsets=offsets)
+    return n_cells
+
+def grid_size(prefix):
+    """Return the total size of a grid's files in bytes."""
+    return sum(os.path.getsize(prefix + suffix) for suffix in
+               ('.candidates.npy', '.exact.npy', '.rings.npz'))
+
+
+if __name__ == '__main__':
+    catalog = LocalCatalog(sys.argv[1])
+    prefix = sys.argv[2]
+    resolution = float(sys.argv[3]) / 3600.0
+    k = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+    start = time.time()
+    n_cells = build_grid(catalog, prefix, resolution, k=k)
+    print 'Built {} cells in {:.1f} s, {:.1f} MB'.format(
+        n_cells, time.time() - start, grid_size(prefix) / 1e6)